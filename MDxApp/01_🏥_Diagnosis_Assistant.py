@@ -1,4 +1,3 @@
-import json
 import os
 import sys
 from pathlib import Path
@@ -18,341 +17,649 @@ from src.components.donation import (
     render_sidebar_donation,
 )
 from src.components.language_selector import add_language_separator, render_language_selector
-from src.utils.styling import load_main_styles
+from src.components.patient_form import (
+    render_medical_history_fields,
+    render_patient_demographics,
+    render_patient_form,
+)
+from src.components.session import get_client_key, get_session_id, is_fragment_rerun
+from src.components.state import get_state_manager
+from src.core.cancellation import REASON_SUPERSEDED
+from src.core.diagnosis_renderer import DiagnosisRenderer
+from src.core.incremental import CaseConversation
+from src.core.jobs import JobExecutor
+from src.core.prompt_builder import PromptBuilder
+from src.core.speculation import SpeculationManager
+from src.core.urgency import PRIORITY_URGENT, assess_urgency
+from src.models.patient import PatientData
+from src.utils.hot_reload import enable_hot_reload, secrets_file_paths
+from src.utils.i18n import get_i18n
+from src.utils.logger import set_log_rate_limit, setup_logger
+from src.utils.metrics import (
+    get_diagnosis_metrics,
+    start_metrics_file_writer,
+    start_metrics_server,
+)
+from src.utils.profiling import maybe_profile_rerun
+from src.utils.session_memory import get_session_memory
+from src.utils.styling import get_logo_path, load_image_bytes, load_main_styles
+from src.utils.tracing import configure_tracing
+
+# Logging sinks (rotating file / JSON) and hot-path rate limits from secrets
+if st.secrets.get("log_file") or st.secrets.get("log_json"):
+    setup_logger(
+        log_file=Path(st.secrets["log_file"]) if st.secrets.get("log_file") else None,
+        format_json=bool(st.secrets.get("log_json", False)),
+    )
+for logger_name, max_per_second in st.secrets.get("log_rate_limits", {}).items():
+    set_log_rate_limit(logger_name, max_per_second=float(max_per_second))
+
+# Per-rerun tracing (no-op unless enabled in secrets)
+tracer = configure_tracing(
+    enabled=st.secrets.get("tracing_enabled", False),
+    jsonl_path=st.secrets.get("tracing_jsonl_path", None),
+    otlp_endpoint=st.secrets.get("tracing_otlp_endpoint", None),
+)
+
+# Opt-in rerun profiling (profiling_enabled secret or ?profile=<profiling_token>)
+rerun_profiler = maybe_profile_rerun("diagnosis_assistant", st.secrets, st.query_params)
+rerun_span = tracer.start_span("streamlit_rerun", new_trace=True, page="diagnosis_assistant")
+
+# The span and profiler are closed even if the rerun ends early (st.rerun(), st.stop(), errors)
+try:
+    # Prometheus export (HTTP endpoint and/or textfile; started once per process)
+    if st.secrets.get("metrics_port"):
+        start_metrics_server(int(st.secrets["metrics_port"]))
+    if st.secrets.get("metrics_file"):
+        start_metrics_file_writer(Path(st.secrets["metrics_file"]))
+
+    # Feed the operator dashboard (pricing overrides and active sessions)
+    diagnosis_metrics = get_diagnosis_metrics()
+    if st.secrets.get("model_pricing"):
+        diagnosis_metrics.set_pricing(st.secrets["model_pricing"])
+    session_id = get_session_id()
+    diagnosis_metrics.touch_session(session_id)
+
+    # Translations and prompt templates: shared per process, hot-reloaded in the background
+    i18n = get_i18n(project_root / "Assets" / "translations.json")
+
+    @st.cache_resource
+    def get_prompt_builder():
+        """Create the prompt builder once per process; hot reload swaps its templates."""
+        canvas = st.secrets["prompt_canvas"]
+        return PromptBuilder(
+            canvas["prompt_words"], i18n.bundles(), prompt_system=canvas["prompt_system"]
+        )
+
+    prompt_builder = get_prompt_builder()
+
+    @st.cache_resource
+    def get_diagnosis_renderer():
+        """Create the structured-diagnosis renderer once per process."""
+        return DiagnosisRenderer(i18n.bundles())
 
-# Load translations from JSON file
-with open(path + "/../Assets/translations.json") as f:
-    transl = json.load(f)
+    diagnosis_renderer = get_diagnosis_renderer()
+    if st.secrets.get("hot_reload", True):
+        enable_hot_reload(i18n, prompt_builder, secrets_file_paths())
 
-# Trick to preserve the state of your widgets across pages
-for k, v in st.session_state.items():
-    st.session_state[k] = v
-##
+    # Snapshots for this rerun: a reload mid-rerun only affects the next rerun. The
+    # form and the prompts both use `transl`, whichever path reloaded the translations
+    transl = i18n.bundles()
+    prompt_templates = prompt_builder.templates()
+    rerun_span.set_attribute("translations_version", i18n.version)
+    rerun_span.set_attribute("prompt_version", prompt_templates.version)
 
-# Initialize OpenAI client for GPT-5 Mini
-# Check if using new client or legacy
-use_new_client = st.secrets.get("use_new_ai_client", False)
+    # Keep the form's widget values across pages (only the declared keys are stored)
+    get_state_manager().sync(restore=True)
 
-if use_new_client:
-    # Modern OpenAI SDK v1.x for GPT-5 Mini
-    from openai import OpenAI
+    # Per-session memory accounting (evicts stored diagnoses LRU-first when over the caps)
+    session_memory = get_session_memory(st.secrets)
+    session_memory.track(session_id, st.session_state)
 
-    openai_client = OpenAI(api_key=st.secrets["openai_api_key"])
+    # Initialize OpenAI client for GPT-5 Mini
+    # Check if using new client or legacy
+    use_new_client = st.secrets.get("use_new_ai_client", False)
 
-    def openai_create(prompt):
-        """Create diagnosis using modern OpenAI SDK (supports GPT-5 Mini)."""
-        try:
+    if use_new_client:
+        # Modern OpenAI SDK v1.x for GPT-5 Mini
+        from src.core.ai_client import DiagnosisAIClient, prompt_cache_key
+
+        @st.cache_resource
+        def get_ai_client(api_key, model, max_tokens):
+            """Create the diagnosis client once per process and configuration."""
             # GPT-5 Mini requires temperature=1.0 (only supported value)
             # and doesn't support frequency/presence penalties
-            response = openai_client.chat.completions.create(
-                model=st.secrets.get("openai_api_model", "gpt-5-mini"),
-                messages=[
-                    {"role": "system", "content": st.secrets["prompt_canvas"]["prompt_system"]},
-                    {"role": "user", "content": prompt},
-                ],
-                max_completion_tokens=int(st.secrets.get("openai_api_maxtok", 2000)),
-                # Note: GPT-5 Mini only supports temperature=1.0 (default)
-                # frequency_penalty and presence_penalty are not supported
+            return DiagnosisAIClient(api_key=api_key, model=model, max_tokens=max_tokens)
+
+        ai_client = get_ai_client(
+            st.secrets["openai_api_key"],
+            st.secrets.get("openai_api_model", "gpt-5-mini"),
+            int(st.secrets.get("openai_api_maxtok", 2000)),
+        )
+
+        @st.cache_resource
+        def get_diagnosis_translator(api_key, model):
+            """Create the display-language translator once per process and model."""
+            from src.core.diagnosis_translator import DiagnosisTranslator
+
+            return DiagnosisTranslator(ai_client.client, model=model)
+
+        # Language switches translate the stored diagnosis with a small model
+        diagnosis_translator = get_diagnosis_translator(
+            st.secrets["openai_api_key"], st.secrets.get("translation_model", "gpt-4o-mini")
+        )
+
+        @st.cache_resource
+        def get_diagnosis_triage(api_key, model):
+            """Create the small-model triage stage once per process and model."""
+            from src.core.triage import DiagnosisTriage
+
+            return DiagnosisTriage(ai_client.client, model=model)
+
+        # Two-stage pipeline: a fast triage answer is shown while the full assessment runs
+        diagnosis_triage = (
+            get_diagnosis_triage(
+                st.secrets["openai_api_key"], st.secrets.get("triage_model", "gpt-5-nano")
             )
-            return response.choices[0].message.content
-        except Exception as e:
-            st.error(f"OpenAI API Error: {str(e)}")
-            return None
-
-else:
-    # Legacy OpenAI SDK v0.27.0 (for backward compatibility)
-    openai.api_key = st.secrets["openai_api_key"]
-
-    def openai_create(prompt):
-        """Create diagnosis using legacy OpenAI SDK."""
-        response = openai.ChatCompletion.create(
-            model=st.secrets["openai_api_model"],
-            messages=[
-                {"role": "system", "content": st.secrets["prompt_canvas"]["prompt_system"]},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=float(st.secrets["openai_api_temp"]),
-            max_tokens=int(st.secrets["openai_api_maxtok"]),
-            frequency_penalty=int(st.secrets["openai_api_freqp"]),
-            presence_penalty=float(st.secrets["openai_api_presp"]),
-            stop=None,
+            if st.secrets.get("two_stage_diagnosis", False)
+            else None
+        )
+
+        @st.cache_resource
+        def get_diagnosis_ensemble(samples, quorum):
+            """Create the self-consistency ensemble (sample threads, stats) once per process."""
+            from src.core.ensemble import DiagnosisEnsemble
+
+            return DiagnosisEnsemble(ai_client, samples=samples, quorum=quorum)
+
+        # Structured path: low-confidence answers are re-sampled in parallel and merged by vote
+        ensemble_samples = int(st.secrets.get("ensemble_samples", 0))
+        diagnosis_ensemble = (
+            get_diagnosis_ensemble(ensemble_samples, int(st.secrets.get("ensemble_quorum", 3)))
+            if ensemble_samples and st.secrets.get("structured_diagnosis", False)
+            else None
         )
-        return response["choices"][0]["message"]["content"]
 
+        def openai_create(prompt):
+            """Create diagnosis using modern OpenAI SDK (supports GPT-5 Mini)."""
+            # Same routing key as the triage stage: both send the same prompt prefix
+            cache_key = prompt_cache_key(prompt_templates.prompt_system)
+            if diagnosis_ensemble is not None:
+                return diagnosis_ensemble.diagnose(
+                    prompt_templates.prompt_system, prompt, prompt_cache_key=cache_key
+                )
+            if st.secrets.get("structured_diagnosis", False):
+                # Rendered per language by the result panel
+                return ai_client.get_structured_diagnosis(
+                    prompt_templates.prompt_system, prompt, prompt_cache_key=cache_key
+                )
+            # Streaming lets the tracer record time to first token
+            return ai_client.get_diagnosis(
+                prompt_templates.prompt_system, prompt, stream=True, prompt_cache_key=cache_key
+            )
+
+        @st.cache_resource
+        def get_conversation_manager(api_key, model, window_tokens):
+            """Create the case-history window (summaries and their cache) once per process."""
+            from src.core.conversation import ConversationManager
 
-st.set_page_config(page_title="Diagnosis_Assistant", page_icon="🏥", layout="wide")
+            return ConversationManager(ai_client.client, model=model, window_tokens=window_tokens)
 
-# Load external CSS styles
-load_main_styles(project_root)
+        # Opt-in: edits of a diagnosed case are sent as a delta on top of its history, which
+        # older turns leave through a running summary once it outgrows the token window
+        conversation_manager = (
+            get_conversation_manager(
+                st.secrets["openai_api_key"],
+                st.secrets.get("summary_model", "gpt-4o-mini"),
+                int(st.secrets.get("conversation_window_tokens", 3000)),
+            )
+            if st.secrets.get("incremental_diagnosis", False)
+            else None
+        )
 
-# Language selection using component
-lang = render_language_selector(transl, location="sidebar")
+        def openai_update(prompt, history):
+            """Follow-up of an already diagnosed case: only the changes are new."""
+            cache_key = prompt_cache_key(prompt_templates.prompt_system)
+            if st.secrets.get("structured_diagnosis", False):
+                return ai_client.get_structured_diagnosis(
+                    prompt_templates.prompt_system,
+                    prompt,
+                    history=history,
+                    prompt_cache_key=cache_key,
+                )
+            return ai_client.get_diagnosis(
+                prompt_templates.prompt_system,
+                prompt,
+                stream=True,
+                history=history,
+                prompt_cache_key=cache_key,
+            )
 
-# Line separator for clarity
-add_language_separator(location="sidebar")
+        def openai_triage(prompt):
+            """First stage of the two-stage pipeline: terse diagnosis and urgency flag."""
+            return diagnosis_triage.triage(
+                prompt_templates.prompt_system,
+                prompt,
+                prompt_cache_key=prompt_cache_key(prompt_templates.prompt_system),
+            )
 
-# CSS now loaded from external file (pages/styles/main.css)
+    else:
+        # Legacy OpenAI SDK v0.27.0 (for backward compatibility)
+        openai.api_key = st.secrets["openai_api_key"]
+        diagnosis_translator = None
+        diagnosis_triage = None
+        conversation_manager = None
+
+        def openai_create(prompt):
+            """Create diagnosis using legacy OpenAI SDK."""
+            model = st.secrets["openai_api_model"]
+            upstream_span = tracer.span("upstream_call", model=model, legacy=True)
+            with upstream_span, diagnosis_metrics.track_request(model):
+                response = openai.ChatCompletion.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": prompt_templates.prompt_system},
+                        {"role": "user", "content": prompt},
+                    ],
+                    temperature=float(st.secrets["openai_api_temp"]),
+                    max_tokens=int(st.secrets["openai_api_maxtok"]),
+                    frequency_penalty=int(st.secrets["openai_api_freqp"]),
+                    presence_penalty=float(st.secrets["openai_api_presp"]),
+                    stop=None,
+                )
+            diagnosis_metrics.record_usage(model, response.get("usage"))
+            return response["choices"][0]["message"]["content"]
+
+    @st.cache_resource
+    def get_diagnosis_jobs():
+        """Create the background diagnosis executor once per process."""
+        return JobExecutor(
+            max_workers=int(st.secrets.get("diagnosis_workers", 4)),
+            result_ttl=float(st.secrets.get("diagnosis_result_ttl", 900)),
+            aging=float(st.secrets.get("diagnosis_priority_aging", 30)),
+            deadline=float(st.secrets.get("diagnosis_deadline", 180)),
+            # The page polls every second; a job nobody polls belongs to a closed session
+            abandon_after=float(st.secrets.get("diagnosis_abandon_after", 60)),
+        )
 
-# Buy me a coffee - MDxApp support (using component)
-with st.sidebar:
-    render_sidebar_donation(
-        username="geonosislaX",
-        translations=transl,
-        language=lang,
-        qr_image_path=get_default_qr_path(project_root),
-    )
+    @st.cache_resource
+    def get_speculation_manager():
+        """Create the speculative-submission manager (budget and stats) once per process."""
+        return SpeculationManager(
+            get_diagnosis_jobs(),
+            debounce=float(st.secrets.get("speculation_debounce", 3)),
+            budget_tokens=int(st.secrets.get("speculation_budget_tokens", 50_000)),
+            estimate_tokens=int(st.secrets.get("speculation_estimate_tokens", 3000)),
+        )
 
-# Use GitHub logo file
-logo_name = path + "/../Materials/MDxApp_logo_v2_256.png"
+    # Edits of a diagnosed case are sent as deltas (new client only)
+    incremental = conversation_manager is not None
 
-# Define columns
-t1, t2 = st.columns([1, 3], gap="large")
-with t1:
-    st.image(logo_name, caption="", width=256)
-with t2:
-    st.header("**{}**".format(transl[lang]["page1_header"]))
-    st.write(
-        '<p style="font-weight: bold; font-size:18px;">{}</p>'.format(
-            transl[lang]["page1_subheader"]
-        ),
-        unsafe_allow_html=True,
+    # Diagnoses run outside the script thread, so reruns and reconnects do not lose them
+    diagnosis_jobs = get_diagnosis_jobs()
+    # Opt-in: start the request once the case has settled, before the user presses submit
+    speculation = (
+        get_speculation_manager() if st.secrets.get("speculative_submission", False) else None
     )
+    # Browser behind this session: a reload may reattach to the jobs it submitted
+    client_key = get_client_key()
+    if "diagnosis_job" not in st.session_state and st.query_params.get("job"):
+        # Reconnected browser (new session, same URL): reattach to its own in-flight job
+        if diagnosis_jobs.reattach(st.query_params["job"], session_id, client_key):
+            st.session_state.diagnosis_job = st.query_params["job"]
+        else:
+            st.query_params.pop("job", None)
+
+    st.set_page_config(page_title="Diagnosis_Assistant", page_icon="🏥", layout="wide")
+
+    # Load external CSS styles
+    load_main_styles(project_root)
+
+    # Language selection using component
+    lang = render_language_selector(transl, location="sidebar")
+
+    # Line separator for clarity
+    add_language_separator(location="sidebar")
+
+    # CSS now loaded from external file (pages/styles/main.css)
+
+    # Buy me a coffee - MDxApp support (using component)
+    with st.sidebar:
+        render_sidebar_donation(
+            username="geonosislaX",
+            translations=transl,
+            language=lang,
+            qr_image_path=get_default_qr_path(project_root),
+        )
 
-st.markdown("", unsafe_allow_html=True)
-"""
+    # Logo: smallest rendition covering the rendered width, bytes cached in process
+    logo_path = get_logo_path(256, project_root / "Materials")
+
+    # Define columns
+    t1, t2 = st.columns([1, 3], gap="large")
+    with t1:
+        st.image(load_image_bytes(logo_path), caption="", width=256)
+    with t2:
+        st.header("**{}**".format(transl[lang]["page1_header"]))
+        st.write(
+            '<p style="font-weight: bold; font-size:18px;">{}</p>'.format(
+                transl[lang]["page1_subheader"]
+            ),
+            unsafe_allow_html=True,
+        )
+
+    st.markdown("", unsafe_allow_html=True)
+    """
 ---
 """
-st.write(
-    '<p style="font-weight: bold; font-size:18px;">{}</p>'.format(transl[lang]["htu_0"])
-    + '<p style="font-size:18px;">1. {}<br/>'.format(transl[lang]["htu_1"])
-    + "2. {}<br/>".format(transl[lang]["htu_2"])
-    + "3. {}</p>".format(transl[lang]["htu_3"]),
-    unsafe_allow_html=True,
-)
-
-# All CSS now loaded from external file (pages/styles/main.css)
-
-st.subheader(":black_nib: **{}**".format(transl[lang]["report_header"]))
-# Define columns
-col1, col2, col3 = st.columns(3, gap="large")
-
-# Store initial values in session state
-if "disabled" not in st.session_state:
-    st.session_state.disabled = False
-# Declare lists
-genders_list = ["{}".format(transl[lang]["male"]), "{}".format(transl[lang]["female"])]
-pregnant_list = ["{}".format(transl[lang]["no"]), "{}".format(transl[lang]["yes"])]
-##
-
-# Gender selector
-with col1:
-    if st.session_state["lang_changed"] and "gender" in st.session_state:
-        del st.session_state["gender"]
-    if "gender" not in st.session_state:
-        st.session_state["gender"] = genders_list[0]
-    st.radio("**{}**".format(transl[lang]["gender"]), genders_list, key="gender")
-# Age selector
-with col2:
-    st.number_input(
-        "**{}**".format(transl[lang]["age"]), min_value=0, max_value=99, step=1, key="age"
-    )
-# Pregnancy
-if st.session_state.gender == "{}".format(transl[lang]["male"]):
-    st.session_state.disabled = True
-    if "pregnant" in st.session_state:
-        st.session_state["pregnant"] = "{}".format(transl[lang]["no"])
-else:
-    st.session_state.disabled = False
-
-with col3:
-    if st.session_state["lang_changed"] and "pregnant" in st.session_state:
-        del st.session_state["pregnant"]
-    if "pregnant" not in st.session_state:
-        st.session_state["pregnant"] = pregnant_list[0]
-    st.radio(
-        "**{}**".format(transl[lang]["pregnant"]),
-        pregnant_list,
-        disabled=st.session_state.disabled,
-        key="pregnant",
+    st.write(
+        '<p style="font-weight: bold; font-size:18px;">{}</p>'.format(transl[lang]["htu_0"])
+        + '<p style="font-size:18px;">1. {}<br/>'.format(transl[lang]["htu_1"])
+        + "2. {}<br/>".format(transl[lang]["htu_2"])
+        + "3. {}</p>".format(transl[lang]["htu_3"]),
+        unsafe_allow_html=True,
     )
 
-# Context
-st.text_input(
-    "**{}** *{}*".format(transl[lang]["history"], transl[lang]["hist_example"]),
-    placeholder="{}".format(transl[lang]["hist_ph"]),
-    key="context",
-    max_chars=250,
-    help=":green[**{}**]".format(transl[lang]["hist_help"]),
-)
+    # All CSS now loaded from external file (pages/styles/main.css)
+
+    st.subheader(":black_nib: **{}**".format(transl[lang]["report_header"]))
+
+    def current_patient():
+        """The case as entered so far (widget values are already bounded by the inputs)."""
+        return PatientData.model_construct(
+            gender=st.session_state.gender,
+            age=st.session_state.age,
+            is_pregnant=st.session_state.pregnant,
+            history=st.session_state.context,
+            symptoms=st.session_state.symptoms,
+            exam_findings=st.session_state.exam,
+            lab_results=st.session_state.labresults,
+            language=lang,
+        )
 
-# List of symptoms
-st.text_input(
-    "**{}** *{}*".format(transl[lang]["symptoms"], transl[lang]["symp_example"]),
-    placeholder="{}".format(transl[lang]["symp_ph"]),
-    key="symptoms",
-    max_chars=250,
-    help=":green[**{}**]".format(transl[lang]["symp_help"]),
-)
+    @st.fragment
+    def case_fragment():
+        """
+        Patient inputs, summary and submission.
+
+        Interacting with these widgets reruns only this function; the header, sidebar
+        and result panel are left as they are until a full rerun.
+        """
+        # A fragment rerun starts its own trace (the page's rerun span has ended)
+        fragment_span = tracer.start_span(
+            "case_fragment", new_trace=is_fragment_rerun(), activate=True, language=lang
+        )
 
-# List of observations at exam
-st.text_input(
-    "**{}** *{}*".format(transl[lang]["exam"], transl[lang]["exam_example"]),
-    placeholder="{}".format(transl[lang]["exam_ph"]),
-    key="exam",
-    max_chars=250,
-    help=":green[**{}**]".format(transl[lang]["exam_help"]),
-)
+        # Form mode batches the whole case entry into one rerun; live mode reruns per edit
+        form_mode = st.secrets.get("patient_form_mode", True)
+        if form_mode:
+            preview_button, submit_button = render_patient_form(transl[lang], lang)
+        else:
+            render_patient_demographics(transl[lang], lang)
+            render_medical_history_fields(transl[lang], lang)
+            # Live mode: the summary is always shown; the submit button comes after it
+            preview_button, submit_button = True, False
+
+        patient = current_patient()
+
+        # Summary on demand (always shown in live mode)
+        if preview_button or submit_button:
+            st.subheader(":clipboard: **{}**".format(transl[lang]["summary"]))
+            vis_summary = prompt_builder.build_visual_summary(patient, lang, translations=transl)
+            st.write(vis_summary, unsafe_allow_html=True)
+
+        if not form_mode:
+            st.write("")
+            submit_button = st.button(
+                "**{}**".format(transl[lang]["submit"]),
+                help=":green[**{}**]".format(transl[lang]["submit_help"]),
+            )
+        st.write("")
 
-# Laboratory test results
-st.text_input(
-    "**{}** *{}*".format(transl[lang]["lab"], transl[lang]["lab_example"]),
-    placeholder="{}".format(transl[lang]["lab_ph"]),
-    key="labresults",
-    max_chars=250,
-    help=":green[**{}**]".format(transl[lang]["lab_help"]),
-)
+        if not submit_button:
+            fragment_span.end()
+            return
 
-st.subheader(":clipboard: **{}**".format(transl[lang]["summary"]))
-# Diagnostic
-
-report_list = [
-    st.session_state.context,
-    st.session_state.symptoms,
-    st.session_state.exam,
-    st.session_state.labresults,
-]
-corr_list = [
-    "{}".format(transl[lang]["none"]),
-    "{}".format(transl[lang]["none"]),
-    "{}".format(transl[lang]["none"]),
-    "{}".format(transl[lang]["none"]),
-]
-for ic in range(0, len(report_list)):
-    if report_list[ic] == "":
-        report_list[ic] = corr_list[ic]
-
-vis_summary = (
-    '<p style="font-size:18px;">'
-    + "<b>{}</b>".format(transl[lang]["vissum_patient"])
-    + st.session_state.gender
-    + ", "
-    + str(st.session_state.age)
-    + "{}<br/>".format(transl[lang]["vissum_yrsold"])
-    + "<b>{}</b>".format(transl[lang]["vissum_pregnancy"])
-    + st.session_state.pregnant
-    + "<br/>"
-    + "<b>{}</b>".format(transl[lang]["vissum_history"])
-    + report_list[0]
-    + "<br/>"
-    + "<b>{}</b>".format(transl[lang]["vissum_symp"])
-    + report_list[1]
-    + "<br/>"
-    + "<b>{}</b>".format(transl[lang]["vissum_exam"])
-    + report_list[2]
-    + "<br/>"
-    + "<b>{}</b>".format(transl[lang]["vissum_lab"])
-    + report_list[3]
-    + "<br/> </p>"
-)
+        fragment_span.set_attribute("submit", True)
+        prompt_span = tracer.start_span("prompt_build", language=lang)
+        # One case per rerun: the batch build_user_prompts() is for bulk callers (make bench)
+        question_prompt = prompt_builder.build_user_prompt(
+            patient, lang, templates=prompt_templates, translations=transl
+        )
+        prompt_span.end()
+        with tracer.span("form_validation"):
+            missing_symptoms = patient.symptoms in ("", transl[lang]["none"])
+        if missing_symptoms:
+            st.write(
+                '<p style="font-weight: bold; font-size:18px;">{}</p>'.format(
+                    transl[lang]["submit_warning"]
+                ),
+                unsafe_allow_html=True,
+            )
+            fragment_span.end()
+            return
+
+        # Urgent presentations (red flags, extreme ages, pregnancy) are dispatched first
+        urgency = assess_urgency(patient, transl[lang])
+        fragment_span.set_attribute("urgency_score", urgency.score)
+
+        # A new submission replaces a still-running one (its stream is closed)
+        diagnosis_jobs.cancel(st.session_state.get("diagnosis_job"), REASON_SUPERSEDED)
+        diagnosis_jobs.cancel(st.session_state.pop("triage_job", None), REASON_SUPERSEDED)
+
+        if diagnosis_triage is not None:
+            # Queued ahead of the full assessment (same priority, older wins) and in the same
+            # trace: both jobs join the span active at submission
+            st.session_state.triage_job = diagnosis_jobs.submit(
+                openai_triage,
+                question_prompt,
+                session_id=session_id,
+                language=lang,
+                priority=urgency.priority,
+                client=client_key,
+            )
 
-st.write(vis_summary, unsafe_allow_html=True)
-
-prompt_words = st.secrets["prompt_canvas"]["prompt_words"]
-question_prompt = (
-    prompt_words[0]
-    + st.session_state.gender
-    + ", "
-    + str(st.session_state.age)
-    + "{}. ".format(transl[lang]["vissum_yrsold"])
-    + prompt_words[1]
-    + st.session_state.pregnant
-    + ". "
-    + prompt_words[2]
-    + report_list[0]
-    + ". "
-    + prompt_words[3]
-    + report_list[1]
-    + ". "
-    + prompt_words[4]
-    + report_list[2]
-    + ". "
-    + prompt_words[5]
-    + report_list[3]
-    + ". "
-    + prompt_words[6]
-    + prompt_words[7]
-    + prompt_words[8]
-    + prompt_words[9]
-    + lang
-    + ". "
-)
+        # Edit of a diagnosed case: only the changed fields are sent, after the case's history
+        conversation = st.session_state.get("dx_conversation") if incremental else None
+        update_prompt = (
+            conversation.update_prompt(patient, lang, transl[lang]) if conversation else None
+        )
 
-st.write("")
-submit_button = st.button(
-    "**{}**".format(transl[lang]["submit"]),
-    help=":green[**{}**]".format(transl[lang]["submit_help"]),
-)
-st.write("")
+        # The job ID (session state and URL) is all the page needs to collect the result
+        job_id = None
+        if update_prompt is not None:
+            fragment_span.set_attribute("incremental", conversation.turn_count)
+            job_id = diagnosis_jobs.submit(
+                openai_update,
+                update_prompt,
+                # Summary (if any) and recent turns, bounded by the token window
+                conversation_manager.history(conversation),
+                session_id=session_id,
+                language=lang,
+                priority=urgency.priority,
+                client=client_key,
+            )
+        elif speculation is not None:
+            # Same case as the speculative request: wait for it instead of starting over
+            job_id = speculation.claim(st.session_state, question_prompt, lang, urgency.priority)
+        if job_id is None:
+            job_id = diagnosis_jobs.submit(
+                openai_create,
+                question_prompt,
+                session_id=session_id,
+                language=lang,
+                priority=urgency.priority,
+                client=client_key,
+            )
+        if incremental:
+            # Recorded in the case's history once the answer arrives
+            st.session_state.dx_turn = {
+                "prompt": update_prompt or question_prompt,
+                "patient": patient,
+                "update": update_prompt is not None,
+            }
+        st.session_state.diagnosis_job = job_id
+        st.query_params["job"] = job_id
+        fragment_span.set_attribute("job_id", job_id)
+        fragment_span.end()
+        # Full rerun so the result panel starts polling the job
+        st.rerun()
+
+    def cancel_diagnosis_job():
+        """Cancel button callback: stop the upstream call and drop the job."""
+        diagnosis_jobs.cancel(st.session_state.pop("diagnosis_job", None))
+        diagnosis_jobs.cancel(st.session_state.pop("triage_job", None))
+        st.session_state.pop("dx_turn", None)
+        st.query_params.pop("job", None)
+        st.session_state.dx_cancelled = True
+
+    def triage_preview(job):
+        """Show the triage answer (two-stage pipeline) while the full assessment is pending."""
+        triage_job = diagnosis_jobs.get(st.session_state.get("triage_job"))
+        if triage_job is None or not triage_job.done or triage_job.result is None:
+            return
+        triage = triage_job.result
+        message = "**{}:** {}".format(transl[lang]["triage_header"], triage.primary_diagnosis)
+        if triage.urgent:
+            # A still-queued full assessment moves up; the local score may have missed the case
+            diagnosis_jobs.reprioritize(job.job_id, PRIORITY_URGENT)
+            st.error("{} · {}".format(message, transl[lang]["triage_urgent"]))
+        else:
+            st.info(message)
+
+    @st.fragment(run_every=1.0)
+    def diagnosis_job_status():
+        """Poll the submitted diagnosis job; a full rerun shows its result once finished."""
+        job_id = st.session_state.get("diagnosis_job")
+        if job_id is None:
+            # Cancelled by the button: the full rerun shows the notice and stops polling
+            st.rerun()
+        job = diagnosis_jobs.get(job_id)
+        if job is not None and not job.done:
+            st.button(transl[lang]["cancel"], on_click=cancel_diagnosis_job)
+            triage_preview(job)
+            with st.spinner("{}".format(transl[lang]["submit_wait"])):
+                job.wait(timeout=0.9)
+            if not job.done:
+                return
+
+        st.session_state.pop("diagnosis_job", None)
+        st.query_params.pop("job", None)
+        # The full assessment replaces the triage answer
+        triage_job_id = st.session_state.pop("triage_job", None)
+        diagnosis_jobs.cancel(triage_job_id, REASON_SUPERSEDED)
+        diagnosis_jobs.forget(triage_job_id)
+        turn = st.session_state.pop("dx_turn", None)
+        if job is not None and job.result:
+            st.session_state.diagnostic = job.result
+            st.session_state.dx_language = job.language
+            st.session_state.dx_new = True
+            session_memory.stored(session_id, "diagnostic")
+            if turn is not None:
+                conversation = st.session_state.get("dx_conversation")
+                if not turn["update"] or conversation is None:
+                    # Full submission: the history starts over with this case
+                    conversation = CaseConversation(job.language)
+                recorded = conversation.record(
+                    turn["prompt"],
+                    job.result,
+                    turn["patient"],
+                    usage=job.usage,
+                    latency=job.finished_at - job.started_at,
+                )
+                # Per-turn stats; compacts older turns in the background if over the window
+                conversation_manager.record(conversation, recorded)
+                st.session_state.dx_conversation = conversation
+                session_memory.stored(session_id, "dx_conversation")
+        else:
+            # Failed, past its deadline or expired
+            st.session_state.dx_failed = True
+        diagnosis_jobs.forget(job_id)
+        st.rerun()
+
+    case_fragment()
+
+    def speculation_tick():
+        """Start (or keep alive) a speculative request once the case stops changing."""
+        if "diagnosis_job" in st.session_state:
+            return
+        patient = current_patient()
+        if patient.symptoms in ("", transl[lang]["none"]):
+            speculation.discard(st.session_state)
+            return
+        conversation = st.session_state.get("dx_conversation") if incremental else None
+        if conversation is not None and conversation.update_prompt(patient, lang, transl[lang]):
+            # Edits of a diagnosed case are sent as a delta on submit, not speculated on
+            speculation.discard(st.session_state)
+            return
+        prompt = prompt_builder.build_user_prompt(
+            patient, lang, templates=prompt_templates, translations=transl
+        )
+        speculation.observe(
+            st.session_state,
+            prompt,
+            lang,
+            openai_create,
+            prompt,
+            session_id=session_id,
+            client=client_key,
+        )
+
+    if speculation is not None:
+        st.fragment(run_every=speculation.debounce)(speculation_tick)()
 
-st.subheader(":computer: :speech_balloon: :pill: **{}**".format(transl[lang]["diagnostic"]))
-if submit_button:
-    if report_list[1] == "{}".format(transl[lang]["none"]):
+    # Result panel: only the job poller has widgets, so it runs on full reruns (new diagnosis,
+    # language change)
+    st.subheader(":computer: :speech_balloon: :pill: **{}**".format(transl[lang]["diagnostic"]))
+    if "diagnosis_job" in st.session_state:
+        diagnosis_job_status()
+    if st.session_state.pop("dx_failed", False):
+        # Error already logged by openai_create
         st.write(
             '<p style="font-weight: bold; font-size:18px;">{}</p>'.format(
-                transl[lang]["submit_warning"]
+                transl[lang]["no_response"]
             ),
             unsafe_allow_html=True,
         )
-    else:
-        with st.spinner("{}".format(transl[lang]["submit_wait"])):
-            try:
-                diagnosis_result = openai_create(prompt=question_prompt)
-
-                if diagnosis_result:
-                    st.session_state.diagnostic = diagnosis_result
-                    st.write("")
-                    st.write(
-                        st.session_state.diagnostic.replace("<|im_end|>", ""),
-                        unsafe_allow_html=True,
-                    )
-                else:
-                    # Error already displayed by openai_create
-                    st.write(
-                        '<p style="font-weight: bold; font-size:18px;">{}</p>'.format(
-                            transl[lang]["no_response"]
-                        ),
-                        unsafe_allow_html=True,
-                    )
-                st.markdown(
-                    """
-                            ### :rotating_light: **{}** :rotating_light:
-                            {}
-                            """.format(
-                        transl[lang]["caution"], transl[lang]["caution_message"]
-                    ),
-                    unsafe_allow_html=True,
-                )
-
-                # Buy me a coffee - MDxApp support (using component)
-                render_inline_donation(
-                    username="geonosislaX",
-                    translations=transl,
-                    language=lang,
-                    qr_image_path=get_default_qr_path(project_root),
-                    show_separator=True,
-                    invest_message=True,
+    if st.session_state.pop("dx_cancelled", False):
+        st.info(transl[lang]["diagnosis_cancelled"])
+    if "diagnostic" in st.session_state:
+        session_memory.touch(session_id, "diagnostic")
+        diagnostic = st.session_state.diagnostic
+        source_language = st.session_state.get("dx_language", lang)
+        if source_language != lang and diagnosis_translator is not None:
+            # Translate the stored result instead of repeating the diagnosis (cached per language)
+            with st.spinner(transl[lang]["translate_wait"]):
+                diagnostic = (
+                    diagnosis_translator.translate(diagnostic, lang, source_language) or diagnostic
                 )
-            except Exception:
-                # st.write(e)
+        with tracer.span("html_render"):
+            if isinstance(diagnostic, str):
+                st.write(diagnostic.replace("<|im_end|>", ""), unsafe_allow_html=True)
+            else:
+                # Structured output, memoized per (diagnosis, language): language switches
+                # re-render without the model
                 st.write(
-                    '<p style="font-weight: bold; font-size:18px;">{}</p>'.format(
-                        transl[lang]["no_response"]
-                    ),
-                    unsafe_allow_html=True,
+                    diagnosis_renderer.render(diagnostic, lang, transl), unsafe_allow_html=True
                 )
-else:
-    if "diagnostic" in st.session_state:
-        st.write(st.session_state.diagnostic.replace("<|im_end|>", ""), unsafe_allow_html=True)
+        if st.session_state.pop("dx_new", False):
+            st.markdown(
+                """
+                    ### :rotating_light: **{}** :rotating_light:
+                    {}
+                    """.format(transl[lang]["caution"], transl[lang]["caution_message"]),
+                unsafe_allow_html=True,
+            )
+
+            # Buy me a coffee - MDxApp support (using component)
+            render_inline_donation(
+                username="geonosislaX",
+                translations=transl,
+                language=lang,
+                qr_image_path=get_default_qr_path(project_root),
+                show_separator=True,
+                invest_message=True,
+            )
     else:
         st.write(
             '<p style="font-weight: bold; font-size:18px;">{}</p>'.format(
@@ -360,3 +667,7 @@ else:
             ),
             unsafe_allow_html=True,
         )
+finally:
+    rerun_span.end()
+    if rerun_profiler:
+        rerun_profiler.stop()
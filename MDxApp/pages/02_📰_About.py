@@ -12,39 +12,45 @@ sys.path.insert(0, str(project_root))
 
 # Import new components and utilities
 from src.components.donation import get_default_qr_path, render_sidebar_donation
+from src.components.state import get_state_manager
+from src.utils.profiling import maybe_profile_rerun
 from src.utils.styling import load_main_styles
 
-# Trick to preserve the state of your widgets across pages
-for k, v in st.session_state.items():
-    st.session_state[k] = v
+# Opt-in rerun profiling (profiling_enabled secret or ?profile=<profiling_token>)
+rerun_profiler = maybe_profile_rerun("about", st.secrets, st.query_params)
 
-st.set_page_config(page_title="About", page_icon="📰", layout="wide")
+# The profiler is stopped even if the rerun ends early (st.rerun(), st.stop(), errors)
+try:
+    # Keep the diagnosis form's widget values while this page is shown
+    get_state_manager().sync()
 
-# Load external CSS styles
-load_main_styles(project_root)
+    st.set_page_config(page_title="About", page_icon="📰", layout="wide")
 
-# Buy me a coffee - MDxApp support (using component)
-# Using English translations for About page (hardcoded for simplicity)
-translations_en = {
-    "English": {
-        "bmc_0": "Let's keep MDxApp free!",
-        "bmc_1": "By clicking here:",
-        "bmc_2": "Or use this QR code:",
+    # Load external CSS styles
+    load_main_styles(project_root)
+
+    # Buy me a coffee - MDxApp support (using component)
+    # Using English translations for About page (hardcoded for simplicity)
+    translations_en = {
+        "English": {
+            "bmc_0": "Let's keep MDxApp free!",
+            "bmc_1": "By clicking here:",
+            "bmc_2": "Or use this QR code:",
+        }
     }
-}
 
-with st.sidebar:
-    render_sidebar_donation(
-        username="geonosislaX",
-        translations=translations_en,
-        language="English",
-        qr_image_path=get_default_qr_path(project_root),
-    )
+    with st.sidebar:
+        render_sidebar_donation(
+            username="geonosislaX",
+            translations=translations_en,
+            language="English",
+            qr_image_path=get_default_qr_path(project_root),
+        )
 
-st.header("About")
+    st.header("About")
 
-st.markdown(
-    """
+    st.markdown(
+        """
     ### **Brief description of the web app**
     This app is designed to assist medical doctors and provide patients with a
     fast diagnostic supported by the ChatGPT AI model of [OpenAI](https://openai.com/) based on relevant information such as age,
@@ -93,14 +99,17 @@ st.markdown(
     >
     >
     """,
-    unsafe_allow_html=True,
-)
+        unsafe_allow_html=True,
+    )
 
-html(
-    """
+    html(
+        """
     <a class="github-button" href="https://github.com/GLambard/MDxApp" data-show-count="true" aria-label="Follow @GLambard on GitHub">Follow @GLambard</a>
     <script async defer src="https://buttons.github.io/buttons.js"></script>
     <a class="twitter-follow-button" href="https://twitter.com/gamlambard">Follow @gamlambard</a>
     <script async defer src="https://platform.twitter.com/widgets.js"></script>
     """
-)
+    )
+finally:
+    if rerun_profiler:
+        rerun_profiler.stop()
@@ -10,23 +10,29 @@ project_root = Path(path_dir).parent.parent
 sys.path.insert(0, str(project_root))
 
 # Import new utilities
-from src.utils.styling import load_main_styles
+from src.components.state import get_state_manager
+from src.utils.profiling import maybe_profile_rerun
+from src.utils.styling import load_css, load_main_styles
 
-# Trick to preserve the state of your widgets across pages
-for k, v in st.session_state.items():
-    st.session_state[k] = v
+# Opt-in rerun profiling (profiling_enabled secret or ?profile=<profiling_token>)
+rerun_profiler = maybe_profile_rerun("contact", st.secrets, st.query_params)
 
-st.set_page_config(
-    page_title="Contact",
-    page_icon="✉️",
-)
+# The profiler is stopped even if the rerun ends early (st.rerun(), st.stop(), errors)
+try:
+    # Keep the diagnosis form's widget values while this page is shown
+    get_state_manager().sync()
 
-# Load external CSS styles
-load_main_styles(project_root)
+    st.set_page_config(
+        page_title="Contact",
+        page_icon="✉️",
+    )
 
-st.header("Contact")
+    # Load external CSS styles
+    load_main_styles(project_root)
 
-contact_form = """
+    st.header("Contact")
+
+    contact_form = """
 <form action="https://formsubmit.co/{}" method="POST">
      <input type="hidden" name="_captcha" value="false">
      <input type="text" name="name" placeholder="Your name" required>
@@ -35,18 +41,13 @@ contact_form = """
      <button type="submit">Send</button>
 </form>
 """.format(
-    st.secrets["email_address"]
-)
-
-st.markdown(contact_form, unsafe_allow_html=True)
-
-
-# Use Local CSS File
-def local_css(file_name):
-    path = os.path.dirname(__file__)
-    file_name = path + "/" + file_name
-    with open(file_name) as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+        st.secrets["email_address"]
+    )
 
+    st.markdown(contact_form, unsafe_allow_html=True)
 
-local_css("styles/email_form.css")
+    # Use Local CSS File (minified and cached in process)
+    load_css(Path(path_dir) / "styles" / "email_form.css")
+finally:
+    if rerun_profiler:
+        rerun_profiler.stop()
@@ -0,0 +1,147 @@
+import hmac
+import os
+import sys
+from pathlib import Path
+
+import streamlit as st
+
+# Add src directory to path for imports
+path = os.path.dirname(__file__)
+project_root = Path(path).parent.parent
+sys.path.insert(0, str(project_root))
+
+# Import new utilities
+from src.components.state import get_state_manager
+from src.core.conversation import get_conversation_metrics
+from src.core.ensemble import get_ensemble_metrics
+from src.core.speculation import get_speculation_metrics
+from src.utils.metrics import get_diagnosis_metrics
+from src.utils.profiling import maybe_profile_rerun
+from src.utils.styling import load_main_styles
+
+# Opt-in rerun profiling (profiling_enabled secret or ?profile=<profiling_token>)
+rerun_profiler = maybe_profile_rerun("operator_dashboard", st.secrets, st.query_params)
+
+# The profiler is stopped even if the rerun ends early (st.rerun(), st.stop(), errors)
+try:
+    # Keep the diagnosis form's widget values while this page is shown
+    get_state_manager().sync()
+
+    st.set_page_config(page_title="Operator Dashboard", page_icon="📊", layout="wide")
+
+    # Load external CSS styles
+    load_main_styles(project_root)
+
+    st.header("Operator Dashboard")
+
+    # Access control: the page is disabled unless an operator password is configured
+    operator_password = st.secrets.get("operator_password", "")
+    if not operator_password:
+        st.info("The operator dashboard is disabled (set `operator_password` in secrets).")
+        st.stop()
+
+    if not st.session_state.get("operator_authenticated", False):
+        entered = st.text_input("Operator password", type="password")
+        if entered and hmac.compare_digest(entered.encode(), str(operator_password).encode()):
+            st.session_state["operator_authenticated"] = True
+            st.rerun()
+        elif entered:
+            st.error("Incorrect password")
+        st.stop()
+
+    # Rolling windows over the pre-aggregated per-minute slots
+    windows = {"5 min": 300, "15 min": 900, "1 hour": 3600, "24 hours": 86400}
+    window_label = st.radio("Window", list(windows.keys()), index=1, horizontal=True)
+    refresh_seconds = int(st.secrets.get("operator_dashboard_refresh", 10))
+
+    def _fmt_seconds(value):
+        """Format a latency in seconds for display."""
+        return "–" if value is None else f"{value:.2f} s"
+
+    def _fmt_rate(value):
+        """Format a ratio as a percentage for display."""
+        return "–" if value is None else f"{value * 100:.1f} %"
+
+    @st.fragment(run_every=refresh_seconds)
+    def render_dashboard(seconds):
+        """Render the live tiles. Reads window summaries only, never the diagnosis path."""
+        summary = get_diagnosis_metrics().window_summary(seconds)
+        latency = summary["latency"]
+        ttft = summary["ttft"]
+
+        st.subheader("Traffic")
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Throughput", f"{summary['throughput_per_min']:.2f} req/min")
+        c2.metric("Requests", f"{summary['requests']:.0f}")
+        c3.metric("Active sessions", summary["active_sessions"])
+        c4.metric("In flight / queued", f"{summary['inflight']:.0f} / {summary['queue_depth']:.0f}")
+        by_priority = summary["queue_by_priority"]
+        queued = [f"{name} {depth:.0f}" for name, depth in by_priority.items() if depth]
+        if queued:
+            st.caption("Queued by priority: " + ", ".join(sorted(queued)))
+
+        st.subheader("Latency")
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("p50", _fmt_seconds(latency.get("p50")))
+        c2.metric("p95", _fmt_seconds(latency.get("p95")))
+        c3.metric("p99", _fmt_seconds(latency.get("p99")))
+        c4.metric(
+            "TTFT p50 / p95", f"{_fmt_seconds(ttft.get('p50'))} / {_fmt_seconds(ttft.get('p95'))}"
+        )
+
+        st.subheader("Tokens and cost")
+        tokens = summary["tokens"]
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Token burn", f"{summary['tokens_per_min']:.0f} tok/min")
+        c2.metric("Cost per hour", f"${summary['cost_per_hour']:.4f}")
+        c3.metric("Spend in window", f"${summary['cost_usd']:.4f}")
+        c4.metric(
+            "Prompt / cached / completion",
+            f"{tokens['prompt']:.0f} / {tokens['cached']:.0f} / {tokens['completion']:.0f}",
+        )
+        if summary["cancelled"]:
+            st.caption(
+                f"Cancelled in flight: {summary['cancelled']:.0f} · est. saved: "
+                f"{summary['tokens_saved']:.0f} completion tokens / ${summary['cost_saved_usd']:.4f}"
+            )
+        speculation = get_speculation_metrics().window_summary(seconds)
+        if speculation["started"]:
+            st.caption(
+                f"Speculative submissions: {speculation['started']:.0f} · hit rate: "
+                f"{_fmt_rate(speculation['hit_rate'])} · wasted: {speculation['wasted_tokens']:.0f} tokens"
+            )
+        ensemble = get_ensemble_metrics().window_summary(seconds)
+        if ensemble["runs"]:
+            st.caption(
+                f"Ensembles (low confidence): {ensemble['runs']:.0f} · mean agreement: "
+                f"{_fmt_rate(ensemble['mean_agreement'])} · samples stopped early: "
+                f"{ensemble['cancelled_samples']:.0f} · {ensemble['tokens']:.0f} tokens"
+            )
+        conversation = get_conversation_metrics().window_summary(seconds)
+        if conversation["turns"]:
+            st.caption(
+                f"Case conversation turns: {conversation['turns']:.0f} · mean prompt: "
+                f"{conversation['mean_prompt_tokens']:.0f} tokens · cached: "
+                f"{_fmt_rate(conversation['cached_share'])} · compactions: "
+                f"{conversation['compactions']:.0f}"
+            )
+
+        st.subheader("Reliability and caching")
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Error rate", _fmt_rate(summary["error_rate"]))
+        c2.metric("429 rate", _fmt_rate(summary["rate_limited_rate"]))
+        c3.metric("Retry rate", _fmt_rate(summary["retry_rate"]))
+        hit_rates = summary["cache_hit_rates"]
+        c4.metric("Prompt cache hit rate", _fmt_rate(hit_rates.get("openai_prompt")))
+        if hit_rates:
+            st.table({name: _fmt_rate(rate) for name, rate in sorted(hit_rates.items())})
+
+        st.caption(
+            f"Window: last {summary['seconds'] / 60:.0f} min · refreshes every {refresh_seconds} s · "
+            "figures cover this server process only"
+        )
+
+    render_dashboard(windows[window_label])
+finally:
+    if rerun_profiler:
+        rerun_profiler.stop()
@@ -0,0 +1,91 @@
+"""
+Benchmark: compiled prompt templates vs. per-request prompt construction.
+
+Run from the repository root:
+    python benchmarks/bench_prompt_builder.py [batch_size]
+"""
+
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.prompt_builder import PromptBuilder  # noqa: E402
+from src.models.patient import PatientData  # noqa: E402
+
+PROMPT_WORDS = [
+    "Patient: ",
+    "Pregnant: ",
+    "History: ",
+    "Symptoms: ",
+    "Examination: ",
+    "Lab results: ",
+    "List the most likely diagnoses. ",
+    "Explain your reasoning. ",
+    "Suggest next steps. ",
+    "Answer in ",
+]
+
+
+def per_request_prompt(patient, translations, language):
+    """Prompt construction as done before compilation: lookups and concatenation per call."""
+    trans = translations.get(language, translations["English"])
+    none_text = trans.get("none", "none")
+    return (
+        PROMPT_WORDS[0] + patient.gender + ", " + str(patient.age)
+        + trans.get("vissum_yrsold", " years old") + ". "
+        + PROMPT_WORDS[1] + patient.is_pregnant + ". "
+        + PROMPT_WORDS[2] + (patient.history or none_text) + ". "
+        + PROMPT_WORDS[3] + patient.symptoms + ". "
+        + PROMPT_WORDS[4] + (patient.exam_findings or none_text) + ". "
+        + PROMPT_WORDS[5] + (patient.lab_results or none_text) + ". "
+        + PROMPT_WORDS[6] + PROMPT_WORDS[7] + PROMPT_WORDS[8] + PROMPT_WORDS[9]
+        + language + ". "
+    )  # fmt: skip
+
+
+def main(batch_size: int = 1000) -> None:
+    root = Path(__file__).resolve().parent.parent
+    with open(root / "Assets" / "translations.json", encoding="utf-8") as f:
+        translations = json.load(f)
+    languages = list(translations)
+    patients = [
+        PatientData(
+            gender="Female",
+            age=20 + i % 60,
+            symptoms=f"Fever and cough for {i % 10} days",
+            history="Recent travel" if i % 2 else None,
+            language=languages[i % len(languages)],
+        )
+        for i in range(batch_size)
+    ]
+    builder = PromptBuilder(PROMPT_WORDS, translations)
+
+    assert builder.build_user_prompts(patients) == [
+        per_request_prompt(p, translations, p.language) for p in patients
+    ]
+
+    # Best of several repeats: the minimum is the least noisy estimate
+    runs, repeats = 20, 7
+    baseline = min(
+        timeit.repeat(
+            lambda: [per_request_prompt(p, translations, p.language) for p in patients],
+            number=runs,
+            repeat=repeats,
+        )
+    )
+    compiled = min(
+        timeit.repeat(lambda: builder.build_user_prompts(patients), number=runs, repeat=repeats)
+    )
+
+    per_prompt = 1e6 / (batch_size * runs)
+    print(f"batch of {batch_size} prompts, {len(languages)} languages, best of {repeats}")
+    print(f"  per-request concatenation: {baseline * per_prompt:8.2f} us/prompt")
+    print(f"  compiled batch:            {compiled * per_prompt:8.2f} us/prompt")
+    print(f"  speedup:                   {baseline / compiled:8.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
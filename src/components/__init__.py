@@ -18,11 +18,16 @@ from .language_selector import (
 )
 from .patient_form import (
     collect_patient_data,
+    enforce_pregnancy_rule,
+    pregnancy_status,
     render_medical_history_fields,
     render_patient_demographics,
+    render_patient_form,
     render_patient_summary,
     validate_minimum_data,
 )
+from .session import get_client_key, get_session_id, is_fragment_rerun
+from .state import PERSISTED_WIDGET_KEYS, SessionStateManager, get_state_manager
 
 __all__ = [
     # Donation components
@@ -42,7 +47,18 @@ __all__ = [
     # Patient form components
     "render_patient_demographics",
     "render_medical_history_fields",
+    "render_patient_form",
+    "pregnancy_status",
+    "enforce_pregnancy_rule",
     "collect_patient_data",
     "render_patient_summary",
     "validate_minimum_data",
+    # Session helpers
+    "get_client_key",
+    "get_session_id",
+    "is_fragment_rerun",
+    # Cross-page widget state
+    "PERSISTED_WIDGET_KEYS",
+    "SessionStateManager",
+    "get_state_manager",
 ]
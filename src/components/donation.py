@@ -4,11 +4,13 @@ Provides reusable donation button and QR code display.
 """
 
 from pathlib import Path
-from typing import Optional
+from typing import Any, Mapping, Optional
 
 import streamlit as st
 from streamlit.components.v1 import html
 
+from ..utils.styling import load_image_bytes
+
 
 def render_donation_button(
     username: str = "geonosislaX", text: str = "Buy me a coffee", color: str = "#FFDD00"
@@ -49,14 +51,14 @@ def render_donation_qr(qr_image_path: Path, caption: str = "", width: int = 220)
         width: Image width in pixels
     """
     if qr_image_path.exists():
-        st.image(str(qr_image_path), caption=caption, width=width)
+        st.image(load_image_bytes(qr_image_path), caption=caption, width=width)
     else:
         st.warning(f"QR code image not found: {qr_image_path}")
 
 
 def render_sidebar_donation(
     username: str = "geonosislaX",
-    translations: Optional[dict] = None,
+    translations: Optional[Mapping[str, Mapping[str, Any]]] = None,
     language: str = "English",
     qr_image_path: Optional[Path] = None,
 ) -> None:
@@ -110,7 +112,7 @@ def render_sidebar_donation(
 
 def render_inline_donation(
     username: str = "geonosislaX",
-    translations: Optional[dict] = None,
+    translations: Optional[Mapping[str, Mapping[str, Any]]] = None,
     language: str = "English",
     qr_image_path: Optional[Path] = None,
     show_separator: bool = True,
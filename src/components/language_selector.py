@@ -3,7 +3,7 @@ Language selector component for multi-language support.
 Manages language selection and state across page navigation.
 """
 
-from typing import Any, Dict
+from typing import Any, Mapping
 
 import streamlit as st
 
@@ -26,7 +26,9 @@ def initialize_language_state(default_language: str = "English") -> None:
 
 
 def render_language_selector(
-    translations: Dict[str, Dict[str, Any]], location: str = "sidebar", key: str = "lang_select"
+    translations: Mapping[str, Mapping[str, Any]],
+    location: str = "sidebar",
+    key: str = "lang_select",
 ) -> str:
     """
     Render language selection dropdown.
@@ -115,7 +117,9 @@ def handle_language_change() -> None:
 
 
 def render_language_selector_with_header(
-    translations: Dict[str, Dict[str, Any]], show_header: bool = False, location: str = "sidebar"
+    translations: Mapping[str, Mapping[str, Any]],
+    show_header: bool = False,
+    location: str = "sidebar",
 ) -> str:
     """
     Render language selector with optional header.
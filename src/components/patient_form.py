@@ -3,7 +3,7 @@ Patient form component for collecting patient information.
 Provides reusable form fields with validation and state management.
 """
 
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Mapping, Optional, Tuple
 
 import streamlit as st
 from pydantic import ValidationError
@@ -11,8 +11,39 @@ from pydantic import ValidationError
 from ..models.patient import PatientData
 
 
+def pregnancy_status(gender: str, pregnancy: str, translations: Mapping[str, Any]) -> str:
+    """
+    Apply the pregnancy rule: male patients are never pregnant.
+
+    Args:
+        gender: Selected gender (translated)
+        pregnancy: Selected pregnancy status (translated)
+        translations: Translation dictionary for current language
+
+    Returns:
+        str: Pregnancy status to use
+    """
+    if gender == translations["male"]:
+        return str(translations["no"])
+    return pregnancy
+
+
+def enforce_pregnancy_rule(translations: Mapping[str, Any]) -> None:
+    """
+    Reset the pregnancy widget for male patients.
+    Used as the form's submit callback, where widget state may still be changed.
+
+    Args:
+        translations: Translation dictionary for current language
+    """
+    if "gender" in st.session_state and "pregnant" in st.session_state:
+        st.session_state["pregnant"] = pregnancy_status(
+            st.session_state["gender"], st.session_state["pregnant"], translations
+        )
+
+
 def render_patient_demographics(
-    translations: Dict[str, Any], language: str = "English"
+    translations: Mapping[str, Any], language: str = "English", form_mode: bool = False
 ) -> Tuple[str, int, str]:
     """
     Render patient demographics section (gender, age, pregnancy).
@@ -20,6 +51,8 @@ def render_patient_demographics(
     Args:
         translations: Translation dictionary for current language
         language: Current language
+        form_mode: Rendered inside st.form; the pregnancy field cannot react to the
+            gender before submission, so the rule is applied on submit instead
 
     Returns:
         Tuple of (gender, age, pregnancy_status)
@@ -55,7 +88,9 @@ def render_patient_demographics(
 
     # Pregnancy selector (disabled for males)
     # Check if male and disable pregnancy field
-    if st.session_state.gender == trans["male"]:
+    if form_mode:
+        st.session_state.disabled = False
+    elif st.session_state.gender == trans["male"]:
         st.session_state.disabled = True
         if "pregnant" in st.session_state:
             st.session_state["pregnant"] = trans["no"]
@@ -78,11 +113,11 @@ def render_patient_demographics(
             key="pregnant",
         )
 
-    return gender, age, pregnancy
+    return gender, age, pregnancy_status(gender, pregnancy, trans)
 
 
 def render_medical_history_fields(
-    translations: Dict[str, Any], language: str = "English"
+    translations: Mapping[str, Any], language: str = "English"
 ) -> Dict[str, str]:
     """
     Render medical history input fields.
@@ -135,8 +170,50 @@ def render_medical_history_fields(
     return {"history": history, "symptoms": symptoms, "exam": exam, "lab_results": lab_results}
 
 
+def render_patient_form(
+    translations: Mapping[str, Any], language: str = "English", key: str = "patient_form"
+) -> Tuple[bool, bool]:
+    """
+    Render the patient inputs as one st.form, so a whole case entry costs one rerun.
+
+    Widget edits stay in the browser until a button is pressed; the summary preview
+    is then shown on demand. The pregnancy rule for male patients runs on submit.
+
+    Args:
+        translations: Translation dictionary for current language
+        language: Current language
+        key: Form key
+
+    Returns:
+        Tuple of (preview_clicked, submit_clicked)
+    """
+    trans = translations
+
+    with st.form(key, border=False):
+        render_patient_demographics(trans, language, form_mode=True)
+        render_medical_history_fields(trans, language)
+
+        st.write("")
+        col1, col2 = st.columns([1, 4])
+        with col1:
+            submit = st.form_submit_button(
+                f"**{trans['submit']}**",
+                help=f":green[**{trans['submit_help']}**]",
+                on_click=enforce_pregnancy_rule,
+                args=(trans,),
+            )
+        with col2:
+            preview = st.form_submit_button(
+                trans.get("preview", "Preview summary"),
+                on_click=enforce_pregnancy_rule,
+                args=(trans,),
+            )
+
+    return preview, submit
+
+
 def collect_patient_data(
-    translations: Dict[str, Any], language: str = "English"
+    translations: Mapping[str, Any], language: str = "English"
 ) -> Optional[PatientData]:
     """
     Collect and validate patient data from form.
@@ -182,7 +259,7 @@ def collect_patient_data(
 
 
 def render_patient_summary(
-    patient_data: PatientData, translations: Dict[str, Any], language: str = "English"
+    patient_data: PatientData, translations: Mapping[str, Any], language: str = "English"
 ) -> str:
     """
     Render HTML summary of patient data for display.
@@ -221,7 +298,7 @@ def render_patient_summary(
 
 
 def validate_minimum_data(
-    patient_data: Optional[PatientData], translations: Dict[str, Any]
+    patient_data: Optional[PatientData], translations: Mapping[str, Any]
 ) -> bool:
     """
     Validate that patient has minimum required data.
@@ -0,0 +1,53 @@
+"""
+Session helpers for Streamlit pages.
+Identifies the current browser session and the kind of script run.
+"""
+
+import hashlib
+from typing import Optional
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+
+def get_session_id() -> str:
+    """
+    Get the ID of the Streamlit session running the current script.
+
+    Returns:
+        str: Session ID, or "unknown" outside a Streamlit script run
+    """
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return "unknown"
+    return str(ctx.session_id)
+
+
+def get_client_key() -> Optional[str]:
+    """
+    Identify the browser behind the current session, across page reloads.
+
+    A reload opens a new session; the client's address and user agent stay the same.
+
+    Returns:
+        str: Hash of the client's IP address and User-Agent, or None if unknown
+    """
+    try:
+        ip_address = st.context.ip_address
+        user_agent = st.context.headers.get("User-Agent")
+    except Exception:
+        return None
+    if not ip_address or not user_agent:
+        return None
+    return hashlib.sha256(f"{ip_address}\n{user_agent}".encode()).hexdigest()
+
+
+def is_fragment_rerun() -> bool:
+    """
+    Check whether the current script run only reruns fragments (st.fragment).
+
+    Returns:
+        bool: True for a fragment rerun, False for a full rerun or outside Streamlit
+    """
+    ctx = get_script_run_ctx()
+    return bool(ctx is not None and getattr(ctx, "fragment_ids_this_run", None))
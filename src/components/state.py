@@ -0,0 +1,140 @@
+"""
+Session-state manager for widget values shared across pages.
+Streamlit drops a widget's state at the end of any run that does not render it,
+so values typed on one page are lost after visiting another. Instead of rewriting
+every session key on every rerun, pages declare the widget keys that must persist;
+only those are copied into a compact per-session store and restored on demand.
+"""
+
+import fnmatch
+from typing import Any, Dict, Iterable, MutableMapping, Optional, Tuple
+
+import streamlit as st
+
+from ..utils.session_memory import DEFAULT_EVICTABLE_KEYS
+
+# Widget keys of the diagnosis form and the language selector
+PERSISTED_WIDGET_KEYS: Tuple[str, ...] = (
+    "lang_select",
+    "gender",
+    "age",
+    "pregnant",
+    "context",
+    "symptoms",
+    "exam",
+    "labresults",
+)
+
+STORE_KEY = "_persisted_widgets"
+
+
+class SessionStateManager:
+    """
+    Persists declared widget keys of one session across page switches.
+
+    The store is a plain (non-widget) session-state entry, so Streamlit keeps it
+    across pages without any per-rerun copying. Large artifacts such as diagnoses
+    and images are plain session-state keys already and are never declared, so
+    they stay out of the widget-state roundtrip.
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[str] = PERSISTED_WIDGET_KEYS,
+        state: Optional[MutableMapping[str, Any]] = None,
+        store_key: str = STORE_KEY,
+    ):
+        """
+        Args:
+            keys: Widget keys that persist across pages
+            state: Session state mapping (default: st.session_state)
+            store_key: Session-state key of the per-session store
+        """
+        self._state = state
+        self.store_key = store_key
+        self.keys: Tuple[str, ...] = ()
+        self.declare(*keys)
+
+    @property
+    def state(self) -> MutableMapping[str, Any]:
+        return st.session_state if self._state is None else self._state
+
+    @property
+    def store(self) -> Dict[str, Any]:
+        """Persisted widget values of this session."""
+        store = self.state.get(self.store_key)
+        if store is None:
+            store = self.state[self.store_key] = {}
+        return store
+
+    def declare(self, *keys: str) -> None:
+        """
+        Add widget keys to persist across pages.
+
+        Raises:
+            ValueError: If a key names a large artifact (see DEFAULT_EVICTABLE_KEYS)
+        """
+        for key in keys:
+            if any(fnmatch.fnmatchcase(key, pattern) for pattern in DEFAULT_EVICTABLE_KEYS):
+                raise ValueError(f"'{key}' holds a large artifact and cannot be persisted")
+            if key not in self.keys:
+                self.keys += (key,)
+
+    def capture(self) -> None:
+        """Copy the current values of declared widgets into the store."""
+        state = self.state
+        store = self.store
+        for key in self.keys:
+            if key in state:
+                store[key] = state[key]
+
+    def restore(self, keys: Optional[Iterable[str]] = None) -> None:
+        """
+        Put stored values back into session state for widgets about to be rendered.
+        Keys already in session state are left alone.
+
+        Args:
+            keys: Keys the page renders (default: all declared keys)
+        """
+        state = self.state
+        store = self.store
+        for key in self.keys if keys is None else keys:
+            if key not in state and key in store:
+                state[key] = store[key]
+
+    def sync(self, restore: bool = False) -> None:
+        """
+        Capture the widget values sent with this rerun, optionally restoring missing ones.
+        Call at the top of every page, before any widget is rendered.
+
+        Args:
+            restore: Whether the page renders the declared widgets
+        """
+        self.capture()
+        if restore:
+            self.restore()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Read a persisted value without restoring it into widget state."""
+        if key in self.state:
+            return self.state[key]
+        return self.store.get(key, default)
+
+    def forget(self, *keys: str) -> None:
+        """Drop keys from the store, e.g. when their widget options change."""
+        store = self.store
+        for key in keys:
+            store.pop(key, None)
+
+
+def get_state_manager(keys: Iterable[str] = PERSISTED_WIDGET_KEYS) -> SessionStateManager:
+    """
+    Get a state manager bound to the current session.
+
+    Args:
+        keys: Widget keys that persist across pages
+
+    Returns:
+        SessionStateManager: Manager over st.session_state
+    """
+    return SessionStateManager(keys)
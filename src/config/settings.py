@@ -45,6 +45,15 @@ class Settings:
         self.use_structured_outputs: bool = st.secrets.get("use_structured_outputs", False)
         self.use_gpt5_mini_prompts: bool = st.secrets.get("use_gpt5_mini_prompts", False)
 
+        # Observability Configuration
+        self.tracing_enabled: bool = st.secrets.get("tracing_enabled", False)
+        self.tracing_jsonl_path: str = st.secrets.get("tracing_jsonl_path", "")
+        self.tracing_otlp_endpoint: str = st.secrets.get("tracing_otlp_endpoint", "")
+        self.metrics_port: int = int(st.secrets.get("metrics_port", 0))
+        self.metrics_file: str = st.secrets.get("metrics_file", "")
+        self.log_file: str = st.secrets.get("log_file", "")
+        self.log_json: bool = st.secrets.get("log_json", False)
+
         # Donation Configuration
         self.bmc_username: str = "geonosislaX"
 
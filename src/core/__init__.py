@@ -5,14 +5,41 @@ from .ai_client import (
     LegacyAIClient,
     StructuredDiagnosisOutput,
 )
+from .cancellation import CancellationToken, DiagnosisCancelledError
+from .conversation import Conversation, ConversationManager
+from .diagnosis_renderer import DiagnosisRenderer
+from .diagnosis_translator import DiagnosisTranslator
+from .ensemble import DiagnosisEnsemble, EnsembleResult
+from .incremental import CaseConversation
+from .jobs import DiagnosisJob, JobExecutor, JobState
 from .prompt_builder import PromptBuilder
 from .prompts import GPT5MiniPrompts, create_enhanced_prompts
+from .speculation import SpeculationManager
+from .triage import DiagnosisTriage, TriageOutput
+from .urgency import UrgencyAssessment, assess_urgency
 
 __all__ = [
     "DiagnosisAIClient",
     "LegacyAIClient",
     "StructuredDiagnosisOutput",
+    "CancellationToken",
+    "DiagnosisCancelledError",
+    "Conversation",
+    "ConversationManager",
+    "DiagnosisRenderer",
+    "DiagnosisTranslator",
+    "DiagnosisEnsemble",
+    "EnsembleResult",
+    "CaseConversation",
+    "DiagnosisJob",
+    "JobExecutor",
+    "JobState",
     "PromptBuilder",
     "GPT5MiniPrompts",
     "create_enhanced_prompts",
+    "SpeculationManager",
+    "DiagnosisTriage",
+    "TriageOutput",
+    "UrgencyAssessment",
+    "assess_urgency",
 ]
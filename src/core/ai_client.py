@@ -4,13 +4,19 @@ Handles all interactions with the OpenAI API using the modern SDK (v1.x+).
 Optimized for GPT-5 Mini with structured outputs and latest best practices.
 """
 
-from typing import Any, Dict, Literal, Optional
+import hashlib
+import time
+from typing import Any, Dict, Literal, Mapping, Optional, Type
 
 import openai
-from openai import OpenAI
+from openai import DefaultHttpxClient, OpenAI
 from pydantic import BaseModel, Field
 
 from ..utils.logger import get_logger
+from ..utils.metrics import get_diagnosis_metrics
+from ..utils.tracing import current_span, get_tracer
+from .cancellation import CancellationToken, DiagnosisCancelledError, current_cancel_token
+from .diagnosis_renderer import DiagnosisRenderer
 
 
 class StructuredDiagnosisOutput(BaseModel):
@@ -37,6 +43,46 @@ class StructuredDiagnosisOutput(BaseModel):
     reasoning: str = Field(description="Brief explanation of the diagnostic reasoning")
 
 
+def prompt_cache_key(system_prompt: str) -> str:
+    """
+    Upstream prompt-cache routing key for requests sharing a system prompt.
+    Requests with the same key and prefix are routed to the same cache, so passing
+    it to every stage of a case keeps the shared prefix cached.
+    """
+    return "mdxapp-" + hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def json_schema_response_format(model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Strict `json_schema` response format for a Pydantic model (the schema `parse()`
+    sends), for requests that stream the JSON and validate it locally.
+    Strict mode requires every property and forbids additional ones, at every level.
+    """
+
+    def _strict(node: Any) -> None:
+        if isinstance(node, dict):
+            if node.get("type") == "object" and "properties" in node:
+                node["required"] = list(node["properties"])
+                node["additionalProperties"] = False
+            for value in node.values():
+                _strict(value)
+        elif isinstance(node, list):
+            for value in node:
+                _strict(value)
+
+    schema = model.model_json_schema()
+    _strict(schema)
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": model.__name__, "schema": schema, "strict": True},
+    }
+
+
+def _record_http_response(response: Any) -> None:
+    """httpx response hook feeding upstream status codes (429s, retries) into metrics."""
+    get_diagnosis_metrics().record_http_status(response.status_code)
+
+
 class DiagnosisAIClient:
     """
     Wrapper for OpenAI API interactions with error handling and retry logic.
@@ -69,7 +115,10 @@ class DiagnosisAIClient:
             - frequency_penalty: Not supported
             - presence_penalty: Not supported
         """
-        self.client = OpenAI(api_key=api_key)
+        self.client = OpenAI(
+            api_key=api_key,
+            http_client=DefaultHttpxClient(event_hooks={"response": [_record_http_response]}),
+        )
         self.model = model
         self.is_gpt5_mini = "gpt-5" in model.lower()
         self.temperature = (
@@ -78,6 +127,7 @@ class DiagnosisAIClient:
         self.max_completion_tokens = max_tokens
         self.frequency_penalty = frequency_penalty if not self.is_gpt5_mini else None
         self.presence_penalty = presence_penalty if not self.is_gpt5_mini else None
+        self.renderer = DiagnosisRenderer()
         self.logger = get_logger(__name__)
 
         if self.is_gpt5_mini:
@@ -95,12 +145,22 @@ class DiagnosisAIClient:
             system_prompt: System-level instruction for AI behavior
             user_prompt: User query containing patient information
             **kwargs: Optional overrides for temperature, max_tokens, etc.
+                      Pass stream=True to stream the response (enables time-to-first-token tracing)
+                      and cancel_token to override the current job's cancellation token;
+                      prompt_cache_key routes the request to a shared prompt cache;
+                      history: earlier turns of the case, sent between system and user prompt
 
         Returns:
             str: AI-generated diagnosis text, or None if error occurs
+
+        Raises:
+            DiagnosisCancelledError: If the cancellation token fired (stream closed early)
         """
         # Allow per-request overrides
         max_completion_tokens = kwargs.get("max_completion_tokens", self.max_completion_tokens)
+        stream = kwargs.get("stream", False)
+        token = kwargs.get("cancel_token") or current_cancel_token()
+        tracer = get_tracer()
 
         try:
             self.logger.info("Requesting diagnosis from OpenAI API")
@@ -110,10 +170,13 @@ class DiagnosisAIClient:
                 "model": self.model,
                 "messages": [
                     {"role": "system", "content": system_prompt},
+                    *kwargs.get("history", ()),
                     {"role": "user", "content": user_prompt},
                 ],
                 "max_completion_tokens": max_completion_tokens,
             }
+            if kwargs.get("prompt_cache_key"):
+                params["prompt_cache_key"] = kwargs["prompt_cache_key"]
 
             # Only add these parameters for non-GPT-5 models
             if not self.is_gpt5_mini:
@@ -127,20 +190,33 @@ class DiagnosisAIClient:
                     params["presence_penalty"] = kwargs.get(
                         "presence_penalty", self.presence_penalty
                     )
+            self._apply_deadline(params, token)
 
-            response = self.client.chat.completions.create(**params)
+            metrics = get_diagnosis_metrics()
+            upstream_span = tracer.span("upstream_call", model=self.model, stream=stream)
+            with upstream_span, metrics.track_request(self.model):
+                if stream:
+                    diagnosis = self._stream_completion(params, token)
+                else:
+                    response = self.client.chat.completions.create(**params)
+                    metrics.record_usage(self.model, response.usage)
 
-            # Extract response content
-            diagnosis = response.choices[0].message.content
+                    # Extract response content
+                    diagnosis = response.choices[0].message.content
 
             # Clean up any trailing tokens
             if diagnosis:
                 cleaned = diagnosis.replace("<|im_end|>", "").strip()
                 self.logger.info("Successfully received diagnosis from OpenAI API")
                 return str(cleaned)
-            
+
+            if token is not None:
+                token.raise_if_cancelled()
             return None
 
+        except DiagnosisCancelledError:
+            raise
+
         except openai.AuthenticationError as e:
             self.logger.error(f"OpenAI authentication error: {e}")
             return None
@@ -161,6 +237,85 @@ class DiagnosisAIClient:
             self.logger.error(f"Unexpected error during OpenAI API call: {e}")
             return None
 
+    @staticmethod
+    def _apply_deadline(params: Dict[str, Any], token: Optional[CancellationToken]) -> None:
+        """
+        Refuse to start a cancelled request and bound the HTTP call by the deadline.
+
+        Raises:
+            DiagnosisCancelledError: If the token already fired
+        """
+        if token is None:
+            return
+        token.raise_if_cancelled()
+        remaining = token.remaining()
+        if remaining is not None:
+            params["timeout"] = remaining
+
+    def _stream_completion(
+        self, params: Dict[str, Any], token: Optional[CancellationToken] = None
+    ) -> Optional[str]:
+        """
+        Run a streaming chat completion and concatenate the content deltas.
+        Records time to first token (metric and trace span) and final token usage.
+        Cancelling `token` closes the HTTP stream; the tokens that were not generated
+        are reported as savings.
+
+        Args:
+            params: Chat completion parameters (without `stream`)
+            token: Cancellation token of the request
+
+        Returns:
+            str: Full response content, or None if nothing was generated or cancelled
+        """
+        tracer = get_tracer()
+        metrics = get_diagnosis_metrics()
+        start_ns = time.time_ns()
+        first_token = True
+        parts = []
+
+        stream = self.client.chat.completions.create(
+            stream=True, stream_options={"include_usage": True}, **params
+        )
+        if token is not None:
+            # Closing the response aborts a blocked read and releases the connection
+            token.on_cancel(stream.close)
+        try:
+            for chunk in stream:
+                if token is not None and token.cancelled:
+                    break
+                if getattr(chunk, "usage", None):
+                    metrics.record_usage(self.model, chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if first_token:
+                    first_token_ns = time.time_ns()
+                    tracer.record_span("time_to_first_token", start_ns, first_token_ns)
+                    metrics.record_ttft(self.model, (first_token_ns - start_ns) / 1e9)
+                    first_token = False
+                parts.append(delta)
+        except Exception:
+            # Reading a stream closed by the canceller fails; anything else is a real error
+            if token is None or not token.cancelled:
+                raise
+
+        if token is not None and token.reason is not None:
+            stream.close()
+            # One content delta is about one token
+            saved = metrics.record_cancellation(
+                self.model, token.reason, len(parts), params["max_completion_tokens"]
+            )
+            span = current_span()
+            if span is not None:
+                span.set_attribute("cancelled", token.reason)
+            self.logger.info(f"Diagnosis stream closed ({token.reason}), ~{saved} tokens saved")
+            return None
+
+        return "".join(parts) if parts else None
+
     def get_diagnosis_metadata(
         self, system_prompt: str, user_prompt: str, **kwargs: Any
     ) -> Optional[Dict[str, Any]]:
@@ -201,7 +356,10 @@ class DiagnosisAIClient:
                         "presence_penalty", self.presence_penalty
                     )
 
-            response = self.client.chat.completions.create(**params)
+            metrics = get_diagnosis_metrics()
+            upstream_span = get_tracer().span("upstream_call", model=self.model)
+            with upstream_span, metrics.track_request(self.model):
+                response = self.client.chat.completions.create(**params)
 
             diagnosis = response.choices[0].message.content
             if diagnosis:
@@ -209,11 +367,7 @@ class DiagnosisAIClient:
 
             usage_data = {}
             if response.usage:
-                usage_data = {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens,
-                }
+                usage_data = metrics.record_usage(self.model, response.usage)
 
             return {
                 "diagnosis": diagnosis,
@@ -237,12 +391,22 @@ class DiagnosisAIClient:
             system_prompt: System-level instruction for AI behavior
             user_prompt: User query containing patient information
             **kwargs: Optional overrides for temperature, max_tokens, etc.
+                      Pass cancel_token to override the current job's cancellation token
+                      and prompt_cache_key to route the request to a shared prompt cache;
+                      stream=True streams the JSON so cancellation can close the request;
+                      history: earlier turns of the case, sent between system and user prompt
 
         Returns:
             StructuredDiagnosisOutput: Structured diagnosis with all components,
                                        or None if error occurs
+
+        Raises:
+            DiagnosisCancelledError: If the cancellation token fired (before the request,
+                                     or during a streamed one)
         """
         max_completion_tokens = kwargs.get("max_completion_tokens", self.max_completion_tokens)
+        stream = kwargs.get("stream", False)
+        token = kwargs.get("cancel_token") or current_cancel_token()
 
         try:
             self.logger.info("Requesting structured diagnosis from OpenAI API")
@@ -252,25 +416,52 @@ class DiagnosisAIClient:
                 "model": self.model,
                 "messages": [
                     {"role": "system", "content": system_prompt},
+                    *kwargs.get("history", ()),
                     {"role": "user", "content": user_prompt},
                 ],
                 "response_format": StructuredDiagnosisOutput,
                 "max_completion_tokens": max_completion_tokens,
             }
+            if kwargs.get("prompt_cache_key"):
+                params["prompt_cache_key"] = kwargs["prompt_cache_key"]
 
             # Only add temperature for non-GPT-5 models
             if not self.is_gpt5_mini and self.temperature is not None:
                 params["temperature"] = kwargs.get("temperature", self.temperature)
+            # Non-streamed calls can only be cancelled before sending; the deadline bounds them
+            self._apply_deadline(params, token)
 
             # Use structured outputs with response_format parameter
-            completion = self.client.beta.chat.completions.parse(**params)
+            metrics = get_diagnosis_metrics()
+            upstream_span = get_tracer().span(
+                "upstream_call", model=self.model, structured=True, stream=stream
+            )
+            with upstream_span, metrics.track_request(self.model):
+                if stream:
+                    # Same JSON schema as parse(); the streamed JSON is validated locally
+                    params["response_format"] = json_schema_response_format(
+                        StructuredDiagnosisOutput
+                    )
+                    content = self._stream_completion(params, token)
+                    diagnosis_output = (
+                        StructuredDiagnosisOutput.model_validate_json(content) if content else None
+                    )
+                else:
+                    completion = self.client.beta.chat.completions.parse(**params)
+                    metrics.record_usage(self.model, completion.usage)
+
+                    # Extract structured output
+                    diagnosis_output = completion.choices[0].message.parsed
 
-            # Extract structured output
-            diagnosis_output = completion.choices[0].message.parsed
+            if diagnosis_output is None and token is not None:
+                token.raise_if_cancelled()
 
             self.logger.info("Successfully received structured diagnosis")
             return diagnosis_output
 
+        except DiagnosisCancelledError:
+            raise
+
         except openai.AuthenticationError as e:
             self.logger.error(f"OpenAI authentication error: {e}")
             return None
@@ -292,7 +483,10 @@ class DiagnosisAIClient:
             return None
 
     def format_structured_diagnosis(
-        self, diagnosis: StructuredDiagnosisOutput, language: str = "English"
+        self,
+        diagnosis: StructuredDiagnosisOutput,
+        language: str = "English",
+        translations: Optional[Mapping[str, Mapping[str, str]]] = None,
     ) -> str:
         """
         Format structured diagnosis output as HTML for display.
@@ -300,48 +494,12 @@ class DiagnosisAIClient:
         Args:
             diagnosis: Structured diagnosis output
             language: Language for formatting
+            translations: Translations providing the localized headings
 
         Returns:
             str: HTML-formatted diagnosis for Streamlit display
         """
-        # Create formatted HTML output
-        html_output = f"""
-<div style="font-size: 16px; line-height: 1.6;">
-    <h3 style="color: #1f77b4;">🔍 Primary Diagnosis</h3>
-    <p style="font-size: 18px;"><strong>{diagnosis.primary_diagnosis}</strong></p>
-    <p style="font-size: 14px; color: #666;">Confidence: {diagnosis.confidence_level.upper()}</p>
-
-    <h3 style="color: #ff7f0e; margin-top: 20px;">🔬 Differential Diagnoses</h3>
-    <ul>
-"""
-        for diff_dx in diagnosis.differential_diagnoses:
-            html_output += f"        <li>{diff_dx}</li>\n"
-
-        html_output += """    </ul>
-
-    <h3 style="color: #2ca02c; margin-top: 20px;">📋 Recommended Next Steps</h3>
-    <ol>
-"""
-        for step in diagnosis.recommended_next_steps:
-            html_output += f"        <li>{step}</li>\n"
-
-        html_output += """    </ol>
-
-    <h3 style="color: #d62728; margin-top: 20px;">⚠️ Important Considerations</h3>
-    <ul>
-"""
-        for consideration in diagnosis.important_considerations:
-            html_output += f"        <li>{consideration}</li>\n"
-
-        html_output += f"""    </ul>
-
-    <h3 style="color: #9467bd; margin-top: 20px;">💡 Clinical Reasoning</h3>
-    <p style="background-color: #f0f0f0; padding: 15px; border-radius: 5px;">
-        {diagnosis.reasoning}
-    </p>
-</div>
-"""
-        return html_output
+        return self.renderer.render(diagnosis, language, translations)
 
 
 class LegacyAIClient:
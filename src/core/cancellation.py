@@ -0,0 +1,126 @@
+"""
+Cancellation tokens and deadlines for in-flight diagnosis requests.
+A token travels with a job (through a context variable, like the current trace
+span) so the AI client can stop reading, close the HTTP stream and free its
+worker as soon as the user cancels, the deadline passes or the session is gone.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional
+
+from ..utils.logger import get_logger
+
+# Why a request was cancelled (metric label values)
+REASON_CANCELLED = "cancelled"
+REASON_DEADLINE = "deadline"
+REASON_ABANDONED = "abandoned"
+REASON_SUPERSEDED = "superseded"
+REASON_CONSENSUS = "consensus"
+
+_current_token: ContextVar[Optional["CancellationToken"]] = ContextVar(
+    "mdxapp_cancel_token", default=None
+)
+
+logger = get_logger(__name__)
+
+
+class DiagnosisCancelledError(Exception):
+    """Raised when a request is abandoned because its token was cancelled."""
+
+    def __init__(self, reason: str = REASON_CANCELLED):
+        super().__init__(f"Diagnosis request {reason}")
+        self.reason = reason
+
+
+class CancellationToken:
+    """
+    One-shot cancellation flag with an optional deadline.
+
+    Callbacks registered with `on_cancel` (e.g. closing an HTTP stream) run once,
+    in the thread that cancels. The deadline is checked lazily by `cancelled` and
+    enforced actively by whoever calls `expire` (the job executor's watchdog).
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        Args:
+            timeout: Seconds from now until the deadline (None: no deadline)
+        """
+        self.deadline = time.time() + timeout if timeout is not None else None
+        self.reason: Optional[str] = None
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the token was cancelled or its deadline has passed."""
+        return self.reason is not None or self.expire()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the deadline (None: no deadline)."""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.time(), 0.0)
+
+    def cancel(self, reason: str = REASON_CANCELLED) -> bool:
+        """
+        Cancel the token and run its callbacks.
+
+        Args:
+            reason: Why the request is cancelled
+
+        Returns:
+            bool: False if the token was already cancelled
+        """
+        with self._lock:
+            if self.reason is not None:
+                return False
+            self.reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Cancellation callback failed: {e}")
+        return True
+
+    def expire(self, now: Optional[float] = None) -> bool:
+        """Cancel the token if its deadline has passed; returns whether it has passed."""
+        if self.deadline is None or (now if now is not None else time.time()) < self.deadline:
+            return False
+        self.cancel(REASON_DEADLINE)
+        return True
+
+    def on_cancel(self, callback: Callable[[], None]) -> None:
+        """Run `callback` on cancellation (immediately if already cancelled)."""
+        with self._lock:
+            if self.reason is None:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def raise_if_cancelled(self) -> None:
+        """
+        Raises:
+            DiagnosisCancelledError: If the token was cancelled or its deadline has passed
+        """
+        if self.cancelled:
+            raise DiagnosisCancelledError(self.reason or REASON_DEADLINE)
+
+
+def current_cancel_token() -> Optional[CancellationToken]:
+    """Token of the job running in this context, if any."""
+    return _current_token.get()
+
+
+@contextmanager
+def use_cancel_token(token: Optional[CancellationToken]) -> Iterator[None]:
+    """Make `token` the current token for the calls made inside the block."""
+    reset = _current_token.set(token)
+    try:
+        yield
+    finally:
+        _current_token.reset(reset)
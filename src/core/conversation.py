@@ -0,0 +1,371 @@
+"""
+Token-bounded multi-turn conversations with rolling summarization.
+Recent turns are replayed verbatim; once they outgrow a token window, the oldest
+ones are folded into a running summary by a small model, in the background
+between turns. Each turn's history then stays bounded, so a conversation's cost
+grows about linearly with its length instead of quadratically.
+"""
+
+import contextvars
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from ..utils.logger import get_logger
+from ..utils.metrics import DiagnosisMetrics, MetricsRegistry, RollingWindow, get_diagnosis_metrics
+from ..utils.tracing import get_tracer
+from .prompts import count_tokens
+
+SUMMARY_PROMPT = (
+    "Summarize this diagnostic conversation so it can be continued without it. Keep "
+    "every patient fact, finding and lab result, the diagnoses considered and their "
+    "current status, and open questions. Be concise; reply with the summary only."
+)
+
+SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokens of `text` (tiktoken if installed, otherwise UTF-8 bytes / 4)."""
+    counted = count_tokens(text)
+    return counted if counted is not None else len(text.encode()) // 4 + 1
+
+
+class Turn(NamedTuple):
+    """One exchange, with what it cost."""
+
+    user: str
+    assistant: str
+    tokens: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    latency: Optional[float]
+
+
+class Conversation:
+    """
+    Running summary plus the recent turns of one conversation.
+
+    `messages()` is what a follow-up replays after the system prompt. The summary
+    only changes when turns are compacted (in batches), so between compactions each
+    request extends the previous one's prefix and stays prompt-cache friendly.
+    """
+
+    def __init__(self) -> None:
+        self.summary: Optional[str] = None
+        self.summarized_turns = 0
+        self.turns: List[Turn] = []
+        # Background summary of the oldest turns: (future, number of turns it covers)
+        self._compaction: Optional[Tuple[Future, int]] = None
+
+    @property
+    def turn_count(self) -> int:
+        """Turns so far, summarized or not."""
+        return self.summarized_turns + len(self.turns)
+
+    def add_turn(
+        self,
+        user: str,
+        assistant: str,
+        usage: Optional[Mapping[str, int]] = None,
+        latency: Optional[float] = None,
+    ) -> Turn:
+        """
+        Append a finished exchange.
+
+        Args:
+            user: User message that was sent
+            assistant: Answer received
+            usage: Tokens the turn spent (`usage_scope()` totals: prompt, completion, cached)
+            latency: Seconds the turn took
+
+        Returns:
+            Turn: The recorded turn
+        """
+        usage = usage or {}
+        turn = Turn(
+            user,
+            assistant,
+            estimate_tokens(user) + estimate_tokens(assistant),
+            usage.get("prompt", 0),
+            usage.get("completion", 0),
+            usage.get("cached", 0),
+            latency,
+        )
+        self.turns.append(turn)
+        return turn
+
+    def window_tokens(self) -> int:
+        """Estimated tokens replayed by the next turn (summary and recent turns)."""
+        summary = estimate_tokens(self.summary) if self.summary else 0
+        return summary + sum(turn.tokens for turn in self.turns)
+
+    def messages(self) -> List[Dict[str, str]]:
+        """History to send between the system prompt and the next user message."""
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": SUMMARY_HEADER + self.summary})
+        for turn in self.turns:
+            messages.append({"role": "user", "content": turn.user})
+            messages.append({"role": "assistant", "content": turn.assistant})
+        return messages
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-turn token and latency figures of the turns still in the window."""
+        first = self.summarized_turns + 1
+        return [
+            {
+                "turn": first + i,
+                "prompt_tokens": turn.prompt_tokens,
+                "completion_tokens": turn.completion_tokens,
+                "cached_tokens": turn.cached_tokens,
+                "latency": turn.latency,
+            }
+            for i, turn in enumerate(self.turns)
+        ]
+
+
+class ConversationMetrics:
+    """Prompt size and latency of conversation turns, and history compactions."""
+
+    def __init__(self, registry: MetricsRegistry, window: RollingWindow):
+        """
+        Args:
+            registry: Registry the metrics are registered in
+            window: Rolling window feeding the operator dashboard
+        """
+        self.window = window
+        self.prompt_tokens = registry.histogram(
+            "mdxapp_conversation_turn_prompt_tokens",
+            "Prompt tokens per conversation turn (history included)",
+            buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+        )
+        self.turn_latency = registry.histogram(
+            "mdxapp_conversation_turn_seconds", "Latency of conversation turns"
+        )
+        self.compactions = registry.counter(
+            "mdxapp_conversation_compactions_total",
+            "Conversation histories compacted into a running summary",
+        )
+        self.compacted_tokens = registry.counter(
+            "mdxapp_conversation_compacted_tokens_total",
+            "Estimated history tokens removed from later turns by compaction",
+        )
+
+    def record_turn(
+        self, prompt_tokens: int, cached_tokens: int = 0, latency: Optional[float] = None
+    ) -> None:
+        """
+        Record one turn of a multi-turn conversation.
+
+        Args:
+            prompt_tokens: Prompt tokens the turn sent (system prompt and history included)
+            cached_tokens: Part of them served from the prompt cache
+            latency: Seconds the turn took
+        """
+        self.prompt_tokens.observe(prompt_tokens)
+        if latency is not None:
+            self.turn_latency.observe(latency)
+        self.window.add("conversation_turns")
+        self.window.add("conversation_prompt_tokens", prompt_tokens)
+        self.window.add("conversation_cached_tokens", cached_tokens)
+
+    def record_compaction(self, tokens_removed: int) -> None:
+        """Record older turns folded into a conversation's running summary."""
+        self.compactions.inc()
+        self.compacted_tokens.inc(max(tokens_removed, 0))
+        self.window.add("conversation_compactions")
+
+    def window_summary(self, seconds: float) -> Dict[str, Any]:
+        """Turns, mean prompt size, cached share and compactions over the last `seconds`."""
+        counters = self.window.summary(seconds)["counters"]
+        turns = counters.get("conversation_turns", 0.0)
+        prompt_tokens = counters.get("conversation_prompt_tokens", 0.0)
+        return {
+            "turns": turns,
+            "mean_prompt_tokens": prompt_tokens / turns if turns else None,
+            "cached_share": (
+                counters.get("conversation_cached_tokens", 0.0) / prompt_tokens
+                if prompt_tokens
+                else None
+            ),
+            "compactions": counters.get("conversation_compactions", 0.0),
+        }
+
+
+def get_conversation_metrics(metrics: Optional[DiagnosisMetrics] = None) -> ConversationMetrics:
+    """Conversation metrics in the registry and window of `metrics` (default: process metrics)."""
+    metrics = metrics or get_diagnosis_metrics()
+    return ConversationMetrics(metrics.registry, metrics.window)
+
+
+class ConversationManager:
+    """
+    Keeps conversations within a token window.
+
+    When the recent turns exceed `window_tokens`, `maintain` starts summarizing the
+    oldest ones (down to `keep_tokens`, the latest turn always kept verbatim) on a
+    background thread; `history` adopts the summary once it is ready, so no turn
+    waits for it. Summaries are cached per (previous summary, folded turns).
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        model: str = "gpt-4o-mini",
+        window_tokens: int = 3000,
+        keep_tokens: Optional[int] = None,
+        max_completion_tokens: int = 600,
+        max_entries: int = 256,
+        max_workers: int = 2,
+        metrics: Optional[DiagnosisMetrics] = None,
+    ):
+        """
+        Args:
+            client: OpenAI client (e.g. `DiagnosisAIClient.client`)
+            model: Summarization model (small and cheap; the diagnosis model is not used)
+            window_tokens: Replayed tokens that trigger a compaction
+            keep_tokens: Replayed tokens left after a compaction (default: half the window)
+            max_completion_tokens: Completion budget per summary
+            max_entries: Summaries kept in memory (least recently used dropped)
+            max_workers: Background summarization threads
+            metrics: Metrics receiving the summary requests, with the registry the turn and
+                     compaction figures are registered in (default: process metrics)
+        """
+        self.client = client
+        self.model = model
+        self.window_tokens = window_tokens
+        self.keep_tokens = keep_tokens if keep_tokens is not None else window_tokens // 2
+        self.max_completion_tokens = max_completion_tokens
+        self.max_entries = max_entries
+        self.metrics = metrics or get_diagnosis_metrics()
+        self.conversation_metrics = get_conversation_metrics(self.metrics)
+        self.logger = get_logger(__name__)
+
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="mdxapp-summary")
+
+    def history(self, conversation: Conversation) -> List[Dict[str, str]]:
+        """Messages to replay for the next turn (adopting a finished summary first)."""
+        self._adopt(conversation)
+        return conversation.messages()
+
+    def record(self, conversation: Conversation, turn: Turn) -> None:
+        """
+        Report a turn added with `Conversation.add_turn` and keep the window bounded.
+
+        Args:
+            conversation: Conversation the turn belongs to
+            turn: The recorded turn
+        """
+        self.conversation_metrics.record_turn(turn.prompt_tokens, turn.cached_tokens, turn.latency)
+        self.maintain(conversation)
+
+    def maintain(self, conversation: Conversation) -> bool:
+        """
+        Start compacting the oldest turns if the window is over budget.
+
+        Returns:
+            bool: True if a background summary was started
+        """
+        self._adopt(conversation)
+        if conversation._compaction is not None:
+            return False
+        if conversation.window_tokens() <= self.window_tokens:
+            return False
+
+        remaining = conversation.window_tokens()
+        folded = 0
+        # The latest turn stays verbatim (the answer the next turn refers to)
+        while folded < len(conversation.turns) - 1 and remaining > self.keep_tokens:
+            remaining -= conversation.turns[folded].tokens
+            folded += 1
+        if not folded:
+            return False
+
+        turns = conversation.turns[:folded]
+        future = self._pool.submit(
+            contextvars.copy_context().run, self.summarize, conversation.summary, turns
+        )
+        conversation._compaction = (future, folded)
+        return True
+
+    def summarize(self, previous: Optional[str], turns: Sequence[Turn]) -> Optional[str]:
+        """
+        Fold turns into the running summary.
+
+        Args:
+            previous: Summary so far (None for the first compaction)
+            turns: Oldest turns to fold in, in order
+
+        Returns:
+            str: New summary, or None if the call failed
+        """
+        transcript = "\n\n".join(
+            f"User: {turn.user}\nAssistant: {turn.assistant}" for turn in turns
+        )
+        if previous:
+            transcript = f"{SUMMARY_HEADER}{previous}\n\n{transcript}"
+        key = hashlib.sha256(transcript.encode()).hexdigest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.metrics.record_cache("conversation_summary", True)
+                return cached
+        self.metrics.record_cache("conversation_summary", False)
+
+        try:
+            summary_span = get_tracer().span("summary_call", model=self.model, turns=len(turns))
+            with summary_span, self.metrics.track_request(self.model):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": SUMMARY_PROMPT},
+                        {"role": "user", "content": transcript},
+                    ],
+                    max_completion_tokens=self.max_completion_tokens,
+                )
+                self.metrics.record_usage(self.model, response.usage)
+        except Exception as e:
+            self.logger.error(f"Conversation summary failed: {e}")
+            return None
+
+        content = response.choices[0].message.content
+        if not content:
+            return None
+        summary = str(content).strip()
+        with self._lock:
+            self._cache[key] = summary
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return summary
+
+    def _adopt(self, conversation: Conversation) -> None:
+        """Swap finished background summaries in (called from the conversation's thread)."""
+        if conversation._compaction is None:
+            return
+        future, folded = conversation._compaction
+        if not future.done():
+            return
+        conversation._compaction = None
+        summary = future.result()
+        if summary is None:
+            return
+        before = conversation.window_tokens()
+        conversation.summary = summary
+        conversation.summarized_turns += folded
+        del conversation.turns[:folded]
+        self.conversation_metrics.record_compaction(before - conversation.window_tokens())
+        self.logger.info(
+            f"Compacted {folded} turns into the summary "
+            f"({before} -> {conversation.window_tokens()} tokens)"
+        )
+
+    def shutdown(self) -> None:
+        """Stop the summarization threads (tests; the page keeps one manager per process)."""
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,179 @@
+"""
+HTML rendering of structured diagnoses.
+Compiles one localized template per language and memoizes rendered diagnoses, so
+reruns and language switches re-render without touching the model.
+"""
+
+import hashlib
+import html
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Mapping, NamedTuple, Optional, Tuple
+
+from ..utils.logger import get_logger
+
+if TYPE_CHECKING:
+    from .ai_client import StructuredDiagnosisOutput
+
+# Translation keys used by the renderer, with the English defaults
+DIAGNOSIS_LABELS: Dict[str, str] = {
+    "dx_primary": "Primary Diagnosis",
+    "dx_confidence": "Confidence",
+    "dx_differential": "Differential Diagnoses",
+    "dx_next_steps": "Recommended Next Steps",
+    "dx_considerations": "Important Considerations",
+    "dx_reasoning": "Clinical Reasoning",
+    "dx_conf_high": "high",
+    "dx_conf_medium": "medium",
+    "dx_conf_low": "low",
+}
+
+
+class _DiagnosisTemplate(NamedTuple):
+    """
+    A diagnosis page with every heading resolved for one language.
+
+    `parts` holds the seven literal segments around the six fields (primary
+    diagnosis, confidence, differentials, next steps, considerations, reasoning).
+    """
+
+    parts: Tuple[str, ...]
+    confidence: Dict[str, str]
+
+    def render(self, diagnosis: "StructuredDiagnosisOutput") -> str:
+        parts = self.parts
+        escape = html.escape
+        level = diagnosis.confidence_level
+        return "".join(
+            (
+                parts[0],
+                escape(diagnosis.primary_diagnosis),
+                parts[1],
+                self.confidence.get(level, escape(level.upper())),
+                parts[2],
+                _items(diagnosis.differential_diagnoses),
+                parts[3],
+                _items(diagnosis.recommended_next_steps),
+                parts[4],
+                _items(diagnosis.important_considerations),
+                parts[5],
+                escape(diagnosis.reasoning),
+                parts[6],
+            )
+        )
+
+
+def _items(values: Iterable[str]) -> str:
+    """Render list entries as escaped <li> elements."""
+    return "".join(f"        <li>{html.escape(value)}</li>\n" for value in values)
+
+
+def _compile(translations: Mapping[str, Mapping[str, str]], language: str) -> _DiagnosisTemplate:
+    """Resolve the headings of one language into a template."""
+    trans = translations.get(language) or translations.get("English") or {}
+    label = {key: html.escape(trans.get(key, default)) for key, default in DIAGNOSIS_LABELS.items()}
+    parts = (
+        '\n<div style="font-size: 16px; line-height: 1.6;">\n'
+        f'    <h3 style="color: #1f77b4;">🔍 {label["dx_primary"]}</h3>\n'
+        '    <p style="font-size: 18px;"><strong>',
+        "</strong></p>\n"
+        f'    <p style="font-size: 14px; color: #666;">{label["dx_confidence"]}: ',
+        "</p>\n\n"
+        f'    <h3 style="color: #ff7f0e; margin-top: 20px;">🔬 {label["dx_differential"]}</h3>\n'
+        "    <ul>\n",
+        "    </ul>\n\n"
+        f'    <h3 style="color: #2ca02c; margin-top: 20px;">📋 {label["dx_next_steps"]}</h3>\n'
+        "    <ol>\n",
+        "    </ol>\n\n"
+        f'    <h3 style="color: #d62728; margin-top: 20px;">⚠️ {label["dx_considerations"]}</h3>\n'
+        "    <ul>\n",
+        "    </ul>\n\n"
+        f'    <h3 style="color: #9467bd; margin-top: 20px;">💡 {label["dx_reasoning"]}</h3>\n'
+        '    <p style="background-color: #f0f0f0; padding: 15px; border-radius: 5px;">\n'
+        "        ",
+        "\n    </p>\n</div>\n",
+    )
+    confidence = {level: label[f"dx_conf_{level}"].upper() for level in ("high", "medium", "low")}
+    return _DiagnosisTemplate(parts, confidence)
+
+
+def diagnosis_digest(diagnosis: "StructuredDiagnosisOutput") -> str:
+    """Content hash of a structured diagnosis (the memoization key)."""
+    return hashlib.sha256(diagnosis.model_dump_json().encode("utf-8")).hexdigest()
+
+
+class _RenderCache:
+    """Compiled templates and memoized renders for one translations object."""
+
+    def __init__(self, translations: Any):
+        self.translations = translations
+        self.templates: Dict[str, _DiagnosisTemplate] = {}
+        self.renders: OrderedDict[Tuple[str, str], str] = OrderedDict()
+
+
+class DiagnosisRenderer:
+    """
+    Renders structured diagnoses as localized, HTML-escaped markup.
+
+    Templates are compiled once per language and renders are memoized per
+    (diagnosis hash, language). Both caches are tied to the translations object
+    passed to `render()`, so reloaded translations start fresh caches and the
+    renderer can be shared across sessions without mutating it per request.
+    """
+
+    def __init__(
+        self,
+        translations: Optional[Mapping[str, Mapping[str, str]]] = None,
+        max_entries: int = 256,
+    ):
+        """
+        Args:
+            translations: Default translations per language (default: English labels only)
+            max_entries: Rendered diagnoses kept in memory (least recently used dropped)
+        """
+        self.translations: Mapping[str, Mapping[str, str]] = translations or {}
+        self.max_entries = max_entries
+        self.logger = get_logger(__name__)
+
+        self._cache = _RenderCache(None)
+        self._lock = threading.Lock()
+
+    def render(
+        self,
+        diagnosis: "StructuredDiagnosisOutput",
+        language: str = "English",
+        translations: Optional[Mapping[str, Mapping[str, str]]] = None,
+    ) -> str:
+        """
+        Render a structured diagnosis as HTML.
+
+        Args:
+            diagnosis: Structured diagnosis output
+            language: Language of the headings
+            translations: Translations snapshot to use (default: `self.translations`)
+
+        Returns:
+            str: HTML-formatted diagnosis for Streamlit display
+        """
+        translations = translations if translations is not None else self.translations
+        key = (diagnosis_digest(diagnosis), language)
+        with self._lock:
+            cache = self._cache
+            if cache.translations is not translations:
+                cache = self._cache = _RenderCache(translations)
+            template = cache.templates.get(language)
+            if template is None:
+                template = cache.templates[language] = _compile(translations, language)
+            rendered = cache.renders.get(key)
+            if rendered is not None:
+                cache.renders.move_to_end(key)
+                return rendered
+
+        rendered = template.render(diagnosis)
+        # Stored in the cache the template came from: if other translations replaced
+        # it meanwhile, this render is dropped with it
+        with self._lock:
+            cache.renders[key] = rendered
+            while len(cache.renders) > self.max_entries:
+                cache.renders.popitem(last=False)
+        return rendered
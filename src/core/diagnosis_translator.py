@@ -0,0 +1,174 @@
+"""
+Translation of stored diagnoses into another display language.
+Uses one cheap small-model call per (diagnosis, language) instead of re-running
+the full diagnosis, and caches the result.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple, Union
+
+import openai
+from pydantic import BaseModel
+
+from ..utils.logger import get_logger
+from ..utils.metrics import get_diagnosis_metrics
+from ..utils.tracing import get_tracer
+from .ai_client import StructuredDiagnosisOutput
+from .diagnosis_renderer import diagnosis_digest
+
+Diagnosis = Union[str, StructuredDiagnosisOutput]
+
+TEXT_TRANSLATION_PROMPT = (
+    "Translate the following medical diagnosis into {language}. Keep medical terms "
+    "accurate and preserve the markdown/HTML formatting, lists and numbers. "
+    "Reply with the translation only."
+)
+
+STRUCTURED_TRANSLATION_PROMPT = (
+    "Translate every string value of this JSON medical diagnosis into {language}. "
+    "Keep medical terms accurate and keep each list's length and order."
+)
+
+
+class _TranslatedFields(BaseModel):
+    """Free-text fields of StructuredDiagnosisOutput (confidence_level is not translated)."""
+
+    primary_diagnosis: str
+    differential_diagnoses: list[str]
+    recommended_next_steps: list[str]
+    important_considerations: list[str]
+    reasoning: str
+
+
+class DiagnosisTranslator:
+    """
+    Translates plain or structured diagnoses with a small model.
+
+    Structured diagnoses are translated in one batched request (all fields as one
+    JSON document). Results are cached per (diagnosis hash, target language).
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        model: str = "gpt-4o-mini",
+        max_completion_tokens: int = 2000,
+        max_entries: int = 256,
+    ):
+        """
+        Args:
+            client: OpenAI client (e.g. `DiagnosisAIClient.client`)
+            model: Translation model (small and cheap; the diagnosis model is not used)
+            max_completion_tokens: Completion budget per translation
+            max_entries: Translations kept in memory (least recently used dropped)
+        """
+        self.client = client
+        self.model = model
+        self.max_completion_tokens = max_completion_tokens
+        self.max_entries = max_entries
+        self.logger = get_logger(__name__)
+
+        self._cache: OrderedDict[Tuple[str, str], Diagnosis] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(diagnosis: Diagnosis) -> str:
+        if isinstance(diagnosis, str):
+            return hashlib.sha256(diagnosis.encode("utf-8")).hexdigest()
+        return diagnosis_digest(diagnosis)
+
+    def translate(
+        self,
+        diagnosis: Diagnosis,
+        target_language: str,
+        source_language: Optional[str] = None,
+    ) -> Optional[Diagnosis]:
+        """
+        Translate a diagnosis, reusing an earlier translation when available.
+
+        Args:
+            diagnosis: Plain-text or structured diagnosis
+            target_language: Display language to translate into
+            source_language: Language the diagnosis was produced in (same: no call)
+
+        Returns:
+            Translated diagnosis of the same type, or None if the call failed
+        """
+        if source_language == target_language:
+            return diagnosis
+
+        key = (self._digest(diagnosis), target_language)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        try:
+            with get_tracer().span("translation_call", model=self.model, language=target_language):
+                if isinstance(diagnosis, str):
+                    translated: Optional[Diagnosis] = self._translate_text(
+                        diagnosis, target_language
+                    )
+                else:
+                    translated = self._translate_structured(diagnosis, target_language)
+        except openai.APIError as e:
+            self.logger.error(f"OpenAI API error during translation: {e}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Unexpected error during translation: {e}")
+            return None
+
+        if translated is None:
+            return None
+        with self._lock:
+            self._cache[key] = translated
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        self.logger.info(f"Translated diagnosis into {target_language}")
+        return translated
+
+    def _translate_text(self, text: str, language: str) -> Optional[str]:
+        metrics = get_diagnosis_metrics()
+        with metrics.track_request(self.model):
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": TEXT_TRANSLATION_PROMPT.format(language=language),
+                    },
+                    {"role": "user", "content": text},
+                ],
+                max_completion_tokens=self.max_completion_tokens,
+            )
+            metrics.record_usage(self.model, response.usage)
+        content = response.choices[0].message.content
+        return str(content).strip() if content else None
+
+    def _translate_structured(
+        self, diagnosis: StructuredDiagnosisOutput, language: str
+    ) -> Optional[StructuredDiagnosisOutput]:
+        fields = {name: getattr(diagnosis, name) for name in _TranslatedFields.model_fields}
+        metrics = get_diagnosis_metrics()
+        with metrics.track_request(self.model):
+            completion = self.client.beta.chat.completions.parse(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": STRUCTURED_TRANSLATION_PROMPT.format(language=language),
+                    },
+                    {"role": "user", "content": json.dumps(fields, ensure_ascii=False)},
+                ],
+                response_format=_TranslatedFields,
+                max_completion_tokens=self.max_completion_tokens,
+            )
+            metrics.record_usage(self.model, completion.usage)
+        parsed = completion.choices[0].message.parsed
+        if parsed is None:
+            return None
+        return diagnosis.model_copy(update=parsed.model_dump())
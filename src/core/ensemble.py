@@ -0,0 +1,356 @@
+"""
+Self-consistency ensemble for low-confidence structured diagnoses.
+Several samples run in parallel and vote on the primary and differential
+diagnoses; once enough samples agree, the rest are cancelled (streams closed).
+"""
+
+import contextvars
+import math
+import re
+import unicodedata
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from ..utils.logger import get_logger
+from ..utils.metrics import (
+    DiagnosisMetrics,
+    MetricsRegistry,
+    RollingWindow,
+    get_diagnosis_metrics,
+    usage_scope,
+)
+from ..utils.tracing import get_tracer
+from .ai_client import StructuredDiagnosisOutput
+from .cancellation import (
+    REASON_CANCELLED,
+    REASON_CONSENSUS,
+    CancellationToken,
+    DiagnosisCancelledError,
+    current_cancel_token,
+)
+
+_PARENTHESES = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_diagnosis(text: str) -> str:
+    """
+    Voting key of a diagnosis: case, character width, punctuation and
+    parenthesized notes are ignored ("Dengue fever (likely)" == "dengue fever").
+    """
+    folded = unicodedata.normalize("NFKC", text).casefold()
+    key = " ".join(_PUNCTUATION.sub(" ", _PARENTHESES.sub(" ", folded)).split())
+    return key or " ".join(folded.split())
+
+
+class EnsembleResult(NamedTuple):
+    """Merged diagnosis of an ensemble run and how it was reached."""
+
+    diagnosis: Optional[StructuredDiagnosisOutput]
+    agreement: float
+    differential_agreement: Dict[str, float]
+    samples: int
+    cancelled: int
+    tokens: int
+
+
+def vote(
+    samples: Sequence[StructuredDiagnosisOutput],
+) -> Tuple[StructuredDiagnosisOutput, float, Dict[str, float]]:
+    """
+    Merge samples by normalized-string voting.
+
+    The primary diagnosis with the most votes wins (ties: the earliest sample). The
+    differential list keeps the diagnoses named by at least half of the samples (as a
+    differential, or as a losing primary), most votes first; if none qualifies, the
+    winning sample's own list is kept.
+
+    Args:
+        samples: Structured diagnoses (at least one), in order of arrival
+
+    Returns:
+        tuple: Merged diagnosis (based on the first winning sample), share of samples
+               agreeing on its primary diagnosis, and each differential's vote share
+    """
+    keys = [normalize_diagnosis(sample.primary_diagnosis) for sample in samples]
+    # Counter keeps insertion order among equal counts: ties go to the earliest sample
+    winner_key, winner_votes = Counter(keys).most_common(1)[0]
+    winner = samples[keys.index(winner_key)]
+
+    names: Dict[str, str] = {}
+    votes: Counter = Counter()
+    for sample, key in zip(samples, keys):
+        candidates = list(sample.differential_diagnoses)
+        if key != winner_key:
+            candidates.append(sample.primary_diagnosis)
+        seen: Set[str] = set()
+        for name in candidates:
+            candidate = normalize_diagnosis(name)
+            if candidate == winner_key or candidate in seen:
+                continue
+            seen.add(candidate)
+            names.setdefault(candidate, name)
+            votes[candidate] += 1
+
+    needed = math.ceil(len(samples) / 2)
+    merged = [names[key] for key, count in votes.most_common() if count >= needed]
+    if not merged:
+        merged = list(winner.differential_diagnoses)
+    shares = {
+        name: votes[normalize_diagnosis(name)] / len(samples)
+        for name in merged
+        if normalize_diagnosis(name) in votes
+    }
+    diagnosis = winner.model_copy(update={"differential_diagnoses": merged})
+    return diagnosis, winner_votes / len(samples), shares
+
+
+class EnsembleMetrics:
+    """Agreement, sample outcomes and token spend of ensemble runs."""
+
+    def __init__(self, registry: MetricsRegistry, window: RollingWindow):
+        """
+        Args:
+            registry: Registry the metrics are registered in
+            window: Rolling window feeding the operator dashboard
+        """
+        self.window = window
+        self.agreement = registry.histogram(
+            "mdxapp_ensemble_agreement",
+            "Share of ensemble samples agreeing on the primary diagnosis",
+            buckets=(0.2, 0.4, 0.5, 0.6, 0.8, 1.0),
+        )
+        self.samples = registry.counter(
+            "mdxapp_ensemble_samples_total",
+            "Ensemble samples by outcome (completed, cancelled after agreement, failed)",
+            ["outcome"],
+        )
+        self.tokens = registry.counter(
+            "mdxapp_ensemble_tokens_total", "Tokens spent by ensemble samples"
+        )
+
+    def record(
+        self, agreement: float, completed: int, cancelled: int, failed: int, tokens: int
+    ) -> None:
+        """
+        Record one self-consistency ensemble run.
+
+        Args:
+            agreement: Share of completed samples voting for the chosen primary diagnosis
+            completed: Samples that returned a diagnosis
+            cancelled: Samples stopped because enough samples already agreed
+            failed: Samples that returned nothing
+            tokens: Prompt and completion tokens spent by the run (first answer and samples)
+        """
+        self.agreement.observe(agreement)
+        for outcome, count in (
+            ("completed", completed),
+            ("cancelled", cancelled),
+            ("failed", failed),
+        ):
+            if count:
+                self.samples.labels(outcome).inc(count)
+        self.tokens.inc(tokens)
+        self.window.add("ensemble_runs")
+        self.window.add("ensemble_agreement", agreement)
+        self.window.add("ensemble_cancelled", cancelled)
+        self.window.add("ensemble_tokens", tokens)
+
+    def window_summary(self, seconds: float) -> Dict[str, Any]:
+        """Runs, mean agreement, samples stopped early and tokens over the last `seconds`."""
+        counters = self.window.summary(seconds)["counters"]
+        runs = counters.get("ensemble_runs", 0.0)
+        return {
+            "runs": runs,
+            "mean_agreement": counters.get("ensemble_agreement", 0.0) / runs if runs else None,
+            "cancelled_samples": counters.get("ensemble_cancelled", 0.0),
+            "tokens": counters.get("ensemble_tokens", 0.0),
+        }
+
+
+def get_ensemble_metrics(metrics: Optional[DiagnosisMetrics] = None) -> EnsembleMetrics:
+    """Ensemble metrics in the registry and window of `metrics` (default: process metrics)."""
+    metrics = metrics or get_diagnosis_metrics()
+    return EnsembleMetrics(metrics.registry, metrics.window)
+
+
+class DiagnosisEnsemble:
+    """
+    Re-samples low-confidence structured diagnoses in parallel.
+
+    Samples are streamed, each with its own cancellation token (cancelled with the
+    job's token), so the samples still running once `quorum` samples agree on the
+    primary diagnosis are closed early. Samples run in copies of the caller's context:
+    their spans join the caller's trace and their tokens count towards its usage scope.
+    """
+
+    def __init__(
+        self,
+        ai_client: Any,
+        samples: int = 5,
+        quorum: int = 3,
+        max_workers: int = 8,
+        metrics: Optional[DiagnosisMetrics] = None,
+    ):
+        """
+        Args:
+            ai_client: DiagnosisAIClient used for every sample
+            samples: Parallel samples per ensemble run (K)
+            quorum: Samples that must agree on the primary diagnosis to stop early
+            max_workers: Threads shared by all ensemble runs of the process
+            metrics: Metrics whose registry receives agreement and token spend
+                     (default: process metrics)
+        """
+        self.ai_client = ai_client
+        self.samples = samples
+        self.quorum = quorum
+        self.metrics = get_ensemble_metrics(metrics)
+        self.logger = get_logger(__name__)
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="mdxapp-ensemble")
+
+    def diagnose(
+        self, system_prompt: str, user_prompt: str, **kwargs: Any
+    ) -> Optional[StructuredDiagnosisOutput]:
+        """
+        Structured diagnosis; a low-confidence answer is re-sampled by the ensemble.
+
+        Args:
+            system_prompt: System-level instruction for AI behavior
+            user_prompt: User query containing patient information
+            **kwargs: Passed to `get_structured_diagnosis`
+
+        Returns:
+            StructuredDiagnosisOutput: First answer, or the ensemble's merged answer
+        """
+        # One scope for the first answer and the samples: the run's cost includes both
+        with usage_scope() as usage:
+            first = self.ai_client.get_structured_diagnosis(system_prompt, user_prompt, **kwargs)
+            if first is None or first.confidence_level != "low":
+                return first
+            result = self._run(system_prompt, user_prompt, first, usage, kwargs)
+        return result.diagnosis or first
+
+    def run(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        initial: Optional[StructuredDiagnosisOutput] = None,
+        **kwargs: Any,
+    ) -> EnsembleResult:
+        """
+        Fan out the samples and vote.
+
+        Args:
+            system_prompt: System-level instruction for AI behavior
+            user_prompt: User query containing patient information
+            initial: An answer already received for the case (counts as a vote)
+            **kwargs: Passed to `get_structured_diagnosis` (cancel_token: the run's token)
+
+        Returns:
+            EnsembleResult: Merged diagnosis (None if no sample answered), agreement
+                            scores, sample counts and the tokens spent by the samples
+
+        Raises:
+            DiagnosisCancelledError: If the run's cancellation token fired
+        """
+        with usage_scope() as usage:
+            return self._run(system_prompt, user_prompt, initial, usage, kwargs)
+
+    def _run(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        initial: Optional[StructuredDiagnosisOutput],
+        usage: Dict[str, int],
+        kwargs: Dict[str, Any],
+    ) -> EnsembleResult:
+        """`run()` within the usage scope the run's tokens are counted in."""
+        kwargs = dict(kwargs)
+        parent = kwargs.pop("cancel_token", None) or current_cancel_token()
+        timeout = parent.remaining() if parent is not None else None
+        tokens = [CancellationToken(timeout) for _ in range(self.samples)]
+        if parent is not None:
+            parent.on_cancel(lambda: self._cancel_all(tokens, parent.reason or REASON_CANCELLED))
+
+        received: List[StructuredDiagnosisOutput] = [initial] if initial is not None else []
+        counts: Counter = Counter()
+
+        def collect(futures: Set[Future]) -> None:
+            for future in futures:
+                sample, stopped = future.result()
+                if sample is not None:
+                    received.append(sample)
+                counts["cancelled" if stopped else "failed" if sample is None else "ok"] += 1
+
+        span_attributes = {"samples": self.samples, "quorum": self.quorum}
+        with get_tracer().span("ensemble", **span_attributes) as span:
+            pending: Set[Future] = {
+                self._pool.submit(
+                    contextvars.copy_context().run,
+                    self._sample,
+                    system_prompt,
+                    user_prompt,
+                    dict(kwargs, stream=True, cancel_token=token),
+                )
+                for token in tokens
+            }
+            while pending and not self._agreed(received):
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+
+            # Enough samples agree: close the streams of the others. Samples that finished
+            # before the cancellation reached them still count (and vote)
+            self._cancel_all(tokens, REASON_CONSENSUS)
+            wait(pending)
+            collect(pending)
+            if parent is not None:
+                parent.raise_if_cancelled()
+
+            # Every sample's scope has closed: their totals are in `usage`
+            spent = usage["prompt"] + usage["completion"]
+            cancelled, failed = counts["cancelled"], counts["failed"]
+            if not received:
+                span.set_attribute("failed", failed)
+                return EnsembleResult(None, 0.0, {}, 0, cancelled, spent)
+
+            diagnosis, agreement, shares = vote(received)
+            span.set_attribute("agreement", agreement)
+            span.set_attribute("cancelled", cancelled)
+            span.set_attribute("tokens", spent)
+
+        self.metrics.record(agreement, len(received), cancelled, failed, spent)
+        self.logger.info(
+            f"Ensemble: {len(received)} samples, agreement {agreement:.0%}, "
+            f"{cancelled} cancelled, {spent} tokens"
+        )
+        return EnsembleResult(diagnosis, agreement, shares, len(received), cancelled, spent)
+
+    def _sample(
+        self, system_prompt: str, user_prompt: str, kwargs: Dict[str, Any]
+    ) -> Tuple[Optional[StructuredDiagnosisOutput], bool]:
+        """One sample: (answer or None, whether a cancellation cut its stream)."""
+        # Own scope per sample: totals are added to the run's scope under a lock
+        with usage_scope():
+            try:
+                sample = self.ai_client.get_structured_diagnosis(
+                    system_prompt, user_prompt, **kwargs
+                )
+            except DiagnosisCancelledError:
+                return None, True
+        return sample, False
+
+    def _agreed(self, samples: Sequence[StructuredDiagnosisOutput]) -> bool:
+        if not samples:
+            return False
+        votes = Counter(normalize_diagnosis(sample.primary_diagnosis) for sample in samples)
+        return votes.most_common(1)[0][1] >= self.quorum
+
+    @staticmethod
+    def _cancel_all(tokens: Sequence[CancellationToken], reason: str) -> None:
+        for token in tokens:
+            token.cancel(reason)
+
+    def shutdown(self) -> None:
+        """Stop the sample threads (tests; the page keeps one ensemble per process)."""
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,133 @@
+"""
+Incremental re-diagnosis of edited cases.
+A case's first diagnosis and its updates are kept as a local message history;
+a later edit is sent as a short delta on top of it ("Laboratory test results: …")
+with a request to update the assessment, instead of a fresh full reasoning pass.
+"""
+
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .conversation import Conversation, Turn
+
+UPDATE_INSTRUCTION = (
+    "The case above has changed. Update your previous assessment in light of the "
+    "changes below, keeping what still holds. Answer in {language}."
+)
+
+# Fields a follow-up may change, with their translation keys (labels in the delta)
+DELTA_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("history", "history"),
+    ("symptoms", "symptoms"),
+    ("exam_findings", "exam"),
+    ("lab_results", "lab"),
+)
+
+# A different patient, not a follow-up: these changes start a new case
+IDENTITY_FIELDS: Tuple[str, ...] = ("gender", "age", "is_pregnant")
+
+
+def case_snapshot(patient: Any) -> Dict[str, Any]:
+    """Field values of a case as submitted (PatientData or an object with its attributes)."""
+    return {
+        field: getattr(patient, field)
+        for field in IDENTITY_FIELDS + tuple(name for name, _ in DELTA_FIELDS)
+    }
+
+
+def case_delta(
+    previous: Mapping[str, Any],
+    patient: Any,
+    labels: Optional[Mapping[str, str]] = None,
+) -> Optional[List[str]]:
+    """
+    Describe what changed since the case was last diagnosed.
+
+    Args:
+        previous: `case_snapshot` of the last diagnosed version
+        patient: The case as it is now
+        labels: Translations of the form language (field labels; default: field names)
+
+    Returns:
+        list: One line per changed field (empty if nothing changed), or None if
+              the patient's identity changed and the case must be submitted anew
+    """
+    current = case_snapshot(patient)
+    if any(previous.get(field) != current[field] for field in IDENTITY_FIELDS):
+        return None
+    none = labels.get("none", "none") if labels is not None else "none"
+    lines = []
+    for field, label_key in DELTA_FIELDS:
+        before, after = previous.get(field) or none, current[field] or none
+        if before == after:
+            continue
+        label = labels.get(label_key, field) if labels is not None else field
+        lines.append(f"{label}: {after} (previously: {before})")
+    return lines
+
+
+class CaseConversation(Conversation):
+    """
+    Conversation of one case: the full prompt, each update and the answers.
+
+    The history is replayed after the system prompt, so every follow-up shares the
+    previous request's prefix (prompt-cache friendly) and only the delta is new. A
+    `ConversationManager` keeps long workups within its token window.
+    """
+
+    def __init__(self, language: str):
+        """
+        Args:
+            language: Language the case is diagnosed in (a switch starts a new case)
+        """
+        super().__init__()
+        self.language = language
+        self.snapshot: Dict[str, Any] = {}
+
+    def update_prompt(
+        self, patient: Any, language: str, labels: Optional[Mapping[str, str]] = None
+    ) -> Optional[str]:
+        """
+        Follow-up prompt for the edited case.
+
+        Args:
+            patient: The case as it is now
+            language: Form language
+            labels: Translations of the form language
+
+        Returns:
+            str: Delta prompt, or None if the case must be submitted in full (no
+                 diagnosis yet, another language or patient, or nothing changed)
+        """
+        if not self.turn_count or language != self.language:
+            return None
+        delta = case_delta(self.snapshot, patient, labels)
+        if not delta:
+            return None
+        return "\n".join([UPDATE_INSTRUCTION.format(language=language)] + delta)
+
+    def record(
+        self,
+        user_prompt: str,
+        answer: Any,
+        patient: Any,
+        usage: Optional[Mapping[str, int]] = None,
+        latency: Optional[float] = None,
+    ) -> Turn:
+        """
+        Append a finished turn.
+
+        Args:
+            user_prompt: Full case prompt or delta prompt that was sent
+            answer: Diagnosis received (text or structured output)
+            patient: The case the answer is for
+            usage: Tokens the turn spent (the job's usage)
+            latency: Seconds the turn took
+
+        Returns:
+            Turn: The recorded turn
+        """
+        content = answer.model_dump_json() if isinstance(answer, BaseModel) else str(answer)
+        self.snapshot = case_snapshot(patient)
+        return self.add_turn(user_prompt, content, usage, latency)
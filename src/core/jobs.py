@@ -0,0 +1,502 @@
+"""
+Background execution of diagnosis requests.
+Diagnoses run on a process-wide worker pool instead of inside the Streamlit script,
+so a rerun, widget interaction or reconnect during the upstream call does not
+throw the result away: the page keeps the job ID and reattaches to the job.
+Jobs nobody asks about any more, and jobs past their deadline, are cancelled.
+"""
+
+import hmac
+import threading
+import time
+import uuid
+from collections import deque
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from ..utils.logger import get_logger
+from ..utils.metrics import MetricsRegistry, get_registry, usage_scope
+from ..utils.tracing import current_span, get_tracer
+from .cancellation import (
+    REASON_ABANDONED,
+    REASON_CANCELLED,
+    CancellationToken,
+    DiagnosisCancelledError,
+    use_cancel_token,
+)
+from .urgency import PRIORITY_NAMES, PRIORITY_ROUTINE
+
+
+class JobState(str, Enum):
+    """Lifecycle of a diagnosis job."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class DiagnosisJob:
+    """A submitted diagnosis request and, once finished, its result."""
+
+    def __init__(
+        self,
+        job_id: str,
+        fn: Callable[..., Any],
+        args: tuple,
+        kwargs: Dict[str, Any],
+        session_id: Optional[str] = None,
+        language: Optional[str] = None,
+        priority: int = PRIORITY_ROUTINE,
+        timeout: Optional[float] = None,
+        client: Optional[str] = None,
+    ):
+        self.job_id = job_id
+        self.session_id = session_id
+        # Browser the job may be reattached from after a reload (see `reattach`)
+        self.client = client
+        self.language = language
+        self.priority = priority
+        self.state = JobState.QUEUED
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Last time the page asked for the job (abandonment detection)
+        self.last_seen = self.submitted_at
+        self.token = CancellationToken(timeout)
+        # Tokens spent by the job's upstream calls
+        self.usage: Dict[str, int] = {}
+
+        self._fn = fn
+        self._args = args
+        self._kwargs = kwargs
+        self._span = current_span()
+        self._finished = threading.Event()
+        self._callbacks: List[Callable[[DiagnosisJob], None]] = []
+        self._callbacks_lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        """Whether the job has finished (successfully or not)."""
+        return self._finished.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the job finishes.
+
+        Args:
+            timeout: Maximum seconds to wait (None: no limit)
+
+        Returns:
+            bool: True if the job has finished
+        """
+        return self._finished.wait(timeout)
+
+    def add_done_callback(self, callback: Callable[["DiagnosisJob"], None]) -> None:
+        """Call `callback(job)` once the job has finished (immediately if it has)."""
+        with self._callbacks_lock:
+            if not self.done:
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def _run(self) -> None:
+        self.state = JobState.RUNNING
+        self.started_at = time.time()
+        try:
+            # Join the submitting rerun's trace so upstream spans stay connected;
+            # the AI client picks up the job's cancellation token from the context
+            with get_tracer().use_span(self._span), use_cancel_token(self.token):
+                self.result = self._call()
+            self.state = JobState.DONE
+        except DiagnosisCancelledError as e:
+            self.error = e
+            self.state = JobState.CANCELLED
+        except Exception as e:
+            self.error = e
+            self.state = JobState.FAILED
+        finally:
+            self._release()
+
+    def _call(self) -> Any:
+        with usage_scope() as self.usage:
+            self.token.raise_if_cancelled()
+            return self._fn(*self._args, **self._kwargs)
+
+    def _cancel_queued(self) -> None:
+        """Finish a job that was cancelled before a worker picked it up."""
+        self.error = DiagnosisCancelledError(self.token.reason or REASON_CANCELLED)
+        self.state = JobState.CANCELLED
+        self._release()
+
+    def _release(self) -> None:
+        self.finished_at = time.time()
+        self._fn = self._args = self._kwargs = None  # type: ignore[assignment]
+
+    def _complete(self) -> None:
+        """Wake up pollers and run done callbacks (after the executor's bookkeeping)."""
+        with self._callbacks_lock:
+            self._finished.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                get_logger(__name__).warning(f"Job callback failed: {e}")
+
+
+def priority_label(priority: int) -> str:
+    """Metric label of a scheduling priority."""
+    return PRIORITY_NAMES.get(priority, str(priority))
+
+
+class _PriorityScheduler:
+    """
+    FIFO queue per priority; the worker takes the head with the highest effective priority.
+
+    A waiting job gains one priority level per `aging` seconds, so a routine job
+    is passed over by fresh urgent ones for at most (levels apart x aging) seconds.
+    """
+
+    def __init__(self, aging: float):
+        self.aging = aging
+        self._queues: Dict[int, Deque[DiagnosisJob]] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, job: DiagnosisJob) -> None:
+        with self._cond:
+            self._queues.setdefault(job.priority, deque()).append(job)
+            self._cond.notify()
+
+    def remove(self, job: DiagnosisJob) -> bool:
+        """Take a job out of its queue; False if a worker already picked it up."""
+        with self._cond:
+            try:
+                self._queues.get(job.priority, deque()).remove(job)
+            except ValueError:
+                return False
+            return True
+
+    def get(self) -> Optional[DiagnosisJob]:
+        """Block until a job is available; None once closed and drained."""
+        with self._cond:
+            while True:
+                job = self._pop()
+                if job is not None or self._closed:
+                    return job
+                self._cond.wait()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _pop(self) -> Optional[DiagnosisJob]:
+        now = time.time()
+        best: Optional[Deque[DiagnosisJob]] = None
+        best_key = (0.0, 0.0)
+        for priority, jobs in self._queues.items():
+            if not jobs:
+                continue
+            head = jobs[0]
+            # Highest aged priority first; the older job wins ties
+            key = (priority + (now - head.submitted_at) / self.aging, -head.submitted_at)
+            if best is None or key > best_key:
+                best, best_key = jobs, key
+        return best.popleft() if best is not None else None
+
+
+class JobExecutor:
+    """
+    Process-wide worker pool for diagnosis jobs.
+
+    Jobs are dispatched by priority (see `urgency.assess_urgency`) with aging, so
+    urgent cases skip the line without starving routine ones. Finished jobs are
+    kept for `result_ttl` seconds so that a later rerun (or a reconnected browser)
+    can still collect the result, then evicted.
+
+    A watchdog thread cancels jobs past their deadline and jobs whose page stopped
+    polling them; cancelling a running job closes its upstream stream, so the worker
+    moves straight on to the next queued job.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        result_ttl: float = 900.0,
+        aging: float = 30.0,
+        deadline: Optional[float] = None,
+        abandon_after: Optional[float] = None,
+        watch_interval: float = 1.0,
+        registry: Optional[MetricsRegistry] = None,
+    ):
+        """
+        Args:
+            max_workers: Concurrent upstream calls
+            result_ttl: Seconds a finished job is retained
+            aging: Seconds of waiting that raise a job by one priority level
+            deadline: Seconds from submission after which a job is cancelled (None: no limit)
+            abandon_after: Seconds without a `get` after which a job is cancelled (None: never)
+            watch_interval: Seconds between watchdog checks
+            registry: Metrics registry receiving the job metrics (default: process registry)
+        """
+        self.max_workers = max_workers
+        self.result_ttl = result_ttl
+        self.deadline = deadline
+        self.abandon_after = abandon_after
+        self.logger = get_logger(__name__)
+
+        self._jobs: Dict[str, DiagnosisJob] = {}
+        self._lock = threading.Lock()
+        self._scheduler = _PriorityScheduler(aging)
+        self._workers = [
+            threading.Thread(target=self._work, name=f"mdxapp-diagnosis-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+        self._stopped = threading.Event()
+        self._watchdog = threading.Thread(
+            target=self._watch,
+            args=(watch_interval,),
+            name="mdxapp-diagnosis-watchdog",
+            daemon=True,
+        )
+        self._watchdog.start()
+
+        registry = registry or get_registry()
+        self._queued = registry.gauge(
+            "mdxapp_queue_depth", "Diagnosis jobs waiting to run, by priority", ["priority"]
+        )
+        self._running = registry.gauge("mdxapp_jobs_running", "Diagnosis jobs being executed")
+        self._finished = registry.counter(
+            "mdxapp_jobs_finished_total", "Diagnosis jobs finished, by outcome", ["state"]
+        )
+        self._queue_wait = registry.histogram(
+            "mdxapp_job_queue_wait_seconds",
+            "Time diagnosis jobs waited for a worker, by priority",
+            ["priority"],
+        )
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        session_id: Optional[str] = None,
+        language: Optional[str] = None,
+        priority: int = PRIORITY_ROUTINE,
+        client: Optional[str] = None,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Queue a diagnosis call.
+
+        Args:
+            fn: Function performing the upstream call
+            *args: Positional arguments for `fn`
+            session_id: Submitting Streamlit session
+            language: Language the diagnosis is requested in
+            priority: Scheduling priority (higher runs first)
+            client: Key of the submitting browser (`get_client_key()`), for `reattach`
+            **kwargs: Keyword arguments for `fn`
+
+        Returns:
+            str: Job ID to store in session state
+        """
+        job = DiagnosisJob(
+            uuid.uuid4().hex,
+            fn,
+            args,
+            kwargs,
+            session_id,
+            language,
+            priority,
+            self.deadline,
+            client=client,
+        )
+        job.token.on_cancel(lambda: self._dequeue(job))
+        with self._lock:
+            self._prune(time.time())
+            self._jobs[job.job_id] = job
+        self._queued.labels(priority_label(priority)).inc()
+        self._scheduler.put(job)
+        self.logger.info(f"Queued diagnosis job {job.job_id} ({priority_label(priority)})")
+        return job.job_id
+
+    def get(self, job_id: Optional[str]) -> Optional[DiagnosisJob]:
+        """
+        Look up a job. Each lookup marks the job as still wanted.
+
+        Args:
+            job_id: ID returned by `submit`
+
+        Returns:
+            DiagnosisJob: The job, or None if unknown or expired
+        """
+        if not job_id:
+            return None
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            job = self._jobs.get(job_id)
+        if job is not None:
+            job.last_seen = now
+        return job
+
+    def reattach(
+        self, job_id: Optional[str], session_id: str, client: Optional[str] = None
+    ) -> Optional[DiagnosisJob]:
+        """
+        Look up a job for a session that only knows its ID (from the URL, after a reload).
+
+        Only the submitting session, or a new session of the submitting browser, gets
+        the job: a shared or leaked URL does not expose another user's case.
+
+        Args:
+            job_id: ID returned by `submit`
+            session_id: Session asking for the job
+            client: Key of the asking browser (`get_client_key()`)
+
+        Returns:
+            DiagnosisJob: The job, or None if unknown, expired or submitted elsewhere
+        """
+        if not job_id:
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        same_client = (
+            client is not None
+            and job.client is not None
+            and hmac.compare_digest(job.client, client)
+        )
+        if job.session_id != session_id and not same_client:
+            self.logger.warning(f"Refused reattaching diagnosis job {job_id} from another client")
+            return None
+        return self.get(job_id)
+
+    def cancel(self, job_id: Optional[str], reason: str = REASON_CANCELLED) -> bool:
+        """
+        Cancel a queued or running job.
+
+        Args:
+            job_id: ID returned by `submit`
+            reason: Why the job is cancelled (metric label)
+
+        Returns:
+            bool: False if the job is unknown, finished or already cancelled
+        """
+        with self._lock:
+            job = self._jobs.get(job_id) if job_id else None
+        if job is None or job.done:
+            return False
+        return job.token.cancel(reason)
+
+    def reprioritize(self, job_id: str, priority: int) -> bool:
+        """
+        Raise the priority of a queued job (e.g. a speculative job the user now waits for).
+
+        Returns:
+            bool: False if the job is unknown, not queued any more or already at that priority
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.priority >= priority or not self._scheduler.remove(job):
+            return False
+        self._queued.labels(priority_label(job.priority)).dec()
+        job.priority = priority
+        self._queued.labels(priority_label(priority)).inc()
+        self._scheduler.put(job)
+        return True
+
+    def reap(self, now: Optional[float] = None) -> int:
+        """
+        Cancel jobs past their deadline or no longer polled (run by the watchdog).
+
+        Args:
+            now: Current time (default: time.time())
+
+        Returns:
+            int: Number of jobs cancelled
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            pending = [job for job in self._jobs.values() if not job.done]
+        cancelled = 0
+        for job in pending:
+            if job.token.reason is not None:
+                continue
+            if job.token.expire(now):
+                cancelled += 1
+            elif self.abandon_after is not None and now - job.last_seen > self.abandon_after:
+                if job.token.cancel(REASON_ABANDONED):
+                    cancelled += 1
+        return cancelled
+
+    def forget(self, job_id: str) -> None:
+        """Drop a job whose result has been collected."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.done:
+                del self._jobs[job_id]
+
+    def pending(self) -> int:
+        """Number of queued or running jobs."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.done)
+
+    def shutdown(self) -> None:
+        """Stop the workers after the queued jobs."""
+        self._stopped.set()
+        self._scheduler.close()
+
+    def _watch(self, interval: float) -> None:
+        while not self._stopped.wait(interval):
+            try:
+                self.reap()
+            except Exception as e:
+                self.logger.error(f"Diagnosis job watchdog failed: {e}")
+
+    def _dequeue(self, job: DiagnosisJob) -> None:
+        """Cancellation callback: finish the job now if no worker picked it up yet."""
+        if not self._scheduler.remove(job):
+            return
+        self._queued.labels(priority_label(job.priority)).dec()
+        job._cancel_queued()
+        self._finished.labels(job.state.value).inc()
+        job._complete()
+        self.logger.info(f"Cancelled queued diagnosis job {job.job_id} ({job.token.reason})")
+
+    def _work(self) -> None:
+        while True:
+            job = self._scheduler.get()
+            if job is None:
+                return
+            label = priority_label(job.priority)
+            self._queued.labels(label).dec()
+            self._queue_wait.labels(label).observe(time.time() - job.submitted_at)
+            self._running.inc()
+            try:
+                job._run()
+            finally:
+                self._running.dec()
+                self._finished.labels(job.state.value).inc()
+                job._complete()
+            if job.state is JobState.CANCELLED:
+                self.logger.info(f"Cancelled diagnosis job {job.job_id} ({job.token.reason})")
+            elif job.error is not None:
+                self.logger.error(f"Diagnosis job {job.job_id} failed: {job.error}")
+
+    def _prune(self, now: float) -> None:
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
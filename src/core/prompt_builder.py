@@ -3,158 +3,331 @@ Prompt builder for constructing AI queries.
 Handles the construction of prompts from patient data and templates.
 """
 
-from typing import Dict, List
+import string
+import threading
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
 
 from ..models.patient import PatientData
 from ..utils.logger import get_logger
 
 
+class PromptTemplates(NamedTuple):
+    """Immutable snapshot of the prompt canvas; a rerun keeps the one it started with."""
+
+    prompt_system: str
+    prompt_words: Tuple[str, ...]
+    version: int
+
+
+DEFAULT_PROMPT_TEMPLATE = """Patient Information:
+- Gender: {0}
+- Age: {1}{years_old}
+- Pregnant: {2}
+- History: {3}
+- Symptoms: {4}
+- Examination: {5}
+- Lab Results: {6}
+
+Please provide a medical diagnosis based on this information.
+Respond in {language}.
+Include:
+1. Most likely diagnosis
+2. Differential diagnoses
+3. Recommended next steps
+4. Important considerations
+"""
+
+
+def _literal(text: str) -> str:
+    """Escape text so str.format keeps it verbatim."""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+class _CompiledTemplate(NamedTuple):
+    """
+    A prompt with every static part resolved for one language.
+
+    `parts` holds the eight literal segments around the seven slots (gender, age,
+    pregnancy, history, symptoms, exam, lab); filling is a single join, which
+    allocates only the result string.
+    """
+
+    parts: Tuple[str, ...]
+    none_text: str
+
+    def fill(self, patient_data: PatientData) -> str:
+        parts = self.parts
+        none_text = self.none_text
+        return "".join(
+            (
+                parts[0],
+                patient_data.gender,
+                parts[1],
+                str(patient_data.age),
+                parts[2],
+                patient_data.is_pregnant,
+                parts[3],
+                patient_data.history or none_text,
+                parts[4],
+                patient_data.symptoms or none_text,
+                parts[5],
+                patient_data.exam_findings or none_text,
+                parts[6],
+                patient_data.lab_results or none_text,
+                parts[7],
+            )
+        )
+
+
+def _split_slots(fmt: str) -> Tuple[str, ...]:
+    """Split a format string with slots {0}..{6}, in order, into its literal segments."""
+    parts = []
+    literal = ""
+    for text, field, _, _ in string.Formatter().parse(fmt):
+        literal += text
+        if field is not None:
+            if field != str(len(parts)):
+                raise ValueError(f"Prompt slots must appear in order, got {{{field}}}")
+            parts.append(literal)
+            literal = ""
+    parts.append(literal)
+    return tuple(parts)
+
+
+class _CompiledCache:
+    """Compiled templates for one templates snapshot and translations object."""
+
+    def __init__(self, templates: Any, translations: Any):
+        self.templates = templates
+        self.translations = translations
+        self.entries: Dict[Tuple[str, str], _CompiledTemplate] = {}
+
+
+def _compile(
+    style: str,
+    prompt_words: Sequence[str],
+    translations: Mapping[str, Mapping[str, str]],
+    language: str,
+) -> _CompiledTemplate:
+    """Resolve prompt words and translations for one language into a format string."""
+    trans = translations.get(language, translations["English"])
+    none_text = trans.get("none", "none")
+    years_old = _literal(trans.get("vissum_yrsold", " years old"))
+
+    if style == "summary":
+        labels = [
+            _literal(trans.get(key, default))
+            for key, default in (
+                ("vissum_patient", "Patient: "),
+                ("vissum_pregnancy", "Pregnancy: "),
+                ("vissum_history", "History: "),
+                ("vissum_symp", "Symptoms: "),
+                ("vissum_exam", "Examination findings: "),
+                ("vissum_lab", "Laboratory test results: "),
+            )
+        ]
+        fmt = (
+            '<p style="font-size:18px;">'
+            f"<b>{labels[0]}</b>{{0}}, {{1}}{years_old}<br/>"
+            f"<b>{labels[1]}</b>{{2}}<br/>"
+            f"<b>{labels[2]}</b>{{3}}<br/>"
+            f"<b>{labels[3]}</b>{{4}}<br/>"
+            f"<b>{labels[4]}</b>{{5}}<br/>"
+            f"<b>{labels[5]}</b>{{6}}<br/>"
+            "</p>"
+        )
+    elif len(prompt_words) >= 10:
+        # Use configured prompt words
+        words = [_literal(word) for word in prompt_words]
+        fmt = (
+            f"{words[0]}{{0}}, {{1}}{years_old}. "
+            f"{words[1]}{{2}}. "
+            f"{words[2]}{{3}}. "
+            f"{words[3]}{{4}}. "
+            f"{words[4]}{{5}}. "
+            f"{words[5]}{{6}}. "
+            f"{words[6]}{words[7]}{words[8]}{words[9]}{_literal(language)}. "
+        )
+    else:
+        # Fallback to simple template
+        fmt = DEFAULT_PROMPT_TEMPLATE.replace("{years_old}", years_old).replace(
+            "{language}", _literal(language)
+        )
+    return _CompiledTemplate(_split_slots(fmt), none_text)
+
+
 class PromptBuilder:
     """
     Builds prompts for AI diagnosis from patient data and templates.
     Supports multiple languages and customizable prompt templates.
+
+    Templates can be replaced at runtime (hot reload); each replacement is swapped
+    in atomically and bumps `version`.
     """
 
-    def __init__(self, prompt_words: List[str], translations: Dict[str, Dict[str, str]]):
+    def __init__(
+        self,
+        prompt_words: Sequence[str],
+        translations: Mapping[str, Mapping[str, str]],
+        prompt_system: str = "",
+    ):
         """
         Initialize the prompt builder with templates.
 
         Args:
             prompt_words: List of prompt template words/phrases
             translations: Translation dictionary for all supported languages
+            prompt_system: System prompt sent with every diagnosis request
         """
-        self.prompt_words = prompt_words
+        self._templates = PromptTemplates(prompt_system, tuple(prompt_words), 1)
+        self._update_lock = threading.Lock()
         self.translations = translations
+        self._compiled_cache = _CompiledCache(None, None)
         self.logger = get_logger(__name__)
 
-    def build_user_prompt(self, patient_data: PatientData, language: str = "English") -> str:
+    @property
+    def prompt_words(self) -> Tuple[str, ...]:
+        """Current prompt template words."""
+        return self._templates.prompt_words
+
+    @property
+    def prompt_system(self) -> str:
+        """Current system prompt."""
+        return self._templates.prompt_system
+
+    @property
+    def version(self) -> int:
+        """Template version, incremented on every reload."""
+        return self._templates.version
+
+    def templates(self) -> PromptTemplates:
         """
-        Build the user prompt from patient data.
+        Get the current templates as one consistent snapshot.
+
+        Returns:
+            PromptTemplates: System prompt, prompt words and version
+        """
+        return self._templates
+
+    def update_templates(
+        self, prompt_words: Sequence[str], prompt_system: Optional[str] = None
+    ) -> bool:
+        """
+        Swap in new templates (no-op if unchanged).
 
         Args:
-            patient_data: Patient information
-            language: Target language for the response
+            prompt_words: New prompt template words/phrases
+            prompt_system: New system prompt (default: keep the current one)
 
         Returns:
-            str: Formatted user prompt for AI
+            bool: True if the templates changed
         """
-        # Get translations for the selected language
-        trans = self.translations.get(language, self.translations["English"])
-
-        # Get default values for missing data
-        none_text = trans.get("none", "none")
-        years_old_text = trans.get("vissum_yrsold", " years old")
-
-        # Replace None/empty values with "none" text
-        history = patient_data.history if patient_data.history else none_text
-        symptoms = patient_data.symptoms
-        exam = patient_data.exam_findings if patient_data.exam_findings else none_text
-        lab = patient_data.lab_results if patient_data.lab_results else none_text
-
-        # Ensure we have enough prompt words (default templates if not)
-        if len(self.prompt_words) >= 10:
-            # Use configured prompt words
-            prompt = (
-                f"{self.prompt_words[0]}{patient_data.gender}, "
-                f"{patient_data.age}{years_old_text}. "
-                f"{self.prompt_words[1]}{patient_data.is_pregnant}. "
-                f"{self.prompt_words[2]}{history}. "
-                f"{self.prompt_words[3]}{symptoms}. "
-                f"{self.prompt_words[4]}{exam}. "
-                f"{self.prompt_words[5]}{lab}. "
-                f"{self.prompt_words[6]}"
-                f"{self.prompt_words[7]}"
-                f"{self.prompt_words[8]}"
-                f"{self.prompt_words[9]}{language}. "
-            )
-        else:
-            # Fallback to simple template
-            prompt = self._build_default_prompt(
-                patient_data, language, years_old_text, history, symptoms, exam, lab
-            )
+        with self._update_lock:
+            current = self._templates
+            system = current.prompt_system if prompt_system is None else prompt_system
+            words = tuple(prompt_words)
+            if (system, words) == (current.prompt_system, current.prompt_words):
+                return False
+            self._templates = PromptTemplates(system, words, current.version + 1)
+        self.logger.info(f"Prompt templates reloaded (version {current.version + 1})")
+        return True
 
-        self.logger.debug(f"Built user prompt for language: {language}")
-        return prompt
+    def _compiled(
+        self,
+        language: str,
+        style: str,
+        templates: Optional[PromptTemplates] = None,
+        translations: Optional[Mapping[str, Mapping[str, str]]] = None,
+    ) -> _CompiledTemplate:
+        """
+        Get the compiled template for a (language, style) pair, compiling it once.
+
+        The cache is tied to one templates snapshot and one translations object, so
+        a hot reload starts a fresh cache instead of serving stale text.
+        """
+        templates = templates or self._templates
+        translations = translations if translations is not None else self.translations
+        cache = self._compiled_cache
+        if cache.templates is not templates or cache.translations is not translations:
+            cache = self._compiled_cache = _CompiledCache(templates, translations)
+
+        compiled = cache.entries.get((language, style))
+        if compiled is None:
+            compiled = _compile(style, templates.prompt_words, translations, language)
+            cache.entries[(language, style)] = compiled
+        return compiled
 
-    def _build_default_prompt(
+    def build_user_prompt(
         self,
         patient_data: PatientData,
-        language: str,
-        years_old_text: str,
-        history: str,
-        symptoms: str,
-        exam: str,
-        lab: str,
+        language: str = "English",
+        templates: Optional[PromptTemplates] = None,
+        translations: Optional[Mapping[str, Mapping[str, str]]] = None,
     ) -> str:
         """
-        Build a default prompt when prompt_words are not configured.
+        Build the user prompt from patient data.
 
         Args:
             patient_data: Patient information
-            language: Target language
-            years_old_text: Translation for "years old"
-            history: Patient history text
-            symptoms: Patient symptoms text
-            exam: Examination findings text
-            lab: Lab results text
+            language: Target language for the response
+            templates: Templates snapshot to use (default: current templates)
+            translations: Translations snapshot to use (default: `self.translations`)
 
         Returns:
-            str: Default formatted prompt
+            str: Formatted user prompt for AI
         """
-        prompt = f"""Patient Information:
-- Gender: {patient_data.gender}
-- Age: {patient_data.age}{years_old_text}
-- Pregnant: {patient_data.is_pregnant}
-- History: {history}
-- Symptoms: {symptoms}
-- Examination: {exam}
-- Lab Results: {lab}
+        return self._compiled(language, "user", templates, translations).fill(patient_data)
 
-Please provide a medical diagnosis based on this information.
-Respond in {language}.
-Include:
-1. Most likely diagnosis
-2. Differential diagnoses
-3. Recommended next steps
-4. Important considerations
-"""
-        return prompt
+    def build_user_prompts(
+        self,
+        patients: Sequence[PatientData],
+        language: Optional[str] = None,
+        templates: Optional[PromptTemplates] = None,
+        translations: Optional[Mapping[str, Mapping[str, str]]] = None,
+    ) -> List[str]:
+        """
+        Build user prompts for a batch of patients.
+
+        Args:
+            patients: Patient records
+            language: Response language for all prompts (default: each patient's `language`)
+            templates: Templates snapshot to use (default: current templates)
+            translations: Translations snapshot to use (default: `self.translations`)
 
-    def build_visual_summary(self, patient_data: PatientData, language: str = "English") -> str:
+        Returns:
+            list: One prompt per patient, in order
+        """
+        templates = templates or self._templates
+        compiled: Dict[str, _CompiledTemplate] = {}
+        prompts = []
+        for patient in patients:
+            patient_language = language or patient.language
+            template = compiled.get(patient_language)
+            if template is None:
+                template = compiled[patient_language] = self._compiled(
+                    patient_language, "user", templates, translations
+                )
+            prompts.append(template.fill(patient))
+        return prompts
+
+    def build_visual_summary(
+        self,
+        patient_data: PatientData,
+        language: str = "English",
+        translations: Optional[Mapping[str, Mapping[str, str]]] = None,
+    ) -> str:
         """
         Build a formatted HTML summary of patient data for display.
 
         Args:
             patient_data: Patient information
             language: Language for labels
+            translations: Translations snapshot to use (default: `self.translations`)
 
         Returns:
             str: HTML-formatted summary
         """
-        trans = self.translations.get(language, self.translations["English"])
-
-        # Get default values
-        none_text = trans.get("none", "none")
-        years_old_text = trans.get("vissum_yrsold", " years old")
-
-        # Replace empty values
-        history = patient_data.history if patient_data.history else none_text
-        exam = patient_data.exam_findings if patient_data.exam_findings else none_text
-        lab = patient_data.lab_results if patient_data.lab_results else none_text
-
-        summary = (
-            '<p style="font-size:18px;">'
-            f'<b>{trans.get("vissum_patient", "Patient: ")}</b>'
-            f"{patient_data.gender}, {patient_data.age}{years_old_text}<br/>"
-            f'<b>{trans.get("vissum_pregnancy", "Pregnancy: ")}</b>{patient_data.is_pregnant}<br/>'
-            f'<b>{trans.get("vissum_history", "History: ")}</b>{history}<br/>'
-            f'<b>{trans.get("vissum_symp", "Symptoms: ")}</b>{patient_data.symptoms}<br/>'
-            f'<b>{trans.get("vissum_exam", "Examination findings: ")}</b>{exam}<br/>'
-            f'<b>{trans.get("vissum_lab", "Laboratory test results: ")}</b>{lab}<br/>'
-            "</p>"
-        )
-
-        return summary
+        return self._compiled(language, "summary", translations=translations).fill(patient_data)
 
     def validate_prompt_configuration(self) -> bool:
         """
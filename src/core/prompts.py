@@ -4,7 +4,33 @@ Follows OpenAI's latest best practices for medical diagnosis.
 Optimized for GPT-5 Mini's 400K context window and multimodal capabilities.
 """
 
-from typing import Any, Dict
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+PROMPT_STYLES = ("enhanced", "compact")
+
+# Shared, language-independent instruction block for the compact style. Kept static
+# and first in the system prompt so it is identical (and cacheable) across requests.
+COMPACT_INSTRUCTIONS = """Medical AI assisting clinicians with preliminary diagnosis.
+Use all given data: demographics, Hx (history), Sx (symptoms), Exam, Labs. Omitted fields = not provided.
+Answer:
+1. Primary diagnosis
+2. Differentials (2-4)
+3. Next steps (tests, treatment, referral)
+4. Key considerations (urgent findings, contraindications)
+5. Confidence: high/medium/low
+6. Brief reasoning
+Preliminary only; confirm with a licensed clinician. Prioritize safety; say what data is missing."""
+
+
+def _provided(value: Optional[str], none_text: str = "none") -> bool:
+    """Check whether a free-text field holds information."""
+    if not value:
+        return False
+    text = value.strip().lower()
+    return bool(text) and text not in ("none", none_text.strip().lower())
 
 
 class GPT5MiniPrompts:
@@ -126,6 +152,60 @@ Respond in {language}. Be specific, evidence-based, and prioritize patient safet
 
         return prompt
 
+    @staticmethod
+    def get_compact_system_prompt(language: str = "English") -> str:
+        """
+        Get the compact system prompt: the shared instruction block plus the language.
+
+        Args:
+            language: Target language for responses
+
+        Returns:
+            str: System prompt
+        """
+        return f"{COMPACT_INSTRUCTIONS}\nRespond in {language}."
+
+    @staticmethod
+    def get_user_prompt_compact(
+        gender: str,
+        age: int,
+        is_pregnant: str,
+        history: str,
+        symptoms: str,
+        exam_findings: str,
+        lab_results: str,
+        language: str = "English",
+        none_text: str = "none",
+    ) -> str:
+        """
+        Build a token-minimal user prompt: terse labels, empty sections omitted.
+        The instructions live in the compact system prompt, so only case data is sent.
+
+        Args:
+            gender: Patient gender
+            age: Patient age
+            is_pregnant: Pregnancy status
+            history: Medical/environmental history
+            symptoms: Patient symptoms
+            exam_findings: Physical examination findings
+            lab_results: Laboratory test results
+            language: Target language for response (stated in the system prompt)
+            none_text: Localized "none" placeholder treated as empty
+
+        Returns:
+            str: Formatted user prompt
+        """
+        lines = [f"{gender}, {age}y, pregnant: {is_pregnant}"]
+        for label, value in (
+            ("Hx", history),
+            ("Sx", symptoms),
+            ("Exam", exam_findings),
+            ("Labs", lab_results),
+        ):
+            if _provided(value, none_text):
+                lines.append(f"{label}: {value.strip()}")
+        return "\n".join(lines)
+
     @staticmethod
     def get_structured_system_prompt(language: str = "English") -> str:
         """
@@ -168,7 +248,10 @@ Safety:
 
 
 def create_enhanced_prompts(
-    patient_data: Dict[str, Any], language: str = "English", use_structured: bool = True
+    patient_data: Dict[str, Any],
+    language: str = "English",
+    use_structured: bool = True,
+    style: str = "enhanced",
 ) -> tuple[str, str]:
     """
     Create optimized prompts for GPT-5 Mini.
@@ -177,26 +260,129 @@ def create_enhanced_prompts(
         patient_data: Dictionary containing patient information
         language: Target language for responses
         use_structured: Whether to use structured output prompts
+        style: "enhanced" (markdown scaffolding) or "compact" (fewest input tokens)
 
     Returns:
         tuple: (system_prompt, user_prompt)
     """
-    prompts = GPT5MiniPrompts()
+    if style not in PROMPT_STYLES:
+        raise ValueError(f"Unknown prompt style: {style}")
 
-    if use_structured:
-        system_prompt = prompts.get_structured_system_prompt(language)
+    prompts = GPT5MiniPrompts()
+    fields = {
+        "gender": patient_data.get("gender", "Unknown"),
+        "age": patient_data.get("age", 0),
+        "is_pregnant": patient_data.get("is_pregnant", "no"),
+        "history": patient_data.get("history", "none"),
+        "symptoms": patient_data.get("symptoms", ""),
+        "exam_findings": patient_data.get("exam_findings", "none"),
+        "lab_results": patient_data.get("lab_results", "none"),
+        "language": language,
+    }
+
+    if style == "compact":
+        system_prompt = prompts.get_compact_system_prompt(language)
+        user_prompt = prompts.get_user_prompt_compact(
+            **fields, none_text=patient_data.get("none_text", "none")
+        )
     else:
-        system_prompt = prompts.get_system_prompt(language)
-
-    user_prompt = prompts.get_user_prompt_enhanced(
-        gender=patient_data.get("gender", "Unknown"),
-        age=patient_data.get("age", 0),
-        is_pregnant=patient_data.get("is_pregnant", "no"),
-        history=patient_data.get("history", "none"),
-        symptoms=patient_data.get("symptoms", ""),
-        exam_findings=patient_data.get("exam_findings", "none"),
-        lab_results=patient_data.get("lab_results", "none"),
-        language=language,
-    )
+        if use_structured:
+            system_prompt = prompts.get_structured_system_prompt(language)
+        else:
+            system_prompt = prompts.get_system_prompt(language)
+        user_prompt = prompts.get_user_prompt_enhanced(**fields)
 
     return system_prompt, user_prompt
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> Optional[int]:
+    """
+    Count tokens with tiktoken, if installed.
+
+    Args:
+        text: Text to count
+        model: Model whose encoding is used (o200k_base if unknown)
+
+    Returns:
+        int: Token count, or None when tiktoken is not available
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("o200k_base")
+    return len(encoding.encode(text))
+
+
+def prompt_token_report(
+    translations: Mapping[str, Mapping[str, str]],
+    sample: Optional[Dict[str, Any]] = None,
+    model: str = "gpt-4o-mini",
+) -> List[Dict[str, Any]]:
+    """
+    Measure the input size of each prompt style for every language.
+
+    Token counts use tiktoken when installed; otherwise `tokens` is an estimate
+    (UTF-8 bytes / 4) and `exact` is False.
+
+    Args:
+        translations: Translations per language (for localized gender/none values)
+        sample: Patient fields to render (default: a typical case with empty exam/labs)
+        model: Model whose tokenizer is used
+
+    Returns:
+        list: One row per (language, style) with chars, tokens and exact flag
+    """
+    sample = sample or {
+        "age": 42,
+        "history": "Returned from Southeast Asia two weeks ago",
+        "symptoms": "Fever 39C for 4 days, headache, retro-orbital pain, rash",
+        "exam_findings": "",
+        "lab_results": "",
+    }
+    rows = []
+    for language, trans in translations.items():
+        none_text = trans.get("none", "none")
+        patient = {
+            "gender": trans.get("female", "Female"),
+            "is_pregnant": trans.get("no", "no"),
+            "none_text": none_text,
+            **sample,
+        }
+        for field in ("history", "exam_findings", "lab_results"):
+            patient[field] = patient[field] or none_text
+        for style in PROMPT_STYLES:
+            system_prompt, user_prompt = create_enhanced_prompts(
+                patient, language=language, use_structured=False, style=style
+            )
+            text = system_prompt + user_prompt
+            tokens = count_tokens(text, model)
+            rows.append(
+                {
+                    "language": language,
+                    "style": style,
+                    "chars": len(text),
+                    "tokens": tokens if tokens is not None else len(text.encode("utf-8")) // 4,
+                    "exact": tokens is not None,
+                }
+            )
+    return rows
+
+
+if __name__ == "__main__":
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("Assets/translations.json")
+    with open(path, encoding="utf-8") as f:
+        report = prompt_token_report(json.load(f))
+    if not all(row["exact"] for row in report):
+        print("tiktoken not installed: token counts are estimates (UTF-8 bytes / 4)")
+    baseline = {row["language"]: row["tokens"] for row in report if row["style"] == "enhanced"}
+    print(f"{'language':<12}{'style':<10}{'chars':>7}{'tokens':>8}{'saved':>8}")
+    for row in report:
+        saved = 1 - row["tokens"] / baseline[row["language"]]
+        print(
+            f"{row['language']:<12}{row['style']:<10}{row['chars']:>7}{row['tokens']:>8}"
+            f"{saved:>8.0%}"
+        )
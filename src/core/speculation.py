@@ -0,0 +1,288 @@
+"""
+Speculative pre-submission of diagnosis requests.
+Most users press submit right after finishing the case. Once the case has stayed
+unchanged for a debounce interval, the request is started in the background; a
+submit of the same case reuses it, any edit cancels it. Work that is never claimed is
+charged against a per-hour token budget, so speculation never costs more than configured.
+"""
+
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Dict, MutableMapping, Optional, Tuple
+
+from ..utils.logger import get_logger
+from ..utils.metrics import DiagnosisMetrics, MetricsRegistry, RollingWindow, get_diagnosis_metrics
+from .cancellation import REASON_SUPERSEDED
+from .jobs import DiagnosisJob, JobExecutor, JobState
+from .urgency import PRIORITY_ROUTINE, PRIORITY_SPECULATIVE
+
+STATE_KEY = "_speculation"
+
+
+def speculation_key(prompt: str, language: str) -> str:
+    """Identity of a case: the exact prompt that would be submitted, and its language."""
+    return hashlib.sha256(f"{language}\n{prompt}".encode()).hexdigest()
+
+
+class SpeculationMetrics:
+    """Speculation outcomes and the tokens spent on speculations nobody used."""
+
+    def __init__(self, registry: MetricsRegistry, window: RollingWindow):
+        """
+        Args:
+            registry: Registry the metrics are registered in
+            window: Rolling window feeding the operator dashboard
+        """
+        self.window = window
+        self.outcomes = registry.counter(
+            "mdxapp_speculative_total", "Speculative diagnoses by outcome", ["outcome"]
+        )
+        self.wasted_tokens = registry.counter(
+            "mdxapp_speculative_wasted_tokens_total",
+            "Tokens spent on speculative diagnoses that were discarded",
+        )
+
+    def record(self, outcome: str, wasted_tokens: int = 0) -> None:
+        """
+        Record a speculative diagnosis event.
+
+        Args:
+            outcome: "started", "hit", "discarded", "expired" (never claimed) or "over_budget"
+            wasted_tokens: Tokens spent by a discarded or expired speculation
+        """
+        self.outcomes.labels(outcome).inc()
+        self.window.add(f"speculative_{outcome}")
+        if wasted_tokens:
+            self.wasted_tokens.inc(wasted_tokens)
+            self.window.add("speculative_wasted_tokens", wasted_tokens)
+
+    def window_summary(self, seconds: float) -> Dict[str, Any]:
+        """Speculations started, hits, hit rate and wasted tokens over the last `seconds`."""
+        counters = self.window.summary(seconds)["counters"]
+        started = counters.get("speculative_started", 0.0)
+        hits = counters.get("speculative_hit", 0.0)
+        return {
+            "started": started,
+            "hits": hits,
+            "hit_rate": hits / started if started else None,
+            "wasted_tokens": counters.get("speculative_wasted_tokens", 0.0),
+        }
+
+
+def get_speculation_metrics(metrics: Optional[DiagnosisMetrics] = None) -> SpeculationMetrics:
+    """Speculation metrics in the registry and window of `metrics` (default: process metrics)."""
+    metrics = metrics or get_diagnosis_metrics()
+    return SpeculationMetrics(metrics.registry, metrics.window)
+
+
+class SpeculationManager:
+    """
+    Starts, reuses and discards speculative diagnosis jobs.
+
+    The manager is process-wide (budget and metrics); the speculation of each
+    session lives in that session's state under `state_key`.
+    """
+
+    def __init__(
+        self,
+        executor: JobExecutor,
+        debounce: float = 3.0,
+        budget_tokens: int = 50_000,
+        budget_window: float = 3600.0,
+        estimate_tokens: int = 3000,
+        metrics: Optional[DiagnosisMetrics] = None,
+        state_key: str = STATE_KEY,
+    ):
+        """
+        Args:
+            executor: Executor running the diagnosis jobs
+            debounce: Seconds a case must stay unchanged before it is speculated on
+            budget_tokens: Tokens unclaimed speculations may spend per budget window
+            budget_window: Budget window in seconds
+            estimate_tokens: Tokens reserved while a speculation runs (settled to its
+                             actual spend when it finishes, refunded when claimed)
+            metrics: Metrics whose registry receives the speculation outcomes
+                     (default: process metrics)
+            state_key: Session-state key of a session's speculation
+        """
+        self.executor = executor
+        self.debounce = debounce
+        self.budget_tokens = budget_tokens
+        self.budget_window = budget_window
+        self.estimate_tokens = estimate_tokens
+        self.metrics = get_speculation_metrics(metrics)
+        self.state_key = state_key
+        self.logger = get_logger(__name__)
+
+        # Budget charges per speculation: (time, tokens, settled). A reservation until
+        # the job finishes, then its actual spend; removed when the job is claimed
+        self._charges: Dict[str, Tuple[float, int, bool]] = {}
+        # Speculations neither claimed nor discarded yet (reported as waste on expiry)
+        self._open: Dict[str, DiagnosisJob] = {}
+        self._lock = threading.Lock()
+
+    def wasted_tokens(self, now: Optional[float] = None) -> int:
+        """
+        Tokens charged to the budget within the budget window: reservations of running
+        speculations and the spend of finished ones nobody claimed.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._charged(now)
+
+    def _charged(self, now: float) -> int:
+        for job_id, (charged_at, _, settled) in list(self._charges.items()):
+            if settled and now - charged_at > self.budget_window:
+                del self._charges[job_id]
+        for job_id, job in list(self._open.items()):
+            # Finished, never claimed and collected by the executor: the session left
+            if job.finished_at is not None and now - job.finished_at > self.executor.result_ttl:
+                del self._open[job_id]
+                charge = self._charges.get(job_id)
+                self.metrics.record("expired", charge[1] if charge else 0)
+        return sum(tokens for _, tokens, _ in self._charges.values())
+
+    def observe(
+        self,
+        state: MutableMapping[str, Any],
+        prompt: str,
+        language: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        session_id: Optional[str] = None,
+        client: Optional[str] = None,
+        now: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Optional[str]:
+        """
+        Look at the case as it is now; start a speculation once it has settled.
+        Call periodically (at about the debounce interval) while the case is edited.
+
+        Args:
+            state: Session state
+            prompt: User prompt the case would be submitted with
+            language: Language of the case
+            fn: Diagnosis function (as passed to `JobExecutor.submit`)
+            *args: Positional arguments for `fn`
+            session_id: Session the speculation belongs to
+            client: Key of the session's browser (passed to `JobExecutor.submit`)
+            now: Current time (default: time.time())
+            **kwargs: Keyword arguments for `fn`
+
+        Returns:
+            str: ID of the speculative job, or None if none is running
+        """
+        now = time.time() if now is None else now
+        key = speculation_key(prompt, language)
+        spec = state.get(self.state_key)
+        if spec is None or spec["key"] != key:
+            # New or edited case: restart the debounce
+            self.discard(state)
+            state[self.state_key] = {"key": key, "since": now, "job_id": None}
+            return None
+
+        if spec["job_id"] is not None:
+            # Lookups keep the job from being reaped as abandoned
+            if self.executor.get(spec["job_id"]) is not None:
+                return spec["job_id"]
+            # Reaped by the executor (its result expired): restart the debounce
+            state[self.state_key] = {"key": key, "since": now, "job_id": None}
+            return None
+        if now - spec["since"] < self.debounce:
+            return None
+
+        # Check and reserve together, so concurrent sessions cannot overshoot the budget
+        with self._lock:
+            if self._charged(now) + self.estimate_tokens > self.budget_tokens:
+                job = None
+            else:
+                job_id = self.executor.submit(
+                    fn,
+                    *args,
+                    session_id=session_id,
+                    language=language,
+                    priority=PRIORITY_SPECULATIVE,
+                    client=client,
+                    **kwargs,
+                )
+                job = self.executor.get(job_id)
+                self._charges[job_id] = (now, self.estimate_tokens, False)
+                self._open[job_id] = job
+        if job is None:
+            # Counted once per case; later calls retry once the budget window has room
+            if not spec.get("over_budget"):
+                spec["over_budget"] = True
+                self.metrics.record("over_budget")
+            return None
+
+        spec.pop("over_budget", None)
+        job.add_done_callback(self._settle)
+        spec["job_id"] = job.job_id
+        self.metrics.record("started")
+        self.logger.info(f"Started speculative diagnosis {spec['job_id']}")
+        return spec["job_id"]
+
+    def claim(
+        self,
+        state: MutableMapping[str, Any],
+        prompt: str,
+        language: str,
+        priority: int = PRIORITY_ROUTINE,
+    ) -> Optional[str]:
+        """
+        Reuse the session's speculation for a real submission of this case.
+
+        Args:
+            state: Session state
+            prompt: User prompt being submitted
+            language: Language of the case
+            priority: Priority of the real submission (applied if still queued)
+
+        Returns:
+            str: ID of the job to wait for, or None if the case must be submitted
+        """
+        spec = state.get(self.state_key)
+        job_id = spec["job_id"] if spec else None
+        job = self.executor.get(job_id)
+        if (
+            job is None
+            or spec["key"] != speculation_key(prompt, language)
+            or job.state in (JobState.FAILED, JobState.CANCELLED)
+            or (job.done and not job.result)
+        ):
+            self.discard(state)
+            return None
+
+        del state[self.state_key]
+        with self._lock:
+            # Real work now: refund its budget charge
+            self._charges.pop(job.job_id, None)
+            self._open.pop(job.job_id, None)
+        self.executor.reprioritize(job.job_id, priority)
+        self.metrics.record("hit")
+        self.logger.info(f"Reusing speculative diagnosis {job.job_id}")
+        return job.job_id
+
+    def discard(self, state: MutableMapping[str, Any]) -> None:
+        """Cancel the session's speculation (if any); its tokens stay charged to the budget."""
+        spec = state.pop(self.state_key, None)
+        job = self.executor.get(spec["job_id"]) if spec else None
+        if job is None:
+            return
+        with self._lock:
+            self._open.pop(job.job_id, None)
+        self.executor.cancel(job.job_id, REASON_SUPERSEDED)
+        job.add_done_callback(self._discarded)
+
+    def _settle(self, job: DiagnosisJob) -> None:
+        """Replace a finished speculation's reservation with its actual spend."""
+        tokens = job.usage.get("prompt", 0) + job.usage.get("completion", 0)
+        with self._lock:
+            if job.job_id in self._charges:
+                self._charges[job.job_id] = (time.time(), tokens, True)
+
+    def _discarded(self, job: DiagnosisJob) -> None:
+        tokens = job.usage.get("prompt", 0) + job.usage.get("completion", 0)
+        self.metrics.record("discarded", tokens)
+        self.executor.forget(job.job_id)
@@ -0,0 +1,134 @@
+"""
+Fast triage answer for the two-stage diagnosis pipeline.
+A small model with minimal reasoning returns a terse primary diagnosis and an
+urgency flag within seconds, while the full structured assessment still runs.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+import openai
+from pydantic import BaseModel, Field
+
+from ..utils.logger import get_logger
+from ..utils.metrics import get_diagnosis_metrics
+from ..utils.tracing import get_tracer
+from .ai_client import DiagnosisAIClient
+from .cancellation import DiagnosisCancelledError, current_cancel_token
+
+# Appended after the case, so the system prompt and case stay a shared cached prefix
+TRIAGE_INSTRUCTION = (
+    "Triage only: reply with the single most likely diagnosis in a few words and "
+    "whether the patient needs emergency care now. No explanation."
+)
+
+
+class TriageOutput(BaseModel):
+    """Terse first answer shown until the full assessment arrives."""
+
+    primary_diagnosis: str = Field(description="Most likely diagnosis, a few words")
+    urgent: bool = Field(description="True if the patient needs emergency care now")
+
+
+class DiagnosisTriage:
+    """
+    Triages cases with a small, low-reasoning model.
+
+    The request repeats the full diagnosis prompt (system prompt, then the case)
+    and adds the triage instruction last, so both stages send the same prefix.
+    Results are cached per prompt.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        model: str = "gpt-5-nano",
+        reasoning_effort: Optional[str] = "minimal",
+        max_completion_tokens: int = 400,
+        max_entries: int = 256,
+    ):
+        """
+        Args:
+            client: OpenAI client (e.g. `DiagnosisAIClient.client`)
+            model: Triage model (small and fast; the diagnosis model is not used)
+            reasoning_effort: Reasoning effort for reasoning models (None: model default)
+            max_completion_tokens: Completion budget per triage (includes reasoning tokens)
+            max_entries: Triage results kept in memory (least recently used dropped)
+        """
+        self.client = client
+        self.model = model
+        self.reasoning_effort = reasoning_effort
+        self.max_completion_tokens = max_completion_tokens
+        self.max_entries = max_entries
+        self.logger = get_logger(__name__)
+
+        self._cache: OrderedDict[str, TriageOutput] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def triage(self, system_prompt: str, user_prompt: str, **kwargs: Any) -> Optional[TriageOutput]:
+        """
+        Get a quick primary diagnosis and urgency flag.
+
+        Args:
+            system_prompt: System prompt of the full diagnosis
+            user_prompt: User prompt of the full diagnosis (the case)
+            **kwargs: cancel_token to override the current job's cancellation token,
+                      prompt_cache_key to share the full diagnosis' prompt cache
+
+        Returns:
+            TriageOutput: Triage result, or None if the call failed
+
+        Raises:
+            DiagnosisCancelledError: If the cancellation token fired before the request
+        """
+        key = hashlib.sha256(f"{system_prompt}\n{user_prompt}".encode()).hexdigest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        params = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+                {"role": "system", "content": TRIAGE_INSTRUCTION},
+            ],
+            "response_format": TriageOutput,
+            "max_completion_tokens": self.max_completion_tokens,
+        }
+        if self.reasoning_effort is not None and "gpt-5" in self.model.lower():
+            params["reasoning_effort"] = self.reasoning_effort
+        if kwargs.get("prompt_cache_key"):
+            params["prompt_cache_key"] = kwargs["prompt_cache_key"]
+
+        try:
+            # Not streamed, so cancellation applies before the call and via the deadline
+            token = kwargs.get("cancel_token") or current_cancel_token()
+            DiagnosisAIClient._apply_deadline(params, token)
+            metrics = get_diagnosis_metrics()
+            upstream_span = get_tracer().span("triage_call", model=self.model)
+            with upstream_span, metrics.track_request(self.model):
+                completion = self.client.beta.chat.completions.parse(**params)
+                metrics.record_usage(self.model, completion.usage)
+        except DiagnosisCancelledError:
+            raise
+        except openai.APIError as e:
+            self.logger.error(f"OpenAI API error during triage: {e}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Unexpected error during triage: {e}")
+            return None
+
+        result = completion.choices[0].message.parsed
+        if result is None:
+            return None
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        self.logger.info(f"Triage: {'urgent' if result.urgent else 'not urgent'}")
+        return result
@@ -0,0 +1,236 @@
+"""
+Local clinical urgency score for scheduling diagnosis requests.
+A cheap keyword and demographic check (no model call) that lets urgent
+presentations jump ahead of routine ones when the job queue is long.
+"""
+
+import re
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Pattern, Tuple
+
+# Scheduling priorities (higher runs first)
+PRIORITY_SPECULATIVE = -1
+PRIORITY_ROUTINE = 0
+PRIORITY_ELEVATED = 1
+PRIORITY_URGENT = 2
+
+PRIORITY_NAMES: Dict[int, str] = {
+    PRIORITY_SPECULATIVE: "speculative",
+    PRIORITY_ROUTINE: "routine",
+    PRIORITY_ELEVATED: "elevated",
+    PRIORITY_URGENT: "urgent",
+}
+
+# Red-flag terms per form language, matched case-insensitively at the start of a word
+# (so stems such as "suicid" or "convulsi" cover their inflections)
+RED_FLAG_TERMS: Dict[str, Tuple[str, ...]] = {
+    "English": (
+        "chest pain",
+        "shortness of breath",
+        "difficulty breathing",
+        "unconscious",
+        "unresponsive",
+        "seizure",
+        "stroke",
+        "paralysis",
+        "slurred speech",
+        "severe bleeding",
+        "hemorrhag",
+        "haemorrhag",
+        "vomiting blood",
+        "coughing blood",
+        "suicid",
+        "anaphyla",
+        "stiff neck",
+        "confusion",
+        "fainting",
+        "syncope",
+        "sepsis",
+        "cyanosis",
+        "worst headache",
+    ),
+    "Français": (
+        "douleur thoracique",
+        "essoufflement",
+        "dyspnée",
+        "détresse respiratoire",
+        "inconscien",
+        "convulsi",
+        "avc",
+        "paralysie",
+        "hémorragie",
+        "saignement abondant",
+        "hématémèse",
+        "hémoptysie",
+        "suicid",
+        "anaphyla",
+        "raideur de la nuque",
+        "confusion",
+        "syncope",
+        "septi",
+        "cyanose",
+    ),
+    "日本語": (
+        "胸痛",
+        "呼吸困難",
+        "息切れ",
+        "意識障害",
+        "意識消失",
+        "痙攣",
+        "けいれん",
+        "脳卒中",
+        "麻痺",
+        "大出血",
+        "吐血",
+        "喀血",
+        "自殺",
+        "アナフィラキシー",
+        "項部硬直",
+        "錯乱",
+        "失神",
+        "敗血症",
+        "チアノーゼ",
+    ),
+    "Español": (
+        "dolor torácico",
+        "dolor de pecho",
+        "disnea",
+        "dificultad para respirar",
+        "inconsciente",
+        "convulsi",
+        "ictus",
+        "derrame cerebral",
+        "parálisis",
+        "hemorragia",
+        "sangrado abundante",
+        "hematemesis",
+        "hemoptisis",
+        "suicid",
+        "anafila",
+        "rigidez de nuca",
+        "confusión",
+        "síncope",
+        "desmayo",
+        "sepsis",
+        "cianosis",
+    ),
+    "Deutsch": (
+        "brustschmerz",
+        "thoraxschmerz",
+        "atemnot",
+        "dyspnoe",
+        "bewusstlos",
+        "krampfanfall",
+        "schlaganfall",
+        "lähmung",
+        "starke blutung",
+        "bluterbrechen",
+        "bluthusten",
+        "suizid",
+        "anaphyla",
+        "nackensteifigkeit",
+        "verwirrt",
+        "synkope",
+        "ohnmacht",
+        "sepsis",
+        "zyanose",
+    ),
+}
+
+# Score weights
+RED_FLAG_POINTS = 3
+EXTRA_RED_FLAG_POINTS = 1
+EXTREME_AGE_POINTS = 2
+VULNERABLE_AGE_POINTS = 1
+PREGNANCY_POINTS = 2
+
+
+class UrgencyAssessment(NamedTuple):
+    """Result of the urgency check."""
+
+    score: int
+    priority: int
+    reasons: Tuple[str, ...]
+
+
+def _compile_red_flags(terms: Mapping[str, Tuple[str, ...]]) -> Pattern[str]:
+    """Build one alternation over all languages (scripts without word breaks match anywhere)."""
+    alternatives = []
+    for term in sorted({t for group in terms.values() for t in group}, key=len, reverse=True):
+        # Kana and CJK (U+3000 onwards) are written without spaces between words
+        boundary = "" if ord(term[0]) >= 0x3000 else r"(?<!\w)"
+        alternatives.append(boundary + re.escape(term))
+    return re.compile("|".join(alternatives), re.IGNORECASE)
+
+
+_RED_FLAGS = _compile_red_flags(RED_FLAG_TERMS)
+
+
+def red_flags(*texts: Optional[str]) -> List[str]:
+    """
+    Find red-flag terms in free-text fields.
+
+    Args:
+        *texts: Field values (None and empty strings are skipped)
+
+    Returns:
+        list: Matched terms, lower-cased, in order of appearance (no duplicates)
+    """
+    found: List[str] = []
+    for text in texts:
+        if not text:
+            continue
+        for match in _RED_FLAGS.finditer(text):
+            term = match.group(0).lower()
+            if term not in found:
+                found.append(term)
+    return found
+
+
+def assess_urgency(
+    patient: Any, translations: Optional[Mapping[str, Any]] = None
+) -> UrgencyAssessment:
+    """
+    Score a case for scheduling.
+
+    Red flags in symptoms or exam findings, infants and the very old, and
+    pregnancy raise the score; the score maps to a scheduling priority.
+
+    Args:
+        patient: PatientData (or an object with the same attributes)
+        translations: Translation dictionary of the form language (to read the
+            translated pregnancy answer)
+
+    Returns:
+        UrgencyAssessment: Score, priority and the reasons behind it
+    """
+    score = 0
+    reasons: List[str] = []
+
+    flags = red_flags(patient.symptoms, patient.exam_findings)
+    if flags:
+        score += RED_FLAG_POINTS + EXTRA_RED_FLAG_POINTS * (len(flags) - 1)
+        reasons.extend(f"red_flag:{flag}" for flag in flags)
+
+    age = patient.age
+    if age is not None:
+        if age < 1 or age >= 80:
+            score += EXTREME_AGE_POINTS
+            reasons.append("extreme_age")
+        elif age < 5 or age >= 65:
+            score += VULNERABLE_AGE_POINTS
+            reasons.append("vulnerable_age")
+
+    yes = {"yes"}
+    if translations is not None:
+        yes.add(str(translations.get("yes", "yes")).lower())
+    if str(patient.is_pregnant or "").lower() in yes:
+        score += PREGNANCY_POINTS
+        reasons.append("pregnancy")
+
+    if score >= RED_FLAG_POINTS:
+        priority = PRIORITY_URGENT
+    elif score > 0:
+        priority = PRIORITY_ELEVATED
+    else:
+        priority = PRIORITY_ROUTINE
+    return UrgencyAssessment(score, priority, tuple(reasons))
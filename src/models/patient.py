@@ -71,7 +71,7 @@ class PatientData(BaseModel):
         gender = info.data.get("gender", "")
 
         # Check if male patient is marked as pregnant
-        if "male" in gender.lower() and v.lower() == "yes":
+        if gender.lower() == Gender.MALE.value and v.lower() == "yes":
             return "no"  # Auto-correct instead of raising error
 
         return v
@@ -0,0 +1,197 @@
+"""
+Hot reload of translations and prompt templates for MDxApp.
+A background watcher polls source files and swaps rebuilt objects in atomically,
+so edits take effect on the next rerun without restarting the process.
+"""
+
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from ..core.prompt_builder import PromptBuilder
+from .i18n import I18n
+from .logger import get_logger
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:  # pragma: no cover - Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+logger = get_logger(__name__)
+
+
+class FileWatcher:
+    """
+    Polls files for modification-time changes from a daemon thread.
+
+    Polling keeps the watcher dependency-free and works on network and container
+    file systems where inotify events are unreliable.
+    """
+
+    def __init__(self, interval: float = 2.0):
+        """
+        Args:
+            interval: Seconds between polls
+        """
+        self.interval = interval
+        self._watches: Dict[Path, Tuple[Optional[int], List[Callable[[Path], None]]]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _mtime_ns(path: Path) -> Optional[int]:
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def watch(self, path: Path, callback: Callable[[Path], None]) -> None:
+        """
+        Call `callback(path)` from the watcher thread whenever `path` changes.
+
+        Args:
+            path: File to watch (may not exist yet)
+            callback: Rebuild function; exceptions are logged, not raised
+        """
+        path = Path(path).resolve()
+        with self._lock:
+            mtime, callbacks = self._watches.get(path, (self._mtime_ns(path), []))
+            if callback not in callbacks:
+                callbacks.append(callback)
+            self._watches[path] = (mtime, callbacks)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="mdxapp-hot-reload", daemon=True
+                )
+                self._thread.start()
+
+    def check(self) -> List[Path]:
+        """
+        Poll every watched file once and run the callbacks of changed ones.
+
+        Returns:
+            list: Paths that changed
+        """
+        with self._lock:
+            watches = list(self._watches.items())
+
+        changed = []
+        for path, (mtime, callbacks) in watches:
+            current = self._mtime_ns(path)
+            if current == mtime:
+                continue
+            with self._lock:
+                self._watches[path] = (current, callbacks)
+            changed.append(path)
+            for callback in callbacks:
+                try:
+                    callback(path)
+                except Exception as e:
+                    # Keep serving the previous version until the file is fixed
+                    logger.error(f"Hot reload of {path} failed: {e}")
+        return changed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def stop(self) -> None:
+        """Stop polling."""
+        self._stop.set()
+
+
+def load_prompt_canvas(secrets_path: Path) -> Optional[Tuple[str, List[str]]]:
+    """
+    Read the `[prompt_canvas]` table from a Streamlit secrets file.
+
+    Args:
+        secrets_path: Path to secrets.toml
+
+    Returns:
+        tuple: (prompt_system, prompt_words), or None if the table is absent
+    """
+    if tomllib is None:
+        raise RuntimeError("Reading secrets.toml requires Python 3.11+ or the tomli package")
+    with open(secrets_path, "rb") as f:
+        secrets = tomllib.load(f)
+    canvas = secrets.get("prompt_canvas")
+    if not isinstance(canvas, Mapping):
+        return None
+    return str(canvas.get("prompt_system", "")), list(canvas.get("prompt_words", []))
+
+
+def secrets_file_paths(project_root: Optional[Path] = None) -> List[Path]:
+    """
+    Get the secrets.toml locations Streamlit reads, most specific last.
+
+    Args:
+        project_root: Directory Streamlit is started from (default: cwd)
+
+    Returns:
+        list: Candidate paths (they may not exist)
+    """
+    root = project_root or Path.cwd()
+    return [Path.home() / ".streamlit" / "secrets.toml", root / ".streamlit" / "secrets.toml"]
+
+
+_watcher: Optional[FileWatcher] = None
+_watcher_lock = threading.Lock()
+_enabled: Dict[Tuple[int, int], bool] = {}
+
+
+def get_file_watcher(interval: float = 2.0) -> FileWatcher:
+    """Get the process-wide file watcher (the first call sets the interval)."""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = FileWatcher(interval)
+        return _watcher
+
+
+def enable_hot_reload(
+    i18n: I18n,
+    prompt_builder: PromptBuilder,
+    secrets_paths: List[Path],
+    watcher: Optional[FileWatcher] = None,
+) -> None:
+    """
+    Rebuild translations and prompt templates in the background when their files change.
+    Idempotent per (i18n, prompt_builder) pair.
+
+    Args:
+        i18n: Shared translations to reload
+        prompt_builder: Shared prompt builder whose templates are swapped
+        secrets_paths: secrets.toml files holding `[prompt_canvas]`
+        watcher: File watcher (default: process-wide watcher)
+    """
+    key = (id(i18n), id(prompt_builder))
+    with _watcher_lock:
+        if _enabled.get(key):
+            return
+        _enabled[key] = True
+    watcher = watcher or get_file_watcher()
+
+    def _reload_translations(path: Path) -> None:
+        # A rerun's get_i18n() may have reloaded first; re-point the builder either way
+        # (the page passes each rerun's bundle explicitly, so this is the default only)
+        i18n.refresh_if_changed()
+        prompt_builder.translations = i18n.bundles()
+
+    def _reload_prompts(path: Path) -> None:
+        # A later file overrides an earlier one, as in Streamlit
+        canvas = None
+        for secrets_path in secrets_paths:
+            if secrets_path.exists():
+                canvas = load_prompt_canvas(secrets_path) or canvas
+        if canvas is not None:
+            prompt_system, prompt_words = canvas
+            prompt_builder.update_templates(prompt_words, prompt_system)
+
+    watcher.watch(i18n.translations_path, _reload_translations)
+    for secrets_path in secrets_paths:
+        watcher.watch(secrets_path, _reload_prompts)
@@ -4,10 +4,18 @@ Handles translation loading, retrieval, and language management.
 """
 
 import json
+import threading
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional
 
 from ..utils.logger import get_logger
+from .translation_catalogs import (
+    default_catalog_dir,
+    load_catalogs,
+    merge_fallback,
+    write_catalogs,
+)
 
 
 class I18n:
@@ -16,33 +24,69 @@ class I18n:
     Provides easy access to translations with fallback support.
     """
 
-    def __init__(self, translations_path: Path):
+    def __init__(self, translations_path: Path, catalog_dir: Optional[Path] = None):
         """
         Initialize i18n with translations from file.
 
         Args:
             translations_path: Path to translations JSON file
+            catalog_dir: Compiled catalogs to load from when up to date (and to
+                refresh when stale); None always parses the JSON file
         """
         self.logger = get_logger(__name__)
-        self.translations: Dict[str, Dict[str, Any]] = {}
+        self.translations: Mapping[str, Mapping[str, Any]] = {}
         self.default_language = "English"
         self.translations_path = translations_path
+        self.catalog_dir = catalog_dir
+        self.missing_keys: Dict[str, List[str]] = {}
+        self.version = 0  # incremented on every (re)load, exposed for tracing
+        self._mtime_ns: Optional[int] = None
+        self._bundles: Mapping[str, Mapping[str, str]] = MappingProxyType({})
+        self._reload_lock = threading.Lock()
 
         self.load_translations()
 
     def load_translations(self) -> None:
         """
-        Load translations from JSON file.
+        Load translations from compiled catalogs if up to date, else from the JSON file.
 
         Raises:
             FileNotFoundError: If translations file doesn't exist
             JSONDecodeError: If translations file is invalid JSON
         """
         try:
-            with open(self.translations_path, encoding="utf-8") as f:
-                self.translations = json.load(f)
-
-            self.logger.info(f"Loaded translations for {len(self.translations)} languages")
+            mtime_ns = self.translations_path.stat().st_mtime_ns
+            source = self.translations_path.read_bytes()
+
+            catalogs = None
+            if self.catalog_dir is not None:
+                catalogs = load_catalogs(source, self.catalog_dir, self.default_language)
+
+            if catalogs is not None:
+                # Catalogs are merged and flattened already; languages load on first use
+                self.translations = catalogs
+                self.missing_keys = catalogs.missing
+                self._bundles = catalogs
+            else:
+                self.translations = json.loads(source)
+                merged = self._build_bundles()
+                if self.catalog_dir is not None:
+                    try:
+                        write_catalogs(
+                            source,
+                            merged,
+                            self.missing_keys,
+                            self.catalog_dir,
+                            self.default_language,
+                        )
+                    except OSError as e:
+                        self.logger.warning(f"Could not write translation catalogs: {e}")
+
+            self._mtime_ns = mtime_ns
+            self.version += 1
+            self.logger.info(
+                f"Loaded translations for {len(self._bundles)} languages (version {self.version})"
+            )
         except FileNotFoundError:
             self.logger.error(f"Translations file not found: {self.translations_path}")
             raise
@@ -50,6 +94,70 @@ class I18n:
             self.logger.error(f"Invalid JSON in translations file: {e}")
             raise
 
+    def _build_bundles(self) -> Dict[str, Dict[str, str]]:
+        """Merge the default-language fallback into flat catalogs and swap them in."""
+        merged, self.missing_keys = merge_fallback(self.translations, self.default_language)
+        for language, keys in self.missing_keys.items():
+            self.logger.debug(
+                f"{language}: {len(keys)} translation(s) missing, using {self.default_language}"
+            )
+        self._bundles = MappingProxyType(
+            {language: MappingProxyType(catalog) for language, catalog in merged.items()}
+        )
+        return merged
+
+    def bundles(self) -> Mapping[str, Mapping[str, str]]:
+        """
+        Get read-only translations for all languages.
+
+        Each language's catalog has missing keys filled from the default language.
+        The mappings are shared, not copied, so every session can hold them at no
+        extra memory cost; indexing works like the raw JSON dictionary.
+
+        Returns:
+            Mapping: Language -> read-only key/value mapping
+        """
+        return self._bundles
+
+    def bundle(self, language: str) -> Mapping[str, str]:
+        """
+        Get the read-only translations for one language (default language if unknown).
+
+        Args:
+            language: Target language
+
+        Returns:
+            Mapping: Read-only key/value mapping
+        """
+        bundles = self._bundles
+        if language in bundles:
+            return bundles[language]
+        return bundles.get(self.default_language, MappingProxyType({}))
+
+    def refresh_if_changed(self) -> bool:
+        """
+        Reload translations if the file's modification time changed.
+
+        Returns:
+            bool: True if translations were reloaded
+        """
+        try:
+            mtime_ns = self.translations_path.stat().st_mtime_ns
+        except OSError:
+            return False
+        if mtime_ns == self._mtime_ns:
+            return False
+        with self._reload_lock:
+            if mtime_ns == self._mtime_ns:
+                return False  # another session already reloaded
+            try:
+                self.reload_translations()
+            except (OSError, json.JSONDecodeError):
+                # Keep serving the last good translations while the file is being edited
+                self._mtime_ns = mtime_ns
+                return False
+        return True
+
     def get(self, language: str, key: str, default: Optional[str] = None) -> str:
         """
         Get translation for a specific key and language with fallback.
@@ -62,19 +170,10 @@ class I18n:
         Returns:
             str: Translated text or default value
         """
-        # Try to get translation for requested language
-        if language in self.translations:
-            if key in self.translations[language]:
-                return str(self.translations[language][key])
-
-        # Fallback to default language
-        if self.default_language in self.translations:
-            if key in self.translations[self.default_language]:
-                self.logger.debug(
-                    f"Translation '{key}' not found for '{language}', "
-                    f"using {self.default_language}"
-                )
-                return str(self.translations[self.default_language][key])
+        # Catalogs already contain the default-language fallback: one probe
+        value = self.bundle(language).get(key)
+        if value is not None:
+            return value
 
         # Return default or key itself
         if default is not None:
@@ -83,7 +182,7 @@ class I18n:
         self.logger.warning(f"Translation not found: {language}.{key}")
         return key
 
-    def get_all(self, language: str) -> Dict[str, Any]:
+    def get_all(self, language: str) -> Mapping[str, str]:
         """
         Get all translations for a specific language.
 
@@ -91,13 +190,11 @@ class I18n:
             language: Target language
 
         Returns:
-            dict: All translations for the language, or default language if not found
+            Mapping: All translations for the language, or default language if not found
         """
-        if language in self.translations:
-            return self.translations[language]
-
-        self.logger.warning(f"Language '{language}' not found, using {self.default_language}")
-        return self.translations.get(self.default_language, {})
+        if language not in self._bundles:
+            self.logger.warning(f"Language '{language}' not found, using {self.default_language}")
+        return self.bundle(language)
 
     def get_available_languages(self) -> List[str]:
         """
@@ -106,7 +203,7 @@ class I18n:
         Returns:
             list: List of language names
         """
-        return list(self.translations.keys())
+        return list(self._bundles.keys())
 
     def language_exists(self, language: str) -> bool:
         """
@@ -118,7 +215,7 @@ class I18n:
         Returns:
             bool: True if language exists
         """
-        return language in self.translations
+        return language in self._bundles
 
     def add_translation(self, language: str, key: str, value: str) -> None:
         """
@@ -129,10 +226,11 @@ class I18n:
             key: Translation key
             value: Translation value
         """
-        if language not in self.translations:
-            self.translations[language] = {}
-
-        self.translations[language][key] = value
+        translations = {lang: dict(values) for lang, values in self.translations.items()}
+        translations.setdefault(language, {})[key] = value
+        self.translations = translations
+        self._build_bundles()
+        self.version += 1
         self.logger.debug(f"Added translation: {language}.{key}")
 
     def reload_translations(self) -> None:
@@ -141,6 +239,36 @@ class I18n:
         self.logger.info("Translations reloaded")
 
 
+_instances: Dict[Path, I18n] = {}
+_instances_lock = threading.Lock()
+
+
+def get_i18n(translations_path: Path) -> I18n:
+    """
+    Get the process-wide I18n instance for a translations file.
+
+    The file is loaded once per process and shared by every session; it is
+    reloaded when its modification time changes. Compiled catalogs next to the
+    file are used when up to date and rebuilt otherwise.
+
+    Args:
+        translations_path: Path to translations JSON file
+
+    Returns:
+        I18n: Shared instance
+    """
+    key = Path(translations_path).resolve()
+    i18n = _instances.get(key)
+    if i18n is None:
+        with _instances_lock:
+            i18n = _instances.get(key)
+            if i18n is None:
+                i18n = _instances[key] = I18n(key, catalog_dir=default_catalog_dir(key))
+                return i18n
+    i18n.refresh_if_changed()
+    return i18n
+
+
 def load_translations(translations_path: Path) -> Dict[str, Dict[str, Any]]:
     """
     Simple function to load translations from JSON file.
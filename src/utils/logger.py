@@ -1,12 +1,210 @@
 """
 Logging configuration for MDxApp.
 Provides structured logging with different levels and formatters.
+
+Records are handed to a `QueueHandler` on the calling thread and written to the
+console / rotating log file by a single background `QueueListener`, so logging never
+blocks a diagnosis request on I/O.
 """
 
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+from .tracing import current_trace_id
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] - %(message)s"
+
+
+class TraceContextFilter(logging.Filter):
+    """Attach the active trace ID (or "-") to every log record as `trace_id`."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id() or "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Serialize log records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "trace_id": getattr(record, "trace_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TracebackQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that keeps the traceback apart from the message.
+
+    The stock `prepare()` formats the traceback into `msg` and drops `exc_info` and
+    `exc_text`, so sinks could not tell them apart (no "exception" field in JSON).
+    Here the message is merged with its args and the traceback is kept, as text, in
+    `exc_text` (exc_info holds a traceback object and is not kept).
+    """
+
+    _formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or self._formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Sample and rate-limit records below WARNING for hot-path loggers.
+
+    Sampling keeps a random fraction of records; the rate limit is a token bucket per
+    call site so one noisy log statement cannot starve the others. WARNING and above
+    always pass.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, max_per_second: Optional[float] = None):
+        """
+        Args:
+            sample_rate: Fraction of records kept (0-1)
+            max_per_second: Sustained records per second per call site
+        """
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.max_per_second = max_per_second
+        self._buckets: Dict[Tuple[str, int], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:  # noqa: S311
+            return False
+        if self.max_per_second is None:
+            return True
+
+        now = time.monotonic()
+        key = (record.pathname, record.lineno)
+        burst = max(1.0, self.max_per_second)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [burst, now]
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * self.max_per_second)
+            bucket[1] = now
+            if tokens < 1.0:
+                bucket[0] = tokens
+                return False
+            bucket[0] = tokens - 1.0
+            return True
+
+
+class _LoggingPipeline:
+    """Process-wide queue and listener shared by every MDxApp logger."""
+
+    def __init__(self) -> None:
+        self.queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        self.lock = threading.RLock()
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self.sink_config: Optional[Tuple[Any, ...]] = None
+        self.rate_limits: Dict[str, RateLimitFilter] = {}
+        self.trace_filter = TraceContextFilter()
+
+    def configure_sinks(
+        self,
+        log_file: Optional[Path],
+        format_json: bool,
+        max_bytes: int,
+        backup_count: int,
+        rotate_when: Optional[str],
+    ) -> None:
+        """(Re)start the listener when the sink configuration changes."""
+        config = (
+            str(log_file) if log_file else None,
+            format_json,
+            max_bytes,
+            backup_count,
+            rotate_when,
+        )
+        with self.lock:
+            if config == self.sink_config:
+                return
+
+            formatter: logging.Formatter = (
+                JsonFormatter() if format_json else logging.Formatter(TEXT_FORMAT)
+            )
+
+            # Console handler (stdout)
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(formatter)
+            handlers: List[logging.Handler] = [console_handler]
+
+            # File handler with size- or time-based rotation (if specified)
+            if log_file:
+                log_file.parent.mkdir(parents=True, exist_ok=True)
+                file_handler: logging.Handler
+                if rotate_when:
+                    file_handler = logging.handlers.TimedRotatingFileHandler(
+                        log_file, when=rotate_when, backupCount=backup_count, encoding="utf-8"
+                    )
+                else:
+                    file_handler = logging.handlers.RotatingFileHandler(
+                        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+                    )
+                file_handler.setFormatter(formatter)
+                handlers.append(file_handler)
+
+            if self.listener is not None:
+                self.listener.stop()
+                for handler in self.listener.handlers:
+                    handler.close()
+
+            self.listener = logging.handlers.QueueListener(
+                self.queue, *handlers, respect_handler_level=True
+            )
+            self.listener.start()
+            self.sink_config = config
+
+    def stop(self) -> None:
+        """Flush queued records and stop the listener."""
+        with self.lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+                self.sink_config = None
+
+
+_pipeline = _LoggingPipeline()
+atexit.register(_pipeline.stop)
+
+
+def _queue_handler(logger: logging.Logger) -> Optional[TracebackQueueHandler]:
+    for handler in logger.handlers:
+        if isinstance(handler, TracebackQueueHandler):
+            return handler
+    return None
 
 
 def setup_logger(
@@ -14,52 +212,81 @@ def setup_logger(
     level: int = logging.INFO,
     log_file: Optional[Path] = None,
     format_json: bool = False,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    rotate_when: Optional[str] = None,
 ) -> logging.Logger:
     """
     Configure and return a logger instance with consistent formatting.
 
+    The logger enqueues records; console and file output happen on the shared
+    background listener. Calling this again for the same logger is safe.
+
     Args:
         name: Logger name (default: "mdxapp")
         level: Logging level (default: INFO)
         log_file: Optional path to log file
         format_json: Use JSON formatting (default: False)
+        max_bytes: Rotate the log file at this size (default: 10 MB)
+        backup_count: Rotated files to keep (default: 5)
+        rotate_when: Rotate by time instead of size (e.g. "midnight", "H")
 
     Returns:
         logging.Logger: Configured logger instance
     """
     logger = logging.getLogger(name)
-    logger.setLevel(level)
-
-    # Remove existing handlers to avoid duplicates
-    logger.handlers.clear()
-
-    # Create formatter
-    if format_json:
-        # JSON format for structured logging (future enhancement)
-        log_format = '{"time": "%(asctime)s", "level": "%(levelname)s", "module": "%(module)s", "message": "%(message)s"}'
-    else:
-        # Human-readable format
-        log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-
-    formatter = logging.Formatter(log_format)
-
-    # Console handler (stdout)
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-
-    # File handler (if specified)
-    if log_file:
-        log_file.parent.mkdir(parents=True, exist_ok=True)
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(level)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+
+    with _pipeline.lock:
+        logger.setLevel(level)
+        if log_file is not None or format_json or _pipeline.sink_config is None:
+            _pipeline.configure_sinks(log_file, format_json, max_bytes, backup_count, rotate_when)
+
+        # Attach the queue handler once (no clear/re-add, so concurrent callers cannot race)
+        if _queue_handler(logger) is None:
+            queue_handler = TracebackQueueHandler(_pipeline.queue)
+            # Runs on the calling thread, where the trace context is visible
+            queue_handler.addFilter(_pipeline.trace_filter)
+            logger.addHandler(queue_handler)
+
+        rate_limit = _pipeline.rate_limits.get(name)
+        if rate_limit is not None and rate_limit not in logger.filters:
+            logger.addFilter(rate_limit)
 
     return logger
 
 
+def set_log_rate_limit(
+    name: str, sample_rate: float = 1.0, max_per_second: Optional[float] = None
+) -> None:
+    """
+    Sample and/or rate-limit sub-WARNING records of a hot-path logger.
+
+    Args:
+        name: Logger name (e.g. "src.core.ai_client")
+        sample_rate: Fraction of records kept (0-1)
+        max_per_second: Sustained records per second per call site
+    """
+    with _pipeline.lock:
+        logger = logging.getLogger(name)
+        previous = _pipeline.rate_limits.get(name)
+        if previous is not None:
+            if (previous.sample_rate, previous.max_per_second) == (sample_rate, max_per_second):
+                return
+            logger.removeFilter(previous)
+        rate_limit = RateLimitFilter(sample_rate=sample_rate, max_per_second=max_per_second)
+        _pipeline.rate_limits[name] = rate_limit
+        logger.addFilter(rate_limit)
+
+
+def flush_logs() -> None:
+    """Block until queued records are written (restarts the listener)."""
+    with _pipeline.lock:
+        listener = _pipeline.listener
+        if listener is not None:
+            listener.stop()
+            listener.start()
+
+
 def get_logger(name: str = "mdxapp") -> logging.Logger:
     """
     Get or create a logger instance.
@@ -73,7 +300,7 @@ def get_logger(name: str = "mdxapp") -> logging.Logger:
     logger = logging.getLogger(name)
 
     # If logger has no handlers, set it up with defaults
-    if not logger.handlers:
+    if _queue_handler(logger) is None:
         return setup_logger(name)
 
     return logger
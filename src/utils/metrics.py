@@ -0,0 +1,924 @@
+"""
+In-process metrics registry for MDxApp.
+Provides counters, gauges and histograms with Prometheus text-format export.
+
+Counters and histograms are sharded per thread: each thread updates its own cell
+without locking and readers merge the shards, so the hot path never contends.
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, tuned for LLM calls (sub-second TTFT up to long reasoning)
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    20.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+# Token totals of the unit of work running in this context (see `usage_scope`)
+_usage_scope: ContextVar[Optional[Dict[str, int]]] = ContextVar("mdxapp_usage_scope", default=None)
+_usage_scope_lock = threading.Lock()
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{_escape_label_value(str(val))}"' for key, val in labels.items())
+    return "{" + inner + "}"
+
+
+# USD per million tokens; override with the `model_pricing` secret
+DEFAULT_MODEL_PRICING: Dict[str, Dict[str, float]] = {
+    "gpt-5": {"input": 1.25, "cached_input": 0.125, "output": 10.0},
+    "gpt-5-mini": {"input": 0.25, "cached_input": 0.025, "output": 2.0},
+    "gpt-5-nano": {"input": 0.05, "cached_input": 0.005, "output": 0.40},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+}
+
+# Upstream statuses the OpenAI SDK retries automatically
+RETRYABLE_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+def _quantile(
+    cumulative_buckets: List[Tuple[float, float]], total: float, q: float
+) -> Optional[float]:
+    """Estimate a quantile (0-1) from cumulative bucket counts by linear interpolation."""
+    if not total:
+        return None
+    target = q * total
+    lower_bound, lower_count = 0.0, 0.0
+    for bound, cumulative in cumulative_buckets:
+        if cumulative >= target:
+            if math.isinf(bound):
+                return lower_bound
+            span = cumulative - lower_count
+            fraction = (target - lower_count) / span if span else 0.0
+            return lower_bound + (bound - lower_bound) * fraction
+        lower_bound, lower_count = bound, cumulative
+    return lower_bound
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _ShardedCell:
+    """
+    A vector of floats sharded by thread ID.
+
+    Each thread writes only to its own shard, so updates need no lock. The lock is
+    taken once per thread (shard creation) and never on the update path.
+    """
+
+    __slots__ = ("_size", "_shards", "_lock")
+
+    def __init__(self, size: int):
+        self._size = size
+        self._shards: Dict[int, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def shard(self) -> List[float]:
+        ident = threading.get_ident()
+        shard = self._shards.get(ident)
+        if shard is None:
+            with self._lock:
+                shard = self._shards.setdefault(ident, [0.0] * self._size)
+        return shard
+
+    def merged(self) -> List[float]:
+        totals = [0.0] * self._size
+        for shard in list(self._shards.values()):
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class _CounterChild:
+    __slots__ = ("_cell",)
+
+    def __init__(self) -> None:
+        self._cell = _ShardedCell(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the counter (amount must be non-negative)."""
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        self._cell.shard()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._cell.merged()[0]
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class _HistogramChild:
+    __slots__ = ("_buckets", "_cell")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        # Layout: one slot per bucket, then +Inf, sum and count
+        self._cell = _ShardedCell(len(buckets) + 3)
+
+    def observe(self, value: float) -> None:
+        shard = self._cell.shard()
+        index = len(self._buckets)
+        for i, bound in enumerate(self._buckets):
+            if value <= bound:
+                index = i
+                break
+        shard[index] += 1
+        shard[-2] += value
+        shard[-1] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return cumulative bucket counts, sum and count."""
+        merged = self._cell.merged()
+        cumulative = []
+        running = 0.0
+        for bound, count in zip(self._buckets + (math.inf,), merged[:-2]):
+            running += count
+            cumulative.append((bound, running))
+        return {"buckets": cumulative, "sum": merged[-2], "count": merged[-1]}
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile (0-1) by linear interpolation within buckets."""
+        snap = self.snapshot()
+        return _quantile(snap["buckets"], snap["count"], q)
+
+
+class _Metric:
+    """Base class for labelled metric families."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: Any, **kwargs: Any) -> Any:
+        """
+        Get the child metric for a set of label values.
+
+        Args:
+            *values: Label values in `labelnames` order
+            **kwargs: Label values by name
+
+        Returns:
+            The child metric (created on first use)
+        """
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def children(self) -> List[Tuple[Dict[str, str], Any]]:
+        """Return (labels, child) pairs for every label combination seen so far."""
+        return [
+            (dict(zip(self.labelnames, key)), child) for key, child in list(self._children.items())
+        ]
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the unlabelled counter."""
+        self.labels().inc(amount)
+
+    def total(self) -> float:
+        """Sum across all label combinations."""
+        return sum(child.value for _, child in self.children())
+
+
+class Gauge(_Metric):
+    """Value that can go up and down (queue depth, in-flight requests)."""
+
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+
+class MetricsRegistry:
+    """
+    Collection of named metrics with Prometheus text-format rendering.
+    Registering an existing name returns the existing metric.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls: type, name: str, documentation: str, **kwargs: Any) -> Any:
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = cls(name, documentation, **kwargs)
+                    self._metrics[name] = metric
+        if not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} already registered as {metric.kind}")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Get or create a counter."""
+        metric: Counter = self._register(Counter, name, documentation, labelnames=labelnames)
+        return metric
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Get or create a gauge."""
+        metric: Gauge = self._register(Gauge, name, documentation, labelnames=labelnames)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Get or create a histogram."""
+        metric: Histogram = self._register(
+            Histogram, name, documentation, labelnames=labelnames, buckets=buckets
+        )
+        return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """Look up a registered metric by name."""
+        return self._metrics.get(name)
+
+    def render_prometheus(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format (v0.0.4).
+
+        Returns:
+            str: Exposition text
+        """
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, child in metric.children():
+                if isinstance(child, _HistogramChild):
+                    snap = child.snapshot()
+                    for bound, cumulative in snap["buckets"]:
+                        bucket_labels = {**labels, "le": _format_value(bound)}
+                        lines.append(
+                            f"{metric.name}_bucket{_format_labels(bucket_labels)} "
+                            f"{_format_value(cumulative)}"
+                        )
+                    lines.append(
+                        f"{metric.name}_sum{_format_labels(labels)} {_format_value(snap['sum'])}"
+                    )
+                    lines.append(
+                        f"{metric.name}_count{_format_labels(labels)} "
+                        f"{_format_value(snap['count'])}"
+                    )
+                else:
+                    suffix = "_total" if metric.kind == "counter" else ""
+                    name = metric.name if metric.name.endswith(suffix) else metric.name + suffix
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(child.value)}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path) -> None:
+        """
+        Atomically write the exposition text to a file (e.g. for node_exporter's textfile collector).
+
+        Args:
+            path: Destination file
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + f".{os.getpid()}.tmp")
+        tmp_path.write_text(self.render_prometheus(), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+class _WindowSlot:
+    __slots__ = ("index", "counters", "histograms")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, List[float]] = {}
+
+
+class RollingWindow:
+    """
+    Ring of fixed-interval slots holding pre-aggregated counters and latency histograms.
+
+    Writers add to the current slot; readers merge the slots covering a time window.
+    A summary therefore costs O(slots in window), independent of request volume, which
+    keeps dashboards off the diagnosis path.
+    """
+
+    def __init__(
+        self,
+        interval: float = 60.0,
+        slots: int = 1440,
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        """
+        Args:
+            interval: Slot width in seconds (default: one minute)
+            slots: Number of slots kept (default: 24 hours of minutes)
+            buckets: Histogram bucket upper bounds
+        """
+        self.interval = interval
+        self.buckets = tuple(sorted(buckets))
+        self._ring: List[Optional[_WindowSlot]] = [None] * slots
+        self._lock = threading.Lock()
+
+    @property
+    def max_seconds(self) -> float:
+        return self.interval * len(self._ring)
+
+    def _slot(self, now: float) -> _WindowSlot:
+        index = int(now // self.interval)
+        position = index % len(self._ring)
+        slot = self._ring[position]
+        if slot is None or slot.index != index:
+            slot = _WindowSlot(index)
+            self._ring[position] = slot
+        return slot
+
+    def add(self, key: str, amount: float = 1.0, now: Optional[float] = None) -> None:
+        """Add to a windowed counter."""
+        with self._lock:
+            counters = self._slot(time.time() if now is None else now).counters
+            counters[key] = counters.get(key, 0.0) + amount
+
+    def observe(self, key: str, value: float, now: Optional[float] = None) -> None:
+        """Record a value in a windowed histogram."""
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            histograms = self._slot(time.time() if now is None else now).histograms
+            counts = histograms.get(key)
+            if counts is None:
+                counts = histograms[key] = [0.0] * (len(self.buckets) + 1)
+            counts[index] += 1
+
+    def summary(self, seconds: float, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Merge the slots covering the last `seconds`.
+
+        Args:
+            seconds: Window length (capped at `max_seconds`)
+            now: Reference time (default: current time)
+
+        Returns:
+            dict: `counters` (key -> total), `quantiles` (key -> p50/p95/p99/count)
+                  and the effective `seconds`
+        """
+        now = time.time() if now is None else now
+        seconds = min(seconds, self.max_seconds)
+        newest = int(now // self.interval)
+        oldest = newest - max(1, math.ceil(seconds / self.interval)) + 1
+
+        counters: Dict[str, float] = {}
+        histograms: Dict[str, List[float]] = {}
+        with self._lock:
+            slots = [slot for slot in self._ring if slot and oldest <= slot.index <= newest]
+            for slot in slots:
+                for key, value in slot.counters.items():
+                    counters[key] = counters.get(key, 0.0) + value
+                for key, counts in slot.histograms.items():
+                    merged = histograms.setdefault(key, [0.0] * len(counts))
+                    for i, count in enumerate(counts):
+                        merged[i] += count
+
+        quantiles: Dict[str, Dict[str, Optional[float]]] = {}
+        for key, counts in histograms.items():
+            cumulative = []
+            running = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                running += count
+                cumulative.append((bound, running))
+            quantiles[key] = {
+                "p50": _quantile(cumulative, running, 0.50),
+                "p95": _quantile(cumulative, running, 0.95),
+                "p99": _quantile(cumulative, running, 0.99),
+                "count": running,
+            }
+
+        return {"seconds": seconds, "counters": counters, "quantiles": quantiles}
+
+
+class SessionTracker:
+    """Tracks when each Streamlit session was last seen to count active sessions."""
+
+    def __init__(self, prune_interval: float = 30.0):
+        self._last_seen: Dict[str, float] = {}
+        self._prune_interval = prune_interval
+        self._last_prune = 0.0
+        self._lock = threading.Lock()
+
+    def touch(self, session_id: str, now: Optional[float] = None) -> None:
+        """Mark a session as active."""
+        self._last_seen[session_id] = time.time() if now is None else now
+
+    def last_seen(self, session_id: str) -> Optional[float]:
+        """Return when a session was last seen, if known."""
+        return self._last_seen.get(session_id)
+
+    def active(self, within: float = 300.0, now: Optional[float] = None) -> int:
+        """
+        Count sessions seen within the last `within` seconds.
+        Sessions idle for more than an hour are forgotten.
+        """
+        now = time.time() if now is None else now
+        if now - self._last_prune > self._prune_interval:
+            with self._lock:
+                self._last_prune = now
+                for session_id, seen in list(self._last_seen.items()):
+                    if now - seen > 3600:
+                        self._last_seen.pop(session_id, None)
+        return sum(1 for seen in list(self._last_seen.values()) if now - seen <= within)
+
+
+class DiagnosisMetrics:
+    """
+    Standard MDxApp metrics for the diagnosis path.
+    Wraps a registry with helpers used by the AI client and the pages. Features keep
+    their own metrics next to their modules, registered in `registry` and `window`.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        """
+        Args:
+            registry: Registry the metrics are registered in
+        """
+        self.registry = registry
+        self.request_latency = registry.histogram(
+            "mdxapp_request_latency_seconds", "Upstream diagnosis request latency", ["model"]
+        )
+        self.time_to_first_token = registry.histogram(
+            "mdxapp_time_to_first_token_seconds", "Time to first streamed token", ["model"]
+        )
+        self.tokens = registry.counter(
+            "mdxapp_tokens_total",
+            "Tokens consumed by kind (prompt/completion/cached)",
+            ["model", "kind"],
+        )
+        self.requests = registry.counter(
+            "mdxapp_requests_total", "Upstream diagnosis requests", ["model"]
+        )
+        self.errors = registry.counter(
+            "mdxapp_errors_total", "Upstream errors by exception class", ["error"]
+        )
+        self.cache_requests = registry.counter(
+            "mdxapp_cache_requests_total", "Cache lookups by cache and result", ["cache", "result"]
+        )
+        self.upstream_responses = registry.counter(
+            "mdxapp_upstream_responses_total", "Upstream HTTP responses by status", ["status"]
+        )
+        self.cost = registry.counter("mdxapp_cost_usd_total", "Estimated spend in USD", ["model"])
+        self.cancelled = registry.counter(
+            "mdxapp_cancelled_requests_total", "Upstream requests cancelled in flight", ["reason"]
+        )
+        self.tokens_saved = registry.counter(
+            "mdxapp_cancelled_tokens_saved_total",
+            "Estimated completion tokens not generated because of cancellation",
+            ["model"],
+        )
+        self.cost_saved = registry.counter(
+            "mdxapp_cancelled_cost_saved_usd_total",
+            "Estimated spend avoided by cancellation in USD",
+            ["model"],
+        )
+        self.queue_depth = registry.gauge(
+            "mdxapp_queue_depth", "Diagnosis jobs waiting to run, by priority", ["priority"]
+        )
+        self.inflight = registry.gauge("mdxapp_inflight_requests", "Upstream requests in flight")
+        self.active_sessions = registry.gauge(
+            "mdxapp_active_sessions", "Sessions seen in the last five minutes"
+        )
+
+        self.window = RollingWindow()
+        self.sessions = SessionTracker()
+        self.pricing: Dict[str, Dict[str, float]] = dict(DEFAULT_MODEL_PRICING)
+
+    def set_pricing(self, pricing: Dict[str, Dict[str, float]]) -> None:
+        """
+        Override per-model prices (USD per million input, cached_input and output tokens).
+
+        Args:
+            pricing: Mapping of model name to price components
+        """
+        self.pricing = {**DEFAULT_MODEL_PRICING, **{k: dict(v) for k, v in pricing.items()}}
+
+    def _price_for(self, model: str) -> Optional[Dict[str, float]]:
+        if model in self.pricing:
+            return self.pricing[model]
+        # Dated snapshots (e.g. gpt-5-mini-2025-08-07) use the base model's price
+        matches = [name for name in self.pricing if model.startswith(name)]
+        return self.pricing[max(matches, key=len)] if matches else None
+
+    @contextmanager
+    def track_request(self, model: str) -> Iterator[None]:
+        """
+        Measure an upstream request: in-flight gauge, latency and error class.
+
+        Args:
+            model: Model name used as the latency label
+        """
+        self.inflight.inc()
+        self.requests.labels(model).inc()
+        self.window.add("requests")
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.errors.labels(type(e).__name__).inc()
+            self.window.add("errors")
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.request_latency.labels(model).observe(elapsed)
+            self.window.observe("latency", elapsed)
+            self.inflight.dec()
+
+    def record_ttft(self, model: str, seconds: float) -> None:
+        """Record time to first token for a streamed request."""
+        self.time_to_first_token.labels(model).observe(seconds)
+        self.window.observe("ttft", seconds)
+
+    def record_http_status(self, status: int) -> None:
+        """
+        Record an upstream HTTP response status.
+        Retryable statuses are counted as retries because the SDK retries them.
+        """
+        self.upstream_responses.labels(status).inc()
+        if status == 429:
+            self.window.add("rate_limited")
+        if status in RETRYABLE_STATUSES:
+            self.window.add("retries")
+
+    def touch_session(self, session_id: str) -> None:
+        """Mark a Streamlit session as active."""
+        self.sessions.touch(session_id)
+        self.active_sessions.set(self.sessions.active())
+
+    def record_usage(self, model: str, usage: Any) -> Dict[str, int]:
+        """
+        Record token usage from an OpenAI `usage` object (or equivalent dict).
+
+        Args:
+            model: Model name
+            usage: `CompletionUsage` object or dict with prompt/completion token counts
+
+        Returns:
+            dict: prompt_tokens, completion_tokens, cached_tokens and total_tokens
+        """
+        if usage is None:
+            return {}
+
+        def _get(obj: Any, key: str) -> Any:
+            return obj.get(key) if isinstance(obj, dict) else getattr(obj, key, None)
+
+        prompt = int(_get(usage, "prompt_tokens") or 0)
+        completion = int(_get(usage, "completion_tokens") or 0)
+        details = _get(usage, "prompt_tokens_details")
+        cached = int((_get(details, "cached_tokens") if details is not None else 0) or 0)
+
+        self.tokens.labels(model, "prompt").inc(prompt)
+        self.tokens.labels(model, "completion").inc(completion)
+        self.tokens.labels(model, "cached").inc(cached)
+        scope = _usage_scope.get()
+        if scope is not None:
+            scope["prompt"] += prompt
+            scope["completion"] += completion
+            scope["cached"] += cached
+        self.window.add("tokens_prompt", prompt)
+        self.window.add("tokens_completion", completion)
+        self.window.add("tokens_cached", cached)
+        if prompt:
+            self.record_cache("openai_prompt", hit=cached > 0)
+
+        price = self._price_for(model)
+        if price:
+            cost = (
+                (prompt - cached) * price["input"]
+                + cached * price.get("cached_input", price["input"])
+                + completion * price["output"]
+            ) / 1_000_000
+            self.cost.labels(model).inc(cost)
+            self.window.add("cost_usd", cost)
+
+        return {
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "cached_tokens": cached,
+            "total_tokens": prompt + completion,
+        }
+
+    def record_cancellation(
+        self, model: str, reason: str, generated_tokens: int, budget_tokens: int
+    ) -> int:
+        """
+        Record an upstream request cancelled mid-stream and estimate what it saved.
+
+        The expected completion length is the mean completion tokens per request
+        of this model so far (the completion budget before any usage is known).
+
+        Args:
+            model: Model name
+            reason: Why the request was cancelled
+            generated_tokens: Completion tokens received before cancellation
+            budget_tokens: max_completion_tokens of the request
+
+        Returns:
+            int: Estimated completion tokens saved
+        """
+        requests = self.requests.labels(model).value
+        completion = self.tokens.labels(model, "completion").value
+        expected = completion / requests if requests and completion else budget_tokens
+        saved = max(int(min(expected, budget_tokens)) - generated_tokens, 0)
+
+        self.cancelled.labels(reason).inc()
+        self.tokens_saved.labels(model).inc(saved)
+        scope = _usage_scope.get()
+        if scope is not None:
+            # No usage chunk arrives for a closed stream; count what was streamed
+            scope["completion"] += generated_tokens
+        self.window.add("cancelled")
+        self.window.add("tokens_saved", saved)
+        price = self._price_for(model)
+        if price:
+            cost = saved * price["output"] / 1_000_000
+            self.cost_saved.labels(model).inc(cost)
+            self.window.add("cost_saved_usd", cost)
+        return saved
+
+    def record_cache(self, cache: str, hit: bool) -> None:
+        """Record a cache lookup outcome."""
+        result = "hit" if hit else "miss"
+        self.cache_requests.labels(cache, result).inc()
+        self.window.add(f"cache_{result}:{cache}")
+
+    def cache_hit_ratio(self, cache: str) -> Optional[float]:
+        """Return the hit ratio for a cache, or None if it has not been used."""
+        hits = self.cache_requests.labels(cache, "hit").value
+        misses = self.cache_requests.labels(cache, "miss").value
+        total = hits + misses
+        return hits / total if total else None
+
+    def window_summary(self, seconds: float) -> Dict[str, Any]:
+        """
+        Pre-aggregated operator view over the last `seconds`.
+
+        Args:
+            seconds: Window length
+
+        Returns:
+            dict: Throughput, latency/TTFT percentiles, token burn, cost per hour,
+                  error/429/retry rates, cancellation savings, cache hit rates and live
+                  gauges (feature summaries: the features' own metrics helpers)
+        """
+        summary = self.window.summary(seconds)
+        counters = summary["counters"]
+        minutes = summary["seconds"] / 60.0
+        requests = counters.get("requests", 0.0)
+        tokens = sum(counters.get(f"tokens_{kind}", 0.0) for kind in ("prompt", "completion"))
+
+        caches: Dict[str, Dict[str, float]] = {}
+        for key, value in counters.items():
+            if key.startswith(("cache_hit:", "cache_miss:")):
+                result, name = key.split(":", 1)
+                caches.setdefault(name, {"hit": 0.0, "miss": 0.0})[result[6:]] += value
+
+        def _rate(key: str) -> Optional[float]:
+            return counters.get(key, 0.0) / requests if requests else None
+
+        queued = {labels["priority"]: gauge.value for labels, gauge in self.queue_depth.children()}
+
+        return {
+            "seconds": summary["seconds"],
+            "requests": requests,
+            "throughput_per_min": requests / minutes if minutes else 0.0,
+            "latency": summary["quantiles"].get("latency", {}),
+            "ttft": summary["quantiles"].get("ttft", {}),
+            "tokens": {
+                kind: counters.get(f"tokens_{kind}", 0.0)
+                for kind in ("prompt", "completion", "cached")
+            },
+            "tokens_per_min": tokens / minutes if minutes else 0.0,
+            "cost_usd": counters.get("cost_usd", 0.0),
+            "cost_per_hour": counters.get("cost_usd", 0.0) * 60.0 / minutes if minutes else 0.0,
+            "error_rate": _rate("errors"),
+            "cancelled": counters.get("cancelled", 0.0),
+            "tokens_saved": counters.get("tokens_saved", 0.0),
+            "cost_saved_usd": counters.get("cost_saved_usd", 0.0),
+            "rate_limited_rate": _rate("rate_limited"),
+            "retry_rate": _rate("retries"),
+            "cache_hit_rates": {
+                name: counts["hit"] / (counts["hit"] + counts["miss"])
+                for name, counts in caches.items()
+                if counts["hit"] + counts["miss"]
+            },
+            "active_sessions": self.sessions.active(),
+            "inflight": self.inflight.labels().value,
+            "queue_depth": sum(queued.values()),
+            "queue_by_priority": queued,
+        }
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server API
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+
+_registry = MetricsRegistry()
+_diagnosis_metrics = DiagnosisMetrics(_registry)
+_exporters: Dict[str, Any] = {}
+_exporters_lock = threading.Lock()
+
+
+@contextmanager
+def usage_scope() -> Iterator[Dict[str, int]]:
+    """
+    Collect the token usage recorded inside the block (e.g. by one diagnosis job).
+    A nested scope (e.g. one ensemble sample) adds its totals to the enclosing one on exit.
+
+    Yields:
+        dict: prompt, completion and cached token totals, updated as usage is recorded
+    """
+    totals = {"prompt": 0, "completion": 0, "cached": 0}
+    parent = _usage_scope.get()
+    reset = _usage_scope.set(totals)
+    try:
+        yield totals
+    finally:
+        _usage_scope.reset(reset)
+        if parent is not None:
+            # Nested scopes may close in parallel threads (copied contexts share the parent)
+            with _usage_scope_lock:
+                for kind, count in totals.items():
+                    parent[kind] += count
+
+
+def get_registry() -> MetricsRegistry:
+    """Get the process-wide metrics registry."""
+    return _registry
+
+
+def get_diagnosis_metrics() -> DiagnosisMetrics:
+    """Get the process-wide diagnosis metrics."""
+    return _diagnosis_metrics
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> None:  # noqa: S104
+    """
+    Serve `/metrics` in Prometheus text format from a daemon thread.
+    Idempotent: only the first call per process starts a server.
+
+    Args:
+        port: TCP port
+        host: Bind address
+    """
+    with _exporters_lock:
+        if "server" in _exporters:
+            return
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": _registry})
+        server = ThreadingHTTPServer((host, port), handler)
+        thread = threading.Thread(
+            target=server.serve_forever, name="mdxapp-metrics-http", daemon=True
+        )
+        thread.start()
+        _exporters["server"] = server
+
+
+def start_metrics_file_writer(path: Path, interval: float = 15.0) -> None:
+    """
+    Periodically write the exposition text to a file from a daemon thread.
+    Idempotent: only the first call per process starts a writer.
+
+    Args:
+        path: Destination file
+        interval: Seconds between writes
+    """
+    with _exporters_lock:
+        if "file" in _exporters:
+            return
+        stop = threading.Event()
+
+        def _run() -> None:
+            while not stop.wait(interval):
+                with suppress(OSError):
+                    _registry.write_prometheus(path)
+
+        thread = threading.Thread(target=_run, name="mdxapp-metrics-file", daemon=True)
+        thread.start()
+        _exporters["file"] = stop
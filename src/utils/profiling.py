@@ -0,0 +1,298 @@
+"""
+Opt-in per-rerun profiling for Streamlit pages.
+Samples the script thread's stack while a page reruns and writes collapsed-stack
+flamegraph files plus a top-functions summary (or a cProfile dump) per rerun.
+"""
+
+import cProfile
+import hmac
+import itertools
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+from .logger import get_logger
+
+PROFILE_SUFFIXES = (".collapsed", ".prof", ".summary.json")
+
+_sequence = itertools.count()
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class RerunProfiler:
+    """
+    Profiles a single script rerun.
+
+    In "sample" mode a daemon thread snapshots the script thread's stack every
+    `interval` seconds (low, bounded overhead). In "cprofile" mode the deterministic
+    profiler runs on the script thread instead.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        page: str,
+        mode: str = "sample",
+        interval: float = 0.005,
+        max_duration: float = 120.0,
+        max_files: int = 200,
+        top: int = 25,
+    ):
+        """
+        Args:
+            output_dir: Directory receiving profile files
+            page: Page name used in file names
+            mode: "sample" (collapsed stacks) or "cprofile" (.prof dump)
+            interval: Sampling interval in seconds
+            max_duration: Stop sampling automatically after this many seconds
+            max_files: Keep at most this many reruns' profiles (oldest deleted first)
+            top: Number of functions kept in the summary
+        """
+        if mode not in ("sample", "cprofile"):
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.output_dir = Path(output_dir)
+        self.page = page
+        self.mode = mode
+        self.interval = interval
+        self.max_duration = max_duration
+        self.max_files = max_files
+        self.top = top
+        self.logger = get_logger(__name__)
+
+        self._target_ident = threading.get_ident()
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._finished = threading.Lock()
+        self._done = False
+        self._started = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+
+    def start(self) -> "RerunProfiler":
+        """Start profiling the calling (script) thread."""
+        self._started = time.perf_counter()
+        if self.mode == "cprofile":
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        else:
+            self._thread = threading.Thread(
+                target=self._sample_loop, name="mdxapp-rerun-profiler", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def _sample_loop(self) -> None:
+        deadline = time.perf_counter() + self.max_duration
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target_ident)
+            if frame is None:
+                break
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self._stacks[";".join(reversed(stack))] += 1
+            if time.perf_counter() > deadline:
+                break
+        # Finalize here when stop() never came (rerun interrupted by st.stop()/st.rerun())
+        if not self._stop.is_set():
+            self._finish()
+
+    def stop(self) -> Optional[Dict[str, Any]]:
+        """
+        Stop profiling and write the rerun's files.
+
+        Returns:
+            dict: Summary (duration, samples, top functions), or None if already written
+        """
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        return self._finish()
+
+    def _finish(self) -> Optional[Dict[str, Any]]:
+        with self._finished:
+            if self._done:
+                return None
+            self._done = True
+
+        duration = time.perf_counter() - self._started
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.page}-{os.getpid()}-{next(_sequence)}"
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            if self._cprofile is not None:
+                summary = self._write_cprofile(stem, duration)
+            else:
+                summary = self._write_samples(stem, duration)
+            prune_profiles(self.output_dir, self.max_files)
+        except OSError as e:
+            self.logger.warning(f"Could not write rerun profile: {e}")
+            return None
+
+        self.logger.debug(f"Wrote rerun profile {stem} ({duration * 1000:.1f} ms)")
+        return summary
+
+    def _write_samples(self, stem: str, duration: float) -> Dict[str, Any]:
+        collapsed = "".join(f"{stack} {count}\n" for stack, count in self._stacks.items())
+        (self.output_dir / f"{stem}.collapsed").write_text(collapsed, encoding="utf-8")
+
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self._stacks.items():
+            frames = stack.split(";")
+            self_counts[frames[-1]] += count
+            for label in set(frames):
+                total_counts[label] += count
+
+        summary = {
+            "page": self.page,
+            "mode": self.mode,
+            "duration_ms": round(duration * 1000, 3),
+            "samples": sum(self._stacks.values()),
+            "interval_ms": self.interval * 1000,
+            "top_self": self_counts.most_common(self.top),
+            "top_total": total_counts.most_common(self.top),
+        }
+        (self.output_dir / f"{stem}.summary.json").write_text(
+            json.dumps(summary, indent=2), encoding="utf-8"
+        )
+        return summary
+
+    def _write_cprofile(self, stem: str, duration: float) -> Dict[str, Any]:
+        assert self._cprofile is not None
+        self._cprofile.dump_stats(str(self.output_dir / f"{stem}.prof"))
+
+        stats = pstats.Stats(self._cprofile)
+        rows = [
+            (f"{name} ({Path(filename).name}:{line})", tottime, cumtime)
+            for (filename, line, name), (_, _, tottime, cumtime, _) in stats.stats.items()  # type: ignore[attr-defined]
+        ]
+        by_self = sorted(rows, key=lambda row: row[1], reverse=True)[: self.top]
+        by_total = sorted(rows, key=lambda row: row[2], reverse=True)[: self.top]
+
+        summary = {
+            "page": self.page,
+            "mode": self.mode,
+            "duration_ms": round(duration * 1000, 3),
+            "top_self": [(label, round(tottime * 1000, 3)) for label, tottime, _ in by_self],
+            "top_total": [(label, round(cumtime * 1000, 3)) for label, _, cumtime in by_total],
+        }
+        (self.output_dir / f"{stem}.summary.json").write_text(
+            json.dumps(summary, indent=2), encoding="utf-8"
+        )
+        return summary
+
+
+def prune_profiles(output_dir: Path, max_files: int) -> int:
+    """
+    Delete the oldest reruns' profile files beyond the retention limit.
+
+    Args:
+        output_dir: Profile directory
+        max_files: Number of reruns to keep
+
+    Returns:
+        int: Number of files deleted
+    """
+    summaries = sorted(
+        output_dir.glob("*.summary.json"), key=lambda p: p.stat().st_mtime, reverse=True
+    )
+    deleted = 0
+    for summary in summaries[max_files:]:
+        stem = summary.name[: -len(".summary.json")]
+        for suffix in PROFILE_SUFFIXES:
+            candidate = output_dir / f"{stem}{suffix}"
+            if candidate.exists():
+                candidate.unlink()
+                deleted += 1
+    return deleted
+
+
+def summarize_profiles(output_dir: Path, top: int = 25) -> List[Dict[str, Any]]:
+    """
+    Aggregate the top functions across all rerun summaries in a directory.
+
+    Args:
+        output_dir: Profile directory
+        top: Number of functions returned
+
+    Returns:
+        list: Dicts with function label, self weight, total weight and rerun count
+    """
+    self_weight: Counter = Counter()
+    total_weight: Counter = Counter()
+    reruns: Counter = Counter()
+    for path in Path(output_dir).glob("*.summary.json"):
+        summary = json.loads(path.read_text(encoding="utf-8"))
+        for label, weight in summary.get("top_self", []):
+            self_weight[label] += weight
+        for label, weight in summary.get("top_total", []):
+            total_weight[label] += weight
+            reruns[label] += 1
+
+    return [
+        {
+            "function": label,
+            "self": self_weight[label],
+            "total": total_weight[label],
+            "reruns": reruns[label],
+        }
+        for label, _ in self_weight.most_common(top)
+    ]
+
+
+def maybe_profile_rerun(
+    page: str, secrets: Mapping[str, Any], query_params: Mapping[str, Any]
+) -> Optional[RerunProfiler]:
+    """
+    Start a rerun profiler if profiling is switched on for this rerun.
+
+    Profiling is on when the `profiling_enabled` secret is set (subject to
+    `profiling_sample_rate`), or when an admin passes `?profile=<profiling_token>`.
+
+    Args:
+        page: Page name used in file names
+        secrets: Streamlit secrets (or any mapping with the profiling_* keys)
+        query_params: Current query parameters
+
+    Returns:
+        RerunProfiler: Started profiler, or None when this rerun is not profiled
+    """
+    token = str(secrets.get("profiling_token", "") or "")
+    requested = str(query_params.get("profile", "") or "")
+    admin_request = bool(token) and hmac.compare_digest(requested.encode(), token.encode())
+
+    if not admin_request:
+        if not secrets.get("profiling_enabled", False):
+            return None
+        sample_rate = float(secrets.get("profiling_sample_rate", 0.05))
+        if random.random() >= sample_rate:  # noqa: S311
+            return None
+
+    profiler = RerunProfiler(
+        output_dir=Path(secrets.get("profiling_dir", "profiles")),
+        page=page,
+        mode=str(secrets.get("profiling_mode", "sample")),
+        interval=float(secrets.get("profiling_interval_ms", 5)) / 1000,
+        max_files=int(secrets.get("profiling_max_files", 200)),
+    )
+    return profiler.start()
+
+
+if __name__ == "__main__":
+    directory = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("profiles")
+    for row in summarize_profiles(directory):
+        print(f"{row['self']:>10.1f} {row['total']:>10.1f} {row['reruns']:>6}  {row['function']}")
@@ -0,0 +1,328 @@
+"""
+Per-session memory accounting for Streamlit session state.
+Estimates each session's `st.session_state` footprint on a sample of reruns, reports
+per-process totals and evicts large cached artifacts (LRU-first) when caps are exceeded.
+"""
+
+import fnmatch
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from types import ModuleType
+from typing import Any, Dict, Iterable, List, Mapping, MutableMapping, Optional, Set, Tuple
+
+from .logger import get_logger
+from .metrics import MetricsRegistry, get_registry
+
+# Session-state keys holding large, recomputable artifacts (fnmatch patterns). Control
+# and case state (the page's dx_* keys) must not match: evicting it loses user data.
+DEFAULT_EVICTABLE_KEYS: Tuple[str, ...] = ("diagnostic", "diagnostic_*", "image_*")
+
+
+def deep_sizeof(obj: Any, _seen: Optional[Set[int]] = None) -> int:
+    """
+    Estimate the memory held by an object and everything it references.
+
+    Args:
+        obj: Object to measure
+        _seen: IDs already counted (shared references are counted once)
+
+    Returns:
+        int: Approximate size in bytes
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_sizeof(key, seen) + deep_sizeof(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += deep_sizeof(item, seen)
+    elif hasattr(obj, "__dict__") and not callable(obj) and not isinstance(obj, ModuleType):
+        # Plain instances only: classes, functions and modules are shared, not per-session
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+class _SessionFootprint:
+    """Measured state sizes and artifact access times for one session."""
+
+    def __init__(self, now: float):
+        self.sizes: Dict[str, int] = {}
+        self.last_access: Dict[str, float] = {}
+        self.last_seen = now
+        self.measured = False
+        self.pending_evictions: Set[str] = set()
+
+    @property
+    def total(self) -> int:
+        return sum(self.sizes.values())
+
+
+class SessionMemoryAccountant:
+    """
+    Tracks the session-state footprint of every session in the process.
+
+    Sizes are re-measured on a sample of reruns (and whenever an artifact is
+    stored), so the per-rerun cost stays low. When a session or the whole process
+    exceeds its cap, evictable artifacts are dropped least-recently-used first.
+    Evictions for other sessions are queued and applied on their next rerun, since
+    their state can only be modified safely from their own script thread.
+    """
+
+    def __init__(
+        self,
+        session_cap_bytes: Optional[int] = None,
+        process_cap_bytes: Optional[int] = None,
+        sample_rate: float = 0.1,
+        evictable_keys: Iterable[str] = DEFAULT_EVICTABLE_KEYS,
+        idle_timeout: float = 3600.0,
+        use_tracemalloc: bool = False,
+        registry: Optional[MetricsRegistry] = None,
+    ):
+        """
+        Args:
+            session_cap_bytes: Maximum state size per session (None: unlimited)
+            process_cap_bytes: Maximum state size across all sessions (None: unlimited)
+            sample_rate: Fraction of reruns on which state is re-measured (0-1)
+            evictable_keys: fnmatch patterns of keys that may be evicted
+            idle_timeout: Forget sessions not seen for this many seconds
+            use_tracemalloc: Trace Python allocations to report process-wide totals
+            registry: Metrics registry receiving the gauges (default: process registry)
+        """
+        self.session_cap_bytes = session_cap_bytes
+        self.process_cap_bytes = process_cap_bytes
+        self.sample_rate = sample_rate
+        self.evictable_keys = tuple(evictable_keys)
+        self.idle_timeout = idle_timeout
+        self.logger = get_logger(__name__)
+
+        self._sessions: Dict[str, _SessionFootprint] = {}
+        self._lock = threading.Lock()
+
+        if use_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+
+        registry = registry or get_registry()
+        self._state_bytes = registry.gauge(
+            "mdxapp_session_state_bytes", "Estimated session-state memory across sessions"
+        )
+        self._tracked_sessions = registry.gauge(
+            "mdxapp_session_state_sessions", "Sessions tracked by the memory accountant"
+        )
+        self._evictions = registry.counter(
+            "mdxapp_session_state_evictions_total",
+            "Session-state artifacts evicted to enforce memory caps",
+            ["reason"],
+        )
+
+    def is_evictable(self, key: str) -> bool:
+        """Check whether a session-state key holds an evictable artifact."""
+        return any(fnmatch.fnmatchcase(key, pattern) for pattern in self.evictable_keys)
+
+    def touch(self, session_id: str, key: str, now: Optional[float] = None) -> None:
+        """
+        Record that an artifact was read (LRU order only; sizes are not re-measured).
+
+        Args:
+            session_id: Streamlit session ID
+            key: Session-state key of the artifact
+            now: Timestamp (default: time.time())
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            footprint = self._sessions.setdefault(session_id, _SessionFootprint(now))
+            footprint.last_access[key] = now
+
+    def stored(self, session_id: str, key: str, now: Optional[float] = None) -> None:
+        """
+        Record that an artifact was stored, and re-measure on the next track().
+
+        Args:
+            session_id: Streamlit session ID
+            key: Session-state key of the artifact
+            now: Timestamp (default: time.time())
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            footprint = self._sessions.setdefault(session_id, _SessionFootprint(now))
+            footprint.last_access[key] = now
+            footprint.measured = False
+
+    def track(
+        self, session_id: str, state: MutableMapping[str, Any], now: Optional[float] = None
+    ) -> List[str]:
+        """
+        Account for a session's state on this rerun and enforce the caps.
+
+        Args:
+            session_id: Streamlit session ID
+            state: The session's state mapping (st.session_state)
+            now: Timestamp (default: time.time())
+
+        Returns:
+            list: Keys evicted from `state` on this call
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            footprint = self._sessions.setdefault(session_id, _SessionFootprint(now))
+            footprint.last_seen = now
+            evicted = self._apply_evictions(footprint, state, footprint.pending_evictions)
+            footprint.pending_evictions.clear()
+
+            sampled = random.random() < self.sample_rate  # noqa: S311
+            if footprint.measured and not sampled:
+                return evicted
+
+            footprint.sizes = {str(key): deep_sizeof(value) for key, value in state.items()}
+            footprint.measured = True
+            for key in footprint.sizes:
+                if self.is_evictable(key):
+                    footprint.last_access.setdefault(key, now)
+
+            if self.session_cap_bytes is not None and footprint.total > self.session_cap_bytes:
+                excess = footprint.total - self.session_cap_bytes
+                chosen = self._lru_keys([(session_id, footprint)], excess)
+                keys = [key for _, key in chosen]
+                evicted += self._apply_evictions(footprint, state, keys, reason="session_cap")
+
+            self._prune(now)
+            total = self._total()
+            if self.process_cap_bytes is not None and total > self.process_cap_bytes:
+                evicted += self._enforce_process_cap(session_id, state, total)
+                total = self._total()
+
+            self._state_bytes.set(total)
+            self._tracked_sessions.set(len(self._sessions))
+        return evicted
+
+    def forget(self, session_id: str) -> None:
+        """Stop accounting for a session."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def totals(self) -> Dict[str, Any]:
+        """
+        Summarize the process's session-state memory.
+
+        Returns:
+            dict: Tracked sessions, total and largest per-session bytes, and the
+            tracemalloc current/peak figures when tracing is enabled
+        """
+        with self._lock:
+            sizes = {session_id: fp.total for session_id, fp in self._sessions.items()}
+        summary: Dict[str, Any] = {
+            "sessions": len(sizes),
+            "state_bytes": sum(sizes.values()),
+            "largest_session_bytes": max(sizes.values(), default=0),
+            "evictions": self._evictions.total(),
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            summary["traced_bytes"] = current
+            summary["traced_peak_bytes"] = peak
+        return summary
+
+    def _total(self) -> int:
+        return sum(fp.total for fp in self._sessions.values())
+
+    def _lru_keys(
+        self, sessions: List[Tuple[str, _SessionFootprint]], excess: int
+    ) -> List[Tuple[str, str]]:
+        """Pick (session, key) artifacts, oldest access first, until `excess` bytes are freed."""
+        candidates = sorted(
+            (
+                (fp.last_access.get(key, 0.0), session_id, key, size)
+                for session_id, fp in sessions
+                for key, size in fp.sizes.items()
+                if self.is_evictable(key) and key not in fp.pending_evictions
+            )
+        )
+        chosen: List[Tuple[str, str]] = []
+        for _, session_id, key, size in candidates:
+            if excess <= 0:
+                break
+            chosen.append((session_id, key))
+            excess -= size
+        return chosen
+
+    def _apply_evictions(
+        self,
+        footprint: _SessionFootprint,
+        state: MutableMapping[str, Any],
+        keys: Iterable[str],
+        reason: str = "process_cap",
+    ) -> List[str]:
+        evicted = []
+        for key in list(keys):
+            if key in state:
+                del state[key]
+                evicted.append(key)
+                self._evictions.labels(reason).inc()
+            footprint.sizes.pop(key, None)
+            footprint.last_access.pop(key, None)
+        if evicted:
+            self.logger.info(f"Evicted session-state artifacts ({reason}): {', '.join(evicted)}")
+        return evicted
+
+    def _enforce_process_cap(
+        self, session_id: str, state: MutableMapping[str, Any], total: int
+    ) -> List[str]:
+        assert self.process_cap_bytes is not None
+        chosen = self._lru_keys(list(self._sessions.items()), total - self.process_cap_bytes)
+        evicted: List[str] = []
+        for owner, key in chosen:
+            footprint = self._sessions[owner]
+            if owner == session_id:
+                evicted += self._apply_evictions(footprint, state, [key])
+            else:
+                # Applied on the owner's next rerun; stop counting it right away
+                footprint.pending_evictions.add(key)
+                footprint.sizes.pop(key, None)
+        return evicted
+
+    def _prune(self, now: float) -> None:
+        for session_id, footprint in list(self._sessions.items()):
+            if now - footprint.last_seen > self.idle_timeout:
+                self._sessions.pop(session_id, None)
+
+
+_accountant: Optional[SessionMemoryAccountant] = None
+_accountant_lock = threading.Lock()
+
+
+def get_session_memory(config: Optional[Mapping[str, Any]] = None) -> SessionMemoryAccountant:
+    """
+    Get the process-wide session memory accountant.
+
+    The first call creates it from `config` (the session_memory_* secrets);
+    later calls return the same instance.
+
+    Args:
+        config: Mapping with optional session_memory_* keys
+
+    Returns:
+        SessionMemoryAccountant: Shared accountant
+    """
+    global _accountant
+    with _accountant_lock:
+        if _accountant is None:
+            config = config or {}
+            session_cap_mb = config.get("session_memory_cap_mb")
+            process_cap_mb = config.get("session_memory_process_cap_mb")
+            _accountant = SessionMemoryAccountant(
+                session_cap_bytes=int(session_cap_mb * 1024 * 1024) if session_cap_mb else None,
+                process_cap_bytes=int(process_cap_mb * 1024 * 1024) if process_cap_mb else None,
+                sample_rate=float(config.get("session_memory_sample_rate", 0.1)),
+                evictable_keys=config.get("session_memory_evictable_keys", DEFAULT_EVICTABLE_KEYS),
+                use_tracemalloc=bool(config.get("session_memory_tracemalloc", False)),
+            )
+        return _accountant
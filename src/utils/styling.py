@@ -1,15 +1,166 @@
 """
 Styling utilities for Streamlit applications.
-Handles loading and applying CSS stylesheets.
+Handles loading and applying CSS stylesheets, and serving static assets.
+
+Assets are read once per process and re-read only when the file's modification
+time changes: CSS is minified and tagged with a content hash, images are kept as
+bytes (Streamlit serves identical bytes under a stable URL the browser caches).
 """
 
+import hashlib
+import re
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, TypeVar
 
 import streamlit as st
 
 from ..utils.logger import get_logger
 
+T = TypeVar("T")
+
+LOGO_PATTERN = re.compile(r"MDxApp_logo_v2_(\d+)\.png$")
+
+# Comments and quoted strings, matched left to right so quotes inside comments are ignored
+_CSS_SKIP = re.compile(r"/\*.*?\*/|\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'", re.S)
+
+
+class CssAsset(NamedTuple):
+    """Minified stylesheet with the hash of its content."""
+
+    css: str
+    digest: str
+
+
+def minify_css(css: str) -> str:
+    """
+    Strip comments and redundant whitespace from CSS (quoted strings are kept as is).
+
+    Args:
+        css: Stylesheet source
+
+    Returns:
+        str: Minified stylesheet
+    """
+    strings: List[str] = []
+
+    def _protect(match: "re.Match[str]") -> str:
+        if match.group().startswith("/*"):
+            return " "
+        strings.append(match.group())
+        return f"\0{len(strings) - 1}\0"
+
+    code = _CSS_SKIP.sub(_protect, css)
+    code = re.sub(r"\s+", " ", code)
+    code = re.sub(r"\s*([{};,>])\s*", r"\1", code)
+    code = re.sub(r":\s+", ":", code).replace(";}", "}")
+    # A space before ":" is significant in selectors, but not inside declaration blocks
+    code = re.sub(r"\{[^{}]*\}", lambda block: block.group().replace(" :", ":"), code)
+    return re.sub(r"\0(\d+)\0", lambda match: strings[int(match.group(1))], code).strip()
+
+
+_asset_lock = threading.Lock()
+_css_cache: Dict[Path, Tuple[int, CssAsset]] = {}
+_image_cache: Dict[Path, Tuple[int, bytes]] = {}
+_logo_cache: Dict[Path, Tuple[int, List[Tuple[int, Path]]]] = {}
+
+
+def _cached(cache: Dict[Path, Tuple[int, T]], path: Path, build: Callable[[Path], T]) -> T:
+    """Get a per-process asset, rebuilding it when the file's mtime changes."""
+    path = path.resolve()
+    mtime_ns = path.stat().st_mtime_ns
+    entry = cache.get(path)
+    if entry is None or entry[0] != mtime_ns:
+        value = build(path)
+        with _asset_lock:
+            cache[path] = entry = (mtime_ns, value)
+    return entry[1]
+
+
+def load_css_asset(css_file: Path) -> CssAsset:
+    """
+    Get a minified stylesheet, read from disk once per process (and on change).
+
+    Args:
+        css_file: Path to the CSS file
+
+    Returns:
+        CssAsset: Minified CSS and its content hash
+
+    Raises:
+        FileNotFoundError: If CSS file doesn't exist
+    """
+
+    def _build(path: Path) -> CssAsset:
+        css = minify_css(path.read_text(encoding="utf-8"))
+        return CssAsset(css, hashlib.sha256(css.encode("utf-8")).hexdigest()[:12])
+
+    return _cached(_css_cache, css_file, _build)
+
+
+def load_image_bytes(image_file: Path) -> bytes:
+    """
+    Get an image's bytes, read from disk once per process (and on change).
+
+    Args:
+        image_file: Path to the image
+
+    Returns:
+        bytes: Image content
+
+    Raises:
+        FileNotFoundError: If image file doesn't exist
+    """
+    return _cached(_image_cache, image_file, lambda path: path.read_bytes())
+
+
+def get_logo_variants(materials_dir: Path) -> List[Tuple[int, Path]]:
+    """
+    List the logo renditions in a directory.
+
+    Args:
+        materials_dir: Directory holding MDxApp_logo_v2_<size>.png files
+
+    Returns:
+        list: (size in pixels, path) pairs, smallest first
+    """
+
+    def _build(directory: Path) -> List[Tuple[int, Path]]:
+        variants = []
+        for path in directory.glob("MDxApp_logo_v2_*.png"):
+            match = LOGO_PATTERN.search(path.name)
+            if match:
+                variants.append((int(match.group(1)), path))
+        return sorted(variants)
+
+    # Keyed by the directory's mtime, which changes when renditions are added or removed
+    return _cached(_logo_cache, materials_dir, _build)
+
+
+def get_logo_path(width: int, materials_dir: Path, pixel_ratio: float = 1.0) -> Path:
+    """
+    Pick the smallest logo rendition that covers the rendered width.
+
+    Args:
+        width: Rendered width in CSS pixels
+        materials_dir: Directory holding the logo renditions
+        pixel_ratio: Device pixel ratio to cover (2.0 for sharp HiDPI rendering)
+
+    Returns:
+        Path: Logo file (the largest one if none is big enough)
+
+    Raises:
+        FileNotFoundError: If the directory has no logo renditions
+    """
+    variants = get_logo_variants(materials_dir)
+    if not variants:
+        raise FileNotFoundError(f"No logo renditions in: {materials_dir}")
+    needed = width * pixel_ratio
+    for size, path in variants:
+        if size >= needed:
+            return path
+    return variants[-1][1]
+
 
 def load_css(css_file: Path) -> None:
     """
@@ -28,11 +179,10 @@ def load_css(css_file: Path) -> None:
         raise FileNotFoundError(f"CSS file not found: {css_file}")
 
     try:
-        with open(css_file, encoding="utf-8") as f:
-            css_content = f.read()
-
-        st.markdown(f"<style>{css_content}</style>", unsafe_allow_html=True)
-        logger.debug(f"Loaded CSS from: {css_file}")
+        asset = load_css_asset(css_file)
+        st.markdown(
+            f'<style data-asset="{asset.digest}">{asset.css}</style>', unsafe_allow_html=True
+        )
 
     except Exception as e:
         logger.error(f"Error loading CSS file {css_file}: {e}")
@@ -0,0 +1,495 @@
+"""
+Lightweight request tracing for MDxApp.
+Records stage-level timing spans (rerun, validation, prompt building, upstream call,
+time to first token, rendering) and exports them to a JSONL file or an OTLP collector.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+import uuid
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("mdxapp_current_span", default=None)
+
+
+def _new_trace_id() -> str:
+    """Return a 128-bit trace ID as 32 hex characters (W3C / OTLP compatible)."""
+    return uuid.uuid4().hex
+
+
+def _new_span_id() -> str:
+    """Return a 64-bit span ID as 16 hex characters (W3C / OTLP compatible)."""
+    return os.urandom(8).hex()
+
+
+class Span:
+    """
+    A single timed operation within a trace.
+
+    Spans are created by `Tracer.span` / `Tracer.start_span` and exported once ended.
+    """
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "events",
+        "status",
+        "_tracer",
+        "_token",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        attributes: Dict[str, Any],
+        start_ns: Optional[int] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_span_id()
+        self.parent_id = parent_id
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.events: List[Dict[str, Any]] = []
+        self.status = "ok"
+        self._tracer = tracer
+        self._token: Optional[Token] = None
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        """Span duration in milliseconds, or None while the span is still open."""
+        if self.end_ns is None:
+            return None
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Attach a key/value attribute to the span."""
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        """Record a timestamped event inside the span."""
+        self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes})
+
+    def record_error(self, error: BaseException) -> None:
+        """Mark the span as failed and record the exception class."""
+        self.status = "error"
+        self.attributes["error.type"] = type(error).__name__
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        """End the span, detach it from the current context and hand it to the exporter."""
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns if end_ns is not None else time.time_ns()
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                # Ended from a different context than it was started in
+                _current_span.set(None)
+            self._token = None
+        self._tracer._on_end(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the span to a JSON-compatible dictionary."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attributes": self.attributes,
+            "events": self.events,
+        }
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc is not None:
+            self.record_error(exc)
+        self.end()
+
+
+class _NoopSpan:
+    """Span stand-in returned when tracing is disabled. Every method is a no-op."""
+
+    __slots__ = ()
+
+    trace_id = None
+    span_id = None
+    duration_ms = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class SpanExporter:
+    """Base class for span exporters. Exporters are called from a background thread."""
+
+    def export(self, spans: List[Span]) -> None:
+        """Export a batch of finished spans."""
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        """Release exporter resources."""
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Append finished spans as one JSON object per line to a local file."""
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: Destination JSONL file (parent directories are created)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    """Convert a Python attribute value to an OTLP AnyValue."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class OtlpHttpSpanExporter(SpanExporter):
+    """Send spans to an OTLP/HTTP collector using the JSON protobuf encoding."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        service_name: str = "mdxapp",
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 5.0,
+    ):
+        """
+        Args:
+            endpoint: Collector base URL (e.g. http://localhost:4318) or full /v1/traces URL
+            service_name: Value of the `service.name` resource attribute
+            headers: Extra HTTP headers (e.g. authentication)
+            timeout: Request timeout in seconds
+        """
+        endpoint = endpoint.rstrip("/")
+        if not endpoint.endswith("/v1/traces"):
+            endpoint += "/v1/traces"
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.timeout = timeout
+
+    def build_payload(self, spans: List[Span]) -> Dict[str, Any]:
+        """Build the OTLP `ExportTraceServiceRequest` JSON body for a batch of spans."""
+        otlp_spans = []
+        for span in spans:
+            otlp_span: Dict[str, Any] = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": _otlp_attributes(span.attributes),
+                "events": [
+                    {
+                        "name": event["name"],
+                        "timeUnixNano": str(event["time_ns"]),
+                        "attributes": _otlp_attributes(event["attributes"]),
+                    }
+                    for event in span.events
+                ],
+                "status": {"code": 2 if span.status == "error" else 1},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            otlp_spans.append(otlp_span)
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _otlp_attributes({"service.name": self.service_name})
+                    },
+                    "scopeSpans": [{"scope": {"name": "mdxapp.tracing"}, "spans": otlp_spans}],
+                }
+            ]
+        }
+
+    def export(self, spans: List[Span]) -> None:
+        body = json.dumps(self.build_payload(spans)).encode("utf-8")
+        request = urllib.request.Request(  # noqa: S310 - endpoint comes from operator config
+            self.endpoint, data=body, headers=self.headers, method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):  # noqa: S310
+            pass
+
+
+class _ExportWorker:
+    """Background thread draining finished spans into the exporter in batches."""
+
+    def __init__(self, exporter: SpanExporter, max_batch: int = 256):
+        self.exporter = exporter
+        self.max_batch = max_batch
+        self._queue: queue.SimpleQueue[Optional[Span]] = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="mdxapp-trace-export", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span) -> None:
+        self._queue.put(span)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            try:
+                self.exporter.export(batch)
+            except Exception as e:
+                from .logger import get_logger
+
+                get_logger(__name__).warning(f"Trace export failed: {e}")
+            if stop:
+                return
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self.exporter.shutdown()
+
+
+class Tracer:
+    """
+    Creates spans and forwards finished spans to an exporter.
+
+    When disabled, `span()` and `start_span()` return a shared no-op span so that
+    instrumented code pays only a single attribute check.
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, enabled: bool = True):
+        """
+        Args:
+            exporter: Span exporter; finished spans are dropped when None
+            enabled: Whether spans are recorded at all
+        """
+        self.enabled = enabled
+        self._worker = _ExportWorker(exporter) if (enabled and exporter) else None
+
+    def start_span(
+        self, name: str, new_trace: bool = False, activate: bool = True, **attributes: Any
+    ) -> Any:
+        """
+        Start a span that the caller ends explicitly with `span.end()`.
+
+        Args:
+            name: Stage name (e.g. "prompt_build")
+            new_trace: Start a new trace even if a span is already active
+            activate: Make the span the parent of spans started after it
+            **attributes: Initial span attributes
+
+        Returns:
+            Span, or the no-op span when tracing is disabled
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = None if new_trace else _current_span.get()
+        trace_id = parent.trace_id if parent else _new_trace_id()
+        span = Span(self, name, trace_id, parent.span_id if parent else None, attributes)
+        if activate:
+            span._token = _current_span.set(span)
+        return span
+
+    def span(self, name: str, **attributes: Any) -> Any:
+        """
+        Context manager wrapping a stage in a child span of the active span.
+
+        Usage:
+            with tracer.span("prompt_build", language=lang):
+                ...
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        return self.start_span(name, **attributes)
+
+    def record_span(self, name: str, start_ns: int, end_ns: int, **attributes: Any) -> None:
+        """
+        Record an already-measured interval (e.g. time to first token) as a child span.
+
+        Args:
+            name: Span name
+            start_ns: Start time from `time.time_ns()`
+            end_ns: End time from `time.time_ns()`
+            **attributes: Span attributes
+        """
+        if not self.enabled:
+            return
+        parent = _current_span.get()
+        trace_id = parent.trace_id if parent else _new_trace_id()
+        span = Span(self, name, trace_id, parent.span_id if parent else None, attributes, start_ns)
+        span.end(end_ns)
+
+    def use_span(self, span: Any) -> "_SpanScope":
+        """
+        Re-activate a span in another thread so work done there joins the same trace.
+
+        Args:
+            span: Span captured with `current_span()` in the originating thread
+        """
+        return _SpanScope(span if self.enabled else None)
+
+    def _on_end(self, span: Span) -> None:
+        if self._worker is not None:
+            self._worker.submit(span)
+
+    def shutdown(self) -> None:
+        """Flush pending spans and stop the export thread."""
+        if self._worker is not None:
+            self._worker.shutdown()
+            self._worker = None
+
+
+class _SpanScope:
+    """Context manager that temporarily sets the active span in the current context."""
+
+    __slots__ = ("_span", "_token")
+
+    def __init__(self, span: Optional[Span]):
+        self._span = span
+        self._token: Optional[Token] = None
+
+    def __enter__(self) -> Optional[Span]:
+        if self._span is not None:
+            self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if self._token is not None:
+            _current_span.reset(self._token)
+
+
+def current_span() -> Optional[Span]:
+    """Return the active span in this context, if any."""
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """Return the active trace ID in this context, if any."""
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+_tracer = Tracer(enabled=False)
+_tracer_config: Optional[tuple] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """
+    Get the process-wide tracer (disabled until `configure_tracing` enables it).
+
+    Returns:
+        Tracer: Shared tracer instance
+    """
+    return _tracer
+
+
+def configure_tracing(
+    enabled: bool = False,
+    jsonl_path: Optional[Path] = None,
+    otlp_endpoint: Optional[str] = None,
+    service_name: str = "mdxapp",
+) -> Tracer:
+    """
+    Configure the process-wide tracer. Safe to call on every rerun: the tracer is only
+    rebuilt when the configuration actually changes.
+
+    Args:
+        enabled: Record spans
+        jsonl_path: Export spans to this JSONL file
+        otlp_endpoint: Export spans to this OTLP/HTTP collector (takes precedence)
+        service_name: Service name reported to the collector
+
+    Returns:
+        Tracer: The configured shared tracer
+    """
+    global _tracer, _tracer_config
+
+    config = (enabled, str(jsonl_path) if jsonl_path else None, otlp_endpoint, service_name)
+    if config == _tracer_config:
+        return _tracer
+
+    with _tracer_lock:
+        if config == _tracer_config:
+            return _tracer
+
+        exporter: Optional[SpanExporter] = None
+        if enabled and otlp_endpoint:
+            exporter = OtlpHttpSpanExporter(otlp_endpoint, service_name=service_name)
+        elif enabled and jsonl_path:
+            exporter = JsonlSpanExporter(Path(jsonl_path))
+
+        previous = _tracer
+        _tracer = Tracer(exporter=exporter, enabled=enabled)
+        _tracer_config = config
+        previous.shutdown()
+
+    return _tracer
@@ -0,0 +1,276 @@
+"""
+Compiled translation catalogs for MDxApp.
+Turns translations.json into flattened per-language catalogs with the default
+language's fallback already merged, stored in a binary format loaded per language.
+
+Build (reports missing keys):
+    python -m src.utils.translation_catalogs Assets/translations.json [--strict]
+"""
+
+import hashlib
+import json
+import marshal
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Set, Tuple
+
+from .logger import get_logger
+
+CATALOG_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+
+# Catalogs of earlier builds stay readable this long (snapshots still loading lazily)
+CATALOG_RETENTION_SECONDS = 3600.0
+
+logger = get_logger(__name__)
+
+
+def default_catalog_dir(translations_path: Path) -> Path:
+    """Directory holding the compiled catalogs of a translations file."""
+    return translations_path.parent / f"{translations_path.stem}.catalogs"
+
+
+def flatten_translations(values: Mapping[str, Any], prefix: str = "") -> Dict[str, str]:
+    """
+    Flatten nested translation groups into dotted keys with string values.
+
+    Args:
+        values: Translations of one language (may contain nested groups)
+        prefix: Key prefix of the current group
+
+    Returns:
+        dict: Flat key -> text mapping
+    """
+    flat: Dict[str, str] = {}
+    for key, value in values.items():
+        if isinstance(value, Mapping):
+            flat.update(flatten_translations(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = str(value)
+    return flat
+
+
+def merge_fallback(
+    translations: Mapping[str, Mapping[str, Any]], default_language: str = "English"
+) -> Tuple[Dict[str, Dict[str, str]], Dict[str, List[str]]]:
+    """
+    Build flat catalogs with the default language merged under every language.
+
+    Args:
+        translations: Raw translations (language -> key -> text)
+        default_language: Language used for missing keys
+
+    Returns:
+        tuple: (catalogs, missing keys per language)
+    """
+    default = flatten_translations(translations.get(default_language, {}))
+    catalogs: Dict[str, Dict[str, str]] = {}
+    missing: Dict[str, List[str]] = {}
+    for language, values in translations.items():
+        own = flatten_translations(values)
+        gaps = sorted(key for key in default if key not in own)
+        if gaps:
+            missing[language] = gaps
+        catalogs[language] = {**default, **own}
+    return catalogs, missing
+
+
+def _fingerprint(source: bytes, default_language: str) -> Dict[str, Any]:
+    return {
+        "format": CATALOG_FORMAT,
+        "marshal_version": marshal.version,
+        "python": list(sys.version_info[:2]),
+        "source_sha256": hashlib.sha256(source).hexdigest(),
+        "default_language": default_language,
+    }
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """Write via a uniquely named temporary file, so concurrent writers never collide."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def write_catalogs(
+    source: bytes,
+    catalogs: Mapping[str, Mapping[str, str]],
+    missing: Mapping[str, List[str]],
+    output_dir: Path,
+    default_language: str = "English",
+    retention: float = CATALOG_RETENTION_SECONDS,
+) -> None:
+    """
+    Write compiled catalogs and their manifest.
+
+    Catalog files are named by the hash of their build and language, so a file
+    never changes once written: a manifest read before a rebuild (by this or
+    another process) keeps loading the catalogs it lists.
+
+    Args:
+        source: Raw bytes of the translations file (fingerprinted for staleness)
+        catalogs: Flat merged catalogs per language
+        missing: Missing keys per language
+        output_dir: Destination directory
+        default_language: Fallback language merged into the catalogs
+        retention: Seconds unlisted catalogs of earlier builds are kept
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    fingerprint = _fingerprint(source, default_language)
+    build = json.dumps(fingerprint, sort_keys=True)
+    files = {}
+    for language, catalog in catalogs.items():
+        digest = hashlib.sha256(f"{build}\n{language}".encode()).hexdigest()
+        filename = f"{digest[:24]}.cat"
+        if not (output_dir / filename).exists():
+            _atomic_write(output_dir / filename, marshal.dumps(dict(catalog)))
+        files[language] = filename
+
+    manifest = {**fingerprint, "languages": files, "missing": dict(missing)}
+    # Manifest last: readers only trust catalogs listed in a matching manifest
+    _atomic_write(
+        output_dir / MANIFEST_NAME,
+        json.dumps(manifest, ensure_ascii=False, indent=2).encode(),
+    )
+    _prune_catalogs(output_dir, set(files.values()), retention)
+
+
+def _prune_catalogs(output_dir: Path, current: Set[str], retention: float) -> None:
+    """Delete catalogs (and stray temporary files) of earlier builds past the retention."""
+    cutoff = time.time() - retention
+    for path in list(output_dir.glob("*.cat")) + list(output_dir.glob(".*.tmp")):
+        if path.name in current:
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass  # Removed concurrently, or not ours to delete
+
+
+def compile_catalogs(
+    translations_path: Path,
+    output_dir: Optional[Path] = None,
+    default_language: str = "English",
+) -> Dict[str, List[str]]:
+    """
+    Compile a translations file into per-language catalogs.
+
+    Args:
+        translations_path: Path to translations JSON file
+        output_dir: Destination (default: <stem>.catalogs next to the file)
+        default_language: Fallback language merged into the catalogs
+
+    Returns:
+        dict: Missing keys per language (filled from the default language)
+    """
+    source = translations_path.read_bytes()
+    catalogs, missing = merge_fallback(json.loads(source), default_language)
+    write_catalogs(
+        source,
+        catalogs,
+        missing,
+        output_dir or default_catalog_dir(translations_path),
+        default_language,
+    )
+    for language, keys in missing.items():
+        logger.warning(
+            f"{language}: {len(keys)} translation(s) missing, using {default_language}: "
+            f"{', '.join(keys)}"
+        )
+    return missing
+
+
+class LazyCatalogs(Mapping[str, Mapping[str, str]]):
+    """Read-only language -> catalog mapping; each catalog is loaded on first access."""
+
+    def __init__(
+        self,
+        languages: List[str],
+        loader: Callable[[str], Dict[str, str]],
+        missing: Optional[Dict[str, List[str]]] = None,
+    ):
+        self.missing: Dict[str, List[str]] = missing or {}
+        self._languages = languages
+        self._loader = loader
+        self._loaded: Dict[str, Mapping[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, language: str) -> Mapping[str, str]:
+        catalog = self._loaded.get(language)
+        if catalog is None:
+            if language not in self._languages:
+                raise KeyError(language)
+            with self._lock:
+                catalog = self._loaded.get(language)
+                if catalog is None:
+                    catalog = self._loaded[language] = MappingProxyType(self._loader(language))
+        return catalog
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._languages)
+
+    def __len__(self) -> int:
+        return len(self._languages)
+
+    def __contains__(self, language: object) -> bool:
+        return language in self._languages
+
+
+def load_catalogs(
+    source: bytes, catalog_dir: Path, default_language: str = "English"
+) -> Optional[LazyCatalogs]:
+    """
+    Open compiled catalogs if they were built from exactly this source.
+
+    Args:
+        source: Raw bytes of the translations file
+        catalog_dir: Directory with the compiled catalogs
+        default_language: Fallback language expected in the catalogs
+
+    Returns:
+        LazyCatalogs: Lazily loaded catalogs, or None if missing or stale
+    """
+    try:
+        manifest = json.loads((catalog_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    expected = _fingerprint(source, default_language)
+    if any(manifest.get(key) != value for key, value in expected.items()):
+        return None
+
+    files: Dict[str, str] = manifest["languages"]
+
+    def _load(language: str) -> Dict[str, str]:
+        catalog: Dict[str, str] = marshal.loads((catalog_dir / files[language]).read_bytes())
+        return catalog
+
+    return LazyCatalogs(list(files), _load, manifest.get("missing", {}))
+
+
+def main(argv: List[str]) -> int:
+    """Compile catalogs from the command line; `--strict` fails on missing keys."""
+    strict = "--strict" in argv
+    paths = [arg for arg in argv if not arg.startswith("--")]
+    translations_path = Path(paths[0]) if paths else Path("Assets/translations.json")
+    output_dir = Path(paths[1]) if len(paths) > 1 else None
+
+    missing = compile_catalogs(translations_path, output_dir)
+    for language, keys in missing.items():
+        print(f"{language}: missing {', '.join(keys)}")
+    print(f"Compiled catalogs to {output_dir or default_catalog_dir(translations_path)}")
+    return 1 if strict and missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,162 @@
+"""
+Unit tests for cancellation tokens and their use in the streaming call path.
+Uses a fake OpenAI stream to check that cancelling closes it and reports savings.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.ai_client import DiagnosisAIClient, StructuredDiagnosisOutput
+from src.core.cancellation import (
+    REASON_CANCELLED,
+    REASON_DEADLINE,
+    CancellationToken,
+    DiagnosisCancelledError,
+    current_cancel_token,
+    use_cancel_token,
+)
+from src.utils.metrics import DiagnosisMetrics, MetricsRegistry
+
+
+class TestCancellationToken:
+    """Test cases for CancellationToken."""
+
+    def test_cancel_runs_callbacks_once(self):
+        """Test that the first cancellation wins and callbacks run once."""
+        token = CancellationToken()
+        calls = []
+        token.on_cancel(lambda: calls.append(1))
+        assert token.cancel()
+        assert not token.cancel("deadline")
+        assert token.reason == REASON_CANCELLED
+        assert calls == [1]
+
+        # Registered after cancellation: runs immediately
+        token.on_cancel(lambda: calls.append(2))
+        assert calls == [1, 2]
+
+    def test_deadline(self):
+        """Test lazy and explicit deadline expiry."""
+        token = CancellationToken(timeout=60)
+        assert not token.cancelled
+        assert 0 < token.remaining() <= 60
+        assert token.expire(now=token.deadline + 1)
+        assert token.reason == REASON_DEADLINE
+        with pytest.raises(DiagnosisCancelledError):
+            token.raise_if_cancelled()
+
+    def test_context(self):
+        """Test that the current token is scoped to the block."""
+        token = CancellationToken()
+        with use_cancel_token(token):
+            assert current_cancel_token() is token
+        assert current_cancel_token() is None
+
+
+class FakeStream:
+    """Streaming response that yields one content delta per chunk until closed."""
+
+    def __init__(self, deltas, on_chunk=None):
+        self.deltas = deltas
+        self.on_chunk = on_chunk
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def __iter__(self):
+        for i, delta in enumerate(self.deltas):
+            if self.closed:
+                raise RuntimeError("stream closed")
+            yield SimpleNamespace(
+                usage=None,
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))],
+            )
+            if self.on_chunk:
+                self.on_chunk(i)
+
+
+def _client(stream):
+    client = DiagnosisAIClient(api_key="test", model="gpt-5-mini", max_tokens=1000)
+    client.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **params: stream))
+    )
+    return client
+
+
+class TestStreamingCancellation:
+    """Test cases for cancelling a streamed diagnosis."""
+
+    def test_cancel_closes_stream(self):
+        """Test that cancelling mid-stream closes it and raises DiagnosisCancelledError."""
+        token = CancellationToken()
+        stream = FakeStream(["a", "b", "c", "d"], on_chunk=lambda i: i == 1 and token.cancel())
+        with use_cancel_token(token), pytest.raises(DiagnosisCancelledError):
+            _client(stream).get_diagnosis("sys", "case", stream=True)
+        assert stream.closed
+
+    def test_cancelled_before_start(self):
+        """Test that a cancelled token never reaches the API."""
+        token = CancellationToken()
+        token.cancel()
+        stream = FakeStream(["a"])
+        with pytest.raises(DiagnosisCancelledError):
+            _client(stream).get_diagnosis("sys", "case", stream=True, cancel_token=token)
+        assert not stream.closed
+
+    def test_uncancelled_stream_completes(self):
+        """Test that a live token does not change the result."""
+        result = _client(FakeStream(["fe", "ver"])).get_diagnosis(
+            "sys", "case", stream=True, cancel_token=CancellationToken(timeout=60)
+        )
+        assert result == "fever"
+
+    def test_structured_stream(self):
+        """Test that a streamed structured diagnosis is parsed, and closed on cancellation."""
+        doc = (
+            '{"primary_diagnosis": "Flu", "differential_diagnoses": [], '
+            '"recommended_next_steps": [], "important_considerations": [], '
+            '"confidence_level": "low", "reasoning": "r"}'
+        )
+        result = _client(FakeStream([doc[:20], doc[20:]])).get_structured_diagnosis(
+            "sys", "case", stream=True
+        )
+        assert result.primary_diagnosis == "Flu"
+
+        token = CancellationToken()
+        stream = FakeStream([doc[:20], doc[20:]], on_chunk=lambda i: token.cancel())
+        with pytest.raises(DiagnosisCancelledError):
+            _client(stream).get_structured_diagnosis("sys", "case", stream=True, cancel_token=token)
+        assert stream.closed
+
+    def test_structured_stream_sends_strict_schema(self):
+        """Test that the streamed request carries the strict schema parse() would send."""
+        sent = {}
+        client = _client(None)
+        client.client.chat.completions.create = lambda **params: sent.update(params) or FakeStream(
+            ['{"primary_diagnosis": "Flu"}']
+        )
+        client.get_structured_diagnosis("sys", "case", stream=True)
+
+        response_format = sent["response_format"]["json_schema"]
+        assert response_format["name"] == "StructuredDiagnosisOutput"
+        assert response_format["strict"] is True
+        assert response_format["schema"]["additionalProperties"] is False
+        assert response_format["schema"]["required"] == list(StructuredDiagnosisOutput.model_fields)
+
+
+def test_record_cancellation_savings():
+    """Test the savings estimate from the mean completion length."""
+    metrics = DiagnosisMetrics(MetricsRegistry())
+    # No usage yet: the completion budget is the expectation
+    assert metrics.record_cancellation("gpt-5-mini", "cancelled", 100, 1000) == 900
+
+    metrics.requests.labels("gpt-5-mini").inc(3)
+    metrics.record_usage("gpt-5-mini", {"prompt_tokens": 10, "completion_tokens": 1200})
+    assert metrics.record_cancellation("gpt-5-mini", "deadline", 100, 1000) == 300
+
+    summary = metrics.window_summary(300)
+    assert summary["cancelled"] == 2
+    assert summary["tokens_saved"] == 1200
+    assert summary["cost_saved_usd"] > 0
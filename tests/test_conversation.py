@@ -0,0 +1,124 @@
+"""
+Unit tests for token-bounded conversations with rolling summarization.
+Uses a fake OpenAI client for the summaries.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.conversation import (
+    SUMMARY_HEADER,
+    Conversation,
+    ConversationManager,
+    get_conversation_metrics,
+)
+from src.utils.metrics import DiagnosisMetrics, MetricsRegistry
+
+
+class FakeClient:
+    """Summarizes by counting the turns it was given."""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **params):
+        self.calls.append(params)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        transcript = params["messages"][-1]["content"]
+        message = SimpleNamespace(content=f"{transcript.count('User:')} turns summarized")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+@pytest.fixture
+def metrics():
+    return DiagnosisMetrics(MetricsRegistry())
+
+
+def _manager(client, metrics):
+    return ConversationManager(client, window_tokens=100, keep_tokens=40, metrics=metrics)
+
+
+def _turn(conversation, manager, i):
+    turn = conversation.add_turn(
+        f"update {i} " + "word " * 25, "answer " * 5, usage={"prompt": 100 * i}, latency=1.5
+    )
+    manager.record(conversation, turn)
+
+
+def _settle(manager, conversation):
+    future, _ = conversation._compaction
+    future.result(timeout=5)
+    return manager.history(conversation)
+
+
+def test_window_compacts_oldest_turns(metrics):
+    """Test that an over-budget window folds old turns into a summary in the background."""
+    client = FakeClient()
+    manager = _manager(client, metrics)
+    conversation = Conversation()
+    try:
+        _turn(conversation, manager, 1)
+        _turn(conversation, manager, 2)
+        assert conversation._compaction is None
+        _turn(conversation, manager, 3)
+        # Requests sent before the summary is ready still carry every turn
+        assert conversation._compaction is not None
+
+        history = _settle(manager, conversation)
+    finally:
+        manager.shutdown()
+
+    assert conversation.summarized_turns == 2
+    assert conversation.turn_count == 3
+    assert history[0] == {"role": "system", "content": SUMMARY_HEADER + "2 turns summarized"}
+    assert [m["role"] for m in history[1:]] == ["user", "assistant"]
+    assert conversation.window_tokens() <= manager.window_tokens
+    assert conversation.stats() == [
+        {
+            "turn": 3,
+            "prompt_tokens": 300,
+            "completion_tokens": 0,
+            "cached_tokens": 0,
+            "latency": 1.5,
+        }
+    ]
+    conversation_metrics = get_conversation_metrics(metrics)
+    assert conversation_metrics.compactions.labels().value == 1
+    summary = conversation_metrics.window_summary(300)
+    assert summary["turns"] == 3
+    assert summary["mean_prompt_tokens"] == 200
+
+
+def test_summaries_are_cached(metrics):
+    """Test that the same history is summarized once."""
+    client = FakeClient()
+    manager = _manager(client, metrics)
+    try:
+        for _ in range(2):
+            conversation = Conversation()
+            for i in range(1, 4):
+                _turn(conversation, manager, i)
+            _settle(manager, conversation)
+            assert conversation.summary == "2 turns summarized"
+    finally:
+        manager.shutdown()
+    assert len(client.calls) == 1
+
+
+def test_failed_summary_keeps_turns(metrics):
+    """Test that a failed compaction leaves the history intact and is retried later."""
+    manager = _manager(FakeClient(fail=True), metrics)
+    conversation = Conversation()
+    try:
+        for i in range(1, 4):
+            _turn(conversation, manager, i)
+        history = _settle(manager, conversation)
+        assert len(history) == 6
+        assert conversation.summary is None
+        assert manager.maintain(conversation)
+    finally:
+        manager.shutdown()
@@ -0,0 +1,98 @@
+"""
+Unit tests for the structured diagnosis renderer.
+Tests localized headings, HTML escaping and memoization.
+"""
+
+import pytest
+
+from src.core.ai_client import StructuredDiagnosisOutput
+from src.core.diagnosis_renderer import DiagnosisRenderer, _DiagnosisTemplate
+
+TRANSLATIONS = {
+    "English": {"dx_primary": "Primary Diagnosis", "dx_conf_medium": "medium"},
+    "Français": {"dx_primary": "Diagnostic principal", "dx_conf_medium": "moyenne"},
+}
+
+
+@pytest.fixture
+def diagnosis():
+    return StructuredDiagnosisOutput(
+        primary_diagnosis="Dengue <script>",
+        differential_diagnoses=["Malaria", "Chikungunya"],
+        recommended_next_steps=["NS1 antigen"],
+        important_considerations=["Avoid NSAIDs & aspirin"],
+        confidence_level="medium",
+        reasoning="Travel history and rash",
+    )
+
+
+def test_render_uses_language_headings(diagnosis):
+    """Test that headings follow the requested language."""
+    renderer = DiagnosisRenderer(TRANSLATIONS)
+    html = renderer.render(diagnosis, "Français")
+    assert "Diagnostic principal" in html
+    assert "MOYENNE" in html
+    assert "Primary Diagnosis" in renderer.render(diagnosis, "English")
+
+
+def test_render_escapes_model_text(diagnosis):
+    """Test that model output cannot inject markup."""
+    html = DiagnosisRenderer(TRANSLATIONS).render(diagnosis)
+    assert "<script>" not in html
+    assert "Dengue &lt;script&gt;" in html
+    assert "<li>Avoid NSAIDs &amp; aspirin</li>" in html
+
+
+def test_unknown_language_and_missing_keys_fall_back(diagnosis):
+    """Test fallback to English translations and built-in labels."""
+    html = DiagnosisRenderer(TRANSLATIONS).render(diagnosis, "Klingon")
+    assert "Primary Diagnosis" in html
+    assert "Clinical Reasoning" in html
+
+
+def test_renders_are_memoized_per_diagnosis_and_language(diagnosis):
+    """Test that an identical diagnosis is served from the cache."""
+    renderer = DiagnosisRenderer(TRANSLATIONS)
+    first = renderer.render(diagnosis, "Français")
+    same = diagnosis.model_copy()
+    assert renderer.render(same, "Français") is first
+
+    changed = diagnosis.model_copy(update={"reasoning": "Updated"})
+    assert "Updated" in renderer.render(changed, "Français")
+
+
+def test_new_translations_reset_the_cache(diagnosis):
+    """Test that reloaded translations are picked up."""
+    renderer = DiagnosisRenderer(TRANSLATIONS)
+    renderer.render(diagnosis, "Français")
+    reloaded = {"Français": {"dx_primary": "Diagnostic retenu"}}
+    assert "Diagnostic retenu" in renderer.render(diagnosis, "Français", reloaded)
+    # The shared renderer's default translations are left alone
+    assert renderer.translations is TRANSLATIONS
+
+
+def test_max_entries_bounds_the_cache(diagnosis):
+    """Test least-recently-used eviction."""
+    renderer = DiagnosisRenderer(TRANSLATIONS, max_entries=2)
+    for reasoning in ("a", "b", "c"):
+        renderer.render(diagnosis.model_copy(update={"reasoning": reasoning}))
+    assert len(renderer._cache.renders) == 2
+
+
+def test_render_stays_with_its_translations_snapshot(diagnosis, monkeypatch):
+    """Test that a render made from old labels never lands in the new labels' cache."""
+    renderer = DiagnosisRenderer(TRANSLATIONS)
+    reloaded = {"Français": {"dx_primary": "Diagnostic retenu"}}
+    original = _DiagnosisTemplate.render
+    swapped = []
+
+    def render_during_reload(template, dx):
+        # Another session renders with reloaded translations mid-render
+        if not swapped:
+            swapped.append(True)
+            renderer.render(dx, "Français", reloaded)
+        return original(template, dx)
+
+    monkeypatch.setattr(_DiagnosisTemplate, "render", render_during_reload)
+    assert "Diagnostic principal" in renderer.render(diagnosis, "Français")
+    assert "Diagnostic retenu" in renderer.render(diagnosis, "Français", reloaded)
@@ -0,0 +1,91 @@
+"""
+Unit tests for display-language translation of stored diagnoses.
+Uses a fake OpenAI client to count translation calls.
+"""
+
+import json
+from types import SimpleNamespace
+
+from src.core.ai_client import StructuredDiagnosisOutput
+from src.core.diagnosis_translator import DiagnosisTranslator, _TranslatedFields
+
+
+class FakeClient:
+    """Minimal stand-in for the OpenAI client's chat completion endpoints."""
+
+    def __init__(self):
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.beta = SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(parse=self._parse))
+        )
+
+    @staticmethod
+    def _response(message):
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    def _create(self, **params):
+        self.calls.append(params)
+        text = params["messages"][-1]["content"]
+        return self._response(SimpleNamespace(content=f"[FR] {text}"))
+
+    def _parse(self, **params):
+        self.calls.append(params)
+        fields = json.loads(params["messages"][-1]["content"])
+        translated = {
+            key: [f"[FR] {item}" for item in value] if isinstance(value, list) else f"[FR] {value}"
+            for key, value in fields.items()
+        }
+        return self._response(SimpleNamespace(parsed=_TranslatedFields(**translated)))
+
+
+def test_plain_diagnosis_is_translated_once_per_language():
+    """Test that repeated switches reuse the cached translation."""
+    client = FakeClient()
+    translator = DiagnosisTranslator(client, model="gpt-4o-mini")
+
+    assert translator.translate("Dengue fever", "Français", "English") == "[FR] Dengue fever"
+    assert translator.translate("Dengue fever", "Français", "English") == "[FR] Dengue fever"
+    assert len(client.calls) == 1
+    assert client.calls[0]["model"] == "gpt-4o-mini"
+
+
+def test_same_language_needs_no_call():
+    """Test that the original is returned for its own language."""
+    client = FakeClient()
+    translator = DiagnosisTranslator(client)
+    assert translator.translate("Dengue fever", "English", "English") == "Dengue fever"
+    assert client.calls == []
+
+
+def test_structured_fields_are_translated_in_one_request():
+    """Test the batched structured translation."""
+    client = FakeClient()
+    diagnosis = StructuredDiagnosisOutput(
+        primary_diagnosis="Dengue",
+        differential_diagnoses=["Malaria", "Chikungunya"],
+        recommended_next_steps=["NS1 antigen"],
+        important_considerations=["Avoid NSAIDs"],
+        confidence_level="high",
+        reasoning="Travel history",
+    )
+    translated = DiagnosisTranslator(client).translate(diagnosis, "Français", "English")
+
+    assert len(client.calls) == 1
+    assert translated.primary_diagnosis == "[FR] Dengue"
+    assert translated.differential_diagnoses == ["[FR] Malaria", "[FR] Chikungunya"]
+    assert translated.confidence_level == "high"
+    assert diagnosis.primary_diagnosis == "Dengue"
+
+
+def test_failed_call_returns_none_and_is_not_cached():
+    """Test that errors fall back to the caller and are retried later."""
+    client = FakeClient()
+    translator = DiagnosisTranslator(client)
+
+    def _unavailable(**params):
+        raise RuntimeError("upstream unavailable")
+
+    client.chat.completions.create = _unavailable
+    assert translator.translate("Dengue fever", "Français", "English") is None
+    assert translator._cache == {}
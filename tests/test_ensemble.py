@@ -0,0 +1,123 @@
+"""
+Unit tests for the self-consistency ensemble.
+Uses a scripted stand-in for the AI client to check voting, early termination
+and token accounting.
+"""
+
+import threading
+
+from src.core.ai_client import StructuredDiagnosisOutput
+from src.core.cancellation import REASON_CONSENSUS, DiagnosisCancelledError, current_cancel_token
+from src.core.ensemble import DiagnosisEnsemble, get_ensemble_metrics, normalize_diagnosis, vote
+from src.utils.metrics import DiagnosisMetrics, MetricsRegistry, usage_scope
+
+
+def _dx(primary, differentials=(), confidence="low"):
+    return StructuredDiagnosisOutput(
+        primary_diagnosis=primary,
+        differential_diagnoses=list(differentials),
+        recommended_next_steps=[],
+        important_considerations=[],
+        confidence_level=confidence,
+        reasoning="",
+    )
+
+
+class ScriptedClient:
+    """Returns the scripted answers in order; None entries block until cancelled."""
+
+    def __init__(self, metrics, answers):
+        self.metrics = metrics
+        self.answers = list(answers)
+        self.cancelled = []
+        self._lock = threading.Lock()
+
+    def get_structured_diagnosis(self, system_prompt, user_prompt, **kwargs):
+        with self._lock:
+            answer = self.answers.pop(0)
+        token = kwargs.get("cancel_token") or current_cancel_token()
+        self.metrics.record_usage("gpt-5-mini", {"prompt_tokens": 10, "completion_tokens": 5})
+        if answer is None:
+            stopped = threading.Event()
+            token.on_cancel(stopped.set)
+            stopped.wait(5)
+            self.cancelled.append(token.reason)
+            raise DiagnosisCancelledError(token.reason)
+        return answer
+
+
+def test_normalize_diagnosis():
+    """Test that spelling variants of one diagnosis share a voting key."""
+    assert normalize_diagnosis("Dengue Fever (likely).") == normalize_diagnosis("dengue  fever")
+    assert normalize_diagnosis("ＣＯＶＩＤ-19") == "covid 19"
+    assert normalize_diagnosis("(unclear)") == "(unclear)"
+
+
+def test_vote_merges_differentials():
+    """Test primary voting and the differential quorum."""
+    samples = [
+        _dx("Dengue fever", ["Malaria", "Typhoid"]),
+        _dx("Malaria", ["dengue fever", "Chikungunya"]),
+        _dx("dengue fever.", ["malaria", "Zika"]),
+    ]
+    diagnosis, agreement, shares = vote(samples)
+    assert diagnosis.primary_diagnosis == "Dengue fever"
+    assert agreement == 2 / 3
+    # Malaria: two differentials plus one losing primary; the rest named once
+    assert diagnosis.differential_diagnoses == ["Malaria"]
+    assert shares == {"Malaria": 1.0}
+
+
+def test_early_termination_cancels_the_rest():
+    """Test that agreeing samples stop the ensemble and close the stragglers."""
+    metrics = DiagnosisMetrics(MetricsRegistry())
+    answers = [_dx("Flu"), _dx("flu"), None, None]
+    client = ScriptedClient(metrics, answers)
+    ensemble = DiagnosisEnsemble(client, samples=4, quorum=3, metrics=metrics)
+    try:
+        with usage_scope() as usage:
+            result = ensemble.run("sys", "case", initial=_dx("Flu (influenza)"))
+    finally:
+        ensemble.shutdown()
+
+    assert result.diagnosis.primary_diagnosis == "Flu (influenza)"
+    assert result.agreement == 1.0
+    assert (result.samples, result.cancelled) == (3, 2)
+    assert client.cancelled == [REASON_CONSENSUS, REASON_CONSENSUS]
+    # All four samples' usage reached the run and the enclosing scope
+    assert result.tokens == 60
+    assert usage["prompt"] + usage["completion"] == 60
+
+    summary = get_ensemble_metrics(metrics).window_summary(300)
+    assert summary["runs"] == 1
+    assert summary["mean_agreement"] == 1.0
+    assert summary["cancelled_samples"] == 2
+
+
+def test_confident_answer_skips_ensemble():
+    """Test that only low-confidence answers are re-sampled."""
+    metrics = DiagnosisMetrics(MetricsRegistry())
+    client = ScriptedClient(metrics, [_dx("Flu", confidence="high")])
+    ensemble = DiagnosisEnsemble(client, samples=3, metrics=metrics)
+    try:
+        assert ensemble.diagnose("sys", "case").confidence_level == "high"
+    finally:
+        ensemble.shutdown()
+    assert client.answers == []
+    assert get_ensemble_metrics(metrics).window_summary(300)["runs"] == 0
+
+
+def test_ensemble_cost_includes_the_first_answer():
+    """Test that diagnose() charges the first call to the run and counts only cut samples."""
+    metrics = DiagnosisMetrics(MetricsRegistry())
+    client = ScriptedClient(metrics, [_dx("Flu"), _dx("flu"), None])
+    ensemble = DiagnosisEnsemble(client, samples=2, quorum=2, metrics=metrics)
+    try:
+        assert ensemble.diagnose("sys", "case").primary_diagnosis == "Flu"
+    finally:
+        ensemble.shutdown()
+
+    summary = get_ensemble_metrics(metrics).window_summary(300)
+    assert summary["cancelled_samples"] == 1
+    # First answer plus both samples, 15 tokens each
+    assert summary["tokens"] == 45
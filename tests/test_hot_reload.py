@@ -0,0 +1,96 @@
+"""
+Unit tests for hot reload of translations and prompt templates.
+Tests the file watcher, template swaps and version counters.
+"""
+
+import json
+import os
+
+from src.core.prompt_builder import PromptBuilder
+from src.utils.hot_reload import FileWatcher, enable_hot_reload, load_prompt_canvas
+from src.utils.i18n import I18n
+
+SECRETS = """
+[prompt_canvas]
+prompt_system = "{system}"
+prompt_words = ["a", "b"]
+"""
+
+
+def _touch_later(path, seconds):
+    """Move a file's mtime forward so the change is visible on coarse clocks."""
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 1_000_000_000))
+
+
+def test_file_watcher_runs_callbacks_on_change(tmp_path):
+    """Test change detection and callback error isolation."""
+    target = tmp_path / "file.txt"
+    target.write_text("one")
+    seen = []
+
+    def _fail(path):
+        raise ValueError("broken")
+
+    watcher = FileWatcher(interval=3600)
+    watcher.watch(target, _fail)
+    watcher.watch(target, seen.append)
+
+    assert watcher.check() == []
+    target.write_text("two")
+    _touch_later(target, 1)
+    assert watcher.check() == [target.resolve()]
+    assert seen == [target.resolve()]
+    watcher.stop()
+
+
+def test_prompt_builder_swaps_templates_atomically():
+    """Test that snapshots keep their version after an update."""
+    builder = PromptBuilder(["a"], {"English": {}}, prompt_system="old")
+    snapshot = builder.templates()
+
+    assert builder.update_templates(["a"], "old") is False
+    assert builder.update_templates(["b"], "new") is True
+
+    assert snapshot.prompt_system == "old" and snapshot.version == 1
+    assert builder.templates() == ("new", ("b",), 2)
+
+
+def test_enable_hot_reload_rebuilds_translations_and_prompts(tmp_path):
+    """Test the end-to-end reload through the watcher."""
+    translations = tmp_path / "translations.json"
+    translations.write_text(json.dumps({"English": {"none": "none"}}), encoding="utf-8")
+    secrets = tmp_path / "secrets.toml"
+    secrets.write_text(SECRETS.format(system="old"), encoding="utf-8")
+
+    i18n = I18n(translations)
+    builder = PromptBuilder(["a", "b"], i18n.bundles(), prompt_system="old")
+    watcher = FileWatcher(interval=3600)
+    enable_hot_reload(i18n, builder, [tmp_path / "missing.toml", secrets], watcher=watcher)
+    old_bundles = i18n.bundles()
+
+    translations.write_text(json.dumps({"English": {"none": "aucun"}}), encoding="utf-8")
+    _touch_later(translations, 1)
+    secrets.write_text(SECRETS.format(system="new"), encoding="utf-8")
+    _touch_later(secrets, 1)
+    watcher.check()
+
+    assert i18n.version == 2
+    assert builder.translations["English"]["none"] == "aucun"
+    assert old_bundles["English"]["none"] == "none"
+    assert builder.templates().prompt_system == "new"
+    assert builder.version == 2
+
+    secrets.write_text("not = [valid", encoding="utf-8")
+    _touch_later(secrets, 2)
+    watcher.check()
+    assert builder.templates().prompt_system == "new"  # last good version kept
+    watcher.stop()
+
+
+def test_load_prompt_canvas_without_table(tmp_path):
+    """Test secrets files without a prompt canvas."""
+    secrets = tmp_path / "secrets.toml"
+    secrets.write_text('openai_api_key = "x"\n', encoding="utf-8")
+
+    assert load_prompt_canvas(secrets) is None
@@ -4,12 +4,13 @@ Tests translation loading and retrieval.
 """
 
 import json
+import os
 import tempfile
 from pathlib import Path
 
 import pytest
 
-from src.utils.i18n import I18n, load_translations
+from src.utils.i18n import I18n, get_i18n, load_translations
 
 
 class TestI18n:
@@ -137,3 +138,41 @@ def test_load_translations_function(tmp_path):
     assert loaded == translations
     assert loaded["English"]["test"] == "value"
 
+
+
+def test_bundles_are_read_only_views(tmp_path):
+    """Test that bundles expose the translations without copying them."""
+    trans_file = tmp_path / "translations.json"
+    trans_file.write_text(json.dumps({"English": {"test": "value"}}), encoding="utf-8")
+    i18n = I18n(trans_file)
+
+    bundles = i18n.bundles()
+    assert bundles["English"]["test"] == "value"
+    assert i18n.bundle("Deutsch")["test"] == "value"  # default language fallback
+    with pytest.raises(TypeError):
+        bundles["English"]["test"] = "changed"  # type: ignore[index]
+
+    i18n.add_translation("English", "new_key", "New Value")
+    assert i18n.bundles()["English"]["new_key"] == "New Value"
+    assert "new_key" not in bundles["English"]  # swapped in, earlier readers unaffected
+
+
+def test_get_i18n_shares_instance_and_reloads_on_mtime_change(tmp_path):
+    """Test the process-wide cache and mtime-based invalidation."""
+    trans_file = tmp_path / "translations.json"
+    trans_file.write_text(json.dumps({"English": {"test": "value"}}), encoding="utf-8")
+
+    i18n = get_i18n(trans_file)
+    assert get_i18n(trans_file) is i18n
+    first_bundles = i18n.bundles()
+
+    trans_file.write_text(json.dumps({"English": {"test": "updated"}}), encoding="utf-8")
+    stat = trans_file.stat()
+    os.utime(trans_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert get_i18n(trans_file).bundles()["English"]["test"] == "updated"
+    assert first_bundles["English"]["test"] == "value"  # earlier readers keep their snapshot
+
+    trans_file.write_text("{not json", encoding="utf-8")
+    os.utime(trans_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
+    assert get_i18n(trans_file).bundles()["English"]["test"] == "updated"
@@ -0,0 +1,80 @@
+"""
+Unit tests for incremental re-diagnosis of edited cases.
+Tests delta detection, the follow-up prompt and replay of the case history.
+"""
+
+from types import SimpleNamespace
+
+from src.core.ai_client import DiagnosisAIClient, StructuredDiagnosisOutput
+from src.core.incremental import CaseConversation, case_delta, case_snapshot
+from src.models.patient import PatientData
+
+LABELS = {"lab": "Laboratory test results", "exam": "Examination findings", "none": "none"}
+
+
+def _patient(**changes):
+    fields = {
+        "gender": "female",
+        "age": 30,
+        "is_pregnant": "no",
+        "history": "",
+        "symptoms": "fever, rash",
+        "exam_findings": "",
+        "lab_results": "",
+    }
+    fields.update(changes)
+    return PatientData.model_construct(**fields)
+
+
+def test_case_delta():
+    """Test that findings produce delta lines and demographics start a new case."""
+    snapshot = case_snapshot(_patient())
+    assert case_delta(snapshot, _patient()) == []
+    assert case_delta(snapshot, _patient(lab_results="IgE > 3000"), LABELS) == [
+        "Laboratory test results: IgE > 3000 (previously: none)"
+    ]
+    assert case_delta(snapshot, _patient(age=31)) is None
+
+
+def test_conversation_follow_up():
+    """Test that only a diagnosed case in the same language gets an update prompt."""
+    conversation = CaseConversation("English")
+    edited = _patient(exam_findings="petechiae")
+    assert conversation.update_prompt(edited, "English", LABELS) is None
+
+    diagnosis = StructuredDiagnosisOutput(
+        primary_diagnosis="Dengue fever",
+        recommended_next_steps=[],
+        important_considerations=[],
+        confidence_level="medium",
+        reasoning="",
+    )
+    conversation.record("full case prompt", diagnosis, _patient())
+    assert conversation.turn_count == 1
+    assert conversation.messages()[1]["content"] == diagnosis.model_dump_json()
+
+    prompt = conversation.update_prompt(edited, "English", LABELS)
+    assert prompt.endswith("Examination findings: petechiae (previously: none)")
+    assert conversation.update_prompt(edited, "Français", LABELS) is None
+    assert conversation.update_prompt(_patient(), "English", LABELS) is None
+
+
+def test_history_is_sent_between_system_and_delta():
+    """Test that the client replays the case history before the delta."""
+    sent = []
+    client = DiagnosisAIClient(api_key="test", model="gpt-5-mini")
+
+    def create(**params):
+        sent.append(params["messages"])
+        message = SimpleNamespace(content="updated")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    client.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+    history = [
+        {"role": "user", "content": "case"},
+        {"role": "assistant", "content": "dx"},
+    ]
+    assert client.get_diagnosis("sys", "delta", history=history) == "updated"
+    assert [m["content"] for m in sent[0]] == ["sys", "case", "dx", "delta"]
@@ -0,0 +1,229 @@
+"""
+Unit tests for the background diagnosis job executor.
+Tests result retrieval, failures, TTL eviction and the job metrics.
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.core.cancellation import REASON_ABANDONED, REASON_DEADLINE, current_cancel_token
+from src.core.jobs import DiagnosisJob, JobExecutor, JobState, _PriorityScheduler
+from src.utils.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+@pytest.fixture
+def executor(registry):
+    executor = JobExecutor(max_workers=2, registry=registry)
+    yield executor
+    executor.shutdown()
+
+
+class TestJobExecutor:
+    """Test cases for JobExecutor."""
+
+    def test_result_survives_caller(self, executor):
+        """Test that a job keeps running and can be collected by ID later."""
+        release = threading.Event()
+
+        def diagnose(prompt, suffix=""):
+            release.wait(5)
+            return prompt + suffix
+
+        job_id = executor.submit(diagnose, "fever", suffix="!", session_id="s1", language="French")
+        job = executor.get(job_id)
+        assert not job.done
+        assert executor.pending() == 1
+
+        release.set()
+        assert executor.get(job_id).wait(5)
+        assert job.state is JobState.DONE
+        assert job.result == "fever!"
+        assert job.language == "French"
+        assert executor.pending() == 0
+
+    def test_failure_is_recorded(self, executor, registry):
+        """Test that an exception marks the job failed instead of killing the worker."""
+
+        def boom():
+            raise RuntimeError("upstream down")
+
+        job = executor.get(executor.submit(boom))
+        assert job.wait(5)
+        assert job.state is JobState.FAILED
+        assert isinstance(job.error, RuntimeError)
+
+        # The worker is still alive
+        assert executor.get(executor.submit(lambda: "ok")).wait(5)
+        finished = registry.get("mdxapp_jobs_finished_total")
+        assert finished.labels("failed").value == 1
+        assert finished.labels("done").value == 1
+
+    def test_finished_jobs_expire(self, registry):
+        """Test TTL eviction of collected-or-abandoned results."""
+        executor = JobExecutor(max_workers=1, result_ttl=60.0, registry=registry)
+        try:
+            job_id = executor.submit(lambda: "done")
+            job = executor.get(job_id)
+            assert job.wait(5)
+            assert executor.get(job_id) is job
+            job.finished_at -= 120
+            assert executor.get(job_id) is None
+        finally:
+            executor.shutdown()
+
+    def test_forget_keeps_pending_jobs(self, executor):
+        """Test that only finished jobs can be dropped."""
+        release = threading.Event()
+        job_id = executor.submit(release.wait, 5)
+        executor.forget(job_id)
+        assert executor.get(job_id) is not None
+        release.set()
+        assert executor.get(job_id).wait(5)
+        executor.forget(job_id)
+        assert executor.get(job_id) is None
+
+    def test_unknown_job(self, executor):
+        """Test lookups of missing IDs (e.g. a stale ?job= parameter)."""
+        assert executor.get(None) is None
+        assert executor.get("nope") is None
+
+    def test_reattach_only_from_the_submitting_browser(self, executor):
+        """Test that a job ID from the URL only reattaches its own session or browser."""
+        job_id = executor.submit(lambda: "dx", session_id="s1", client="browser-a")
+
+        assert executor.reattach(job_id, "s1") is not None
+        assert executor.reattach(job_id, "s2", "browser-a") is not None  # reload
+        assert executor.reattach(job_id, "s3", "browser-b") is None  # shared URL
+        assert executor.reattach(job_id, "s3") is None
+        assert executor.reattach("nope", "s1", "browser-a") is None
+
+
+class TestPriorityScheduling:
+    """Test cases for priority dispatch with aging."""
+
+    def test_urgent_jobs_run_first(self, registry):
+        """Test that a queued urgent job overtakes earlier routine ones."""
+        executor = JobExecutor(max_workers=1, registry=registry)
+        started, gate = threading.Event(), threading.Event()
+        order = []
+
+        def block():
+            started.set()
+            gate.wait(5)
+
+        try:
+            executor.submit(block)
+            assert started.wait(5)
+            ids = [
+                executor.submit(order.append, name, priority=priority)
+                for name, priority in (("routine", 0), ("elevated", 1), ("urgent", 2))
+            ]
+            depth = registry.get("mdxapp_queue_depth")
+            assert depth.labels("urgent").value == 1
+            assert depth.labels("routine").value == 1
+
+            gate.set()
+            for job_id in ids:
+                assert executor.get(job_id).wait(5)
+            assert order == ["urgent", "elevated", "routine"]
+            assert depth.labels("routine").value == 0
+        finally:
+            executor.shutdown()
+
+    def test_aging_prevents_starvation(self):
+        """Test that a long-waiting routine job beats a fresh urgent one."""
+        scheduler = _PriorityScheduler(aging=10.0)
+        routine = DiagnosisJob("old", print, (), {}, priority=0)
+        routine.submitted_at -= 25
+        urgent = DiagnosisJob("new", print, (), {}, priority=2)
+        scheduler.put(urgent)
+        scheduler.put(routine)
+        assert scheduler.get() is routine
+        assert scheduler.get() is urgent
+
+
+class TestJobCancellation:
+    """Test cases for cancellation, deadlines and abandoned jobs."""
+
+    def test_cancel_queued_job_frees_queue(self, registry):
+        """Test that a queued job is dropped without running."""
+        executor = JobExecutor(max_workers=1, registry=registry)
+        started, gate = threading.Event(), threading.Event()
+        ran = []
+
+        def block():
+            started.set()
+            gate.wait(5)
+
+        try:
+            executor.submit(block)
+            assert started.wait(5)
+            job_id = executor.submit(ran.append, "queued")
+            assert executor.cancel(job_id)
+            job = executor.get(job_id)
+            assert job.done
+            assert job.state is JobState.CANCELLED
+            assert registry.get("mdxapp_queue_depth").labels("routine").value == 0
+            assert not executor.cancel(job_id)
+        finally:
+            gate.set()
+            executor.shutdown()
+        assert ran == []
+
+    def test_cancel_running_job(self, executor, registry):
+        """Test that a running job sees its token through the context."""
+
+        running = threading.Event()
+
+        def diagnose():
+            # Stand-in for the AI client: stop reading once the token fires
+            token = current_cancel_token()
+            cancelled = threading.Event()
+            token.on_cancel(cancelled.set)
+            running.set()
+            cancelled.wait(5)
+            token.raise_if_cancelled()
+
+        job_id = executor.submit(diagnose)
+        job = executor.get(job_id)
+        assert running.wait(5)
+        assert executor.cancel(job_id)
+        assert job.wait(5)
+        assert job.state is JobState.CANCELLED
+        assert registry.get("mdxapp_jobs_finished_total").labels("cancelled").value == 1
+
+    def test_reap_deadline_and_abandoned(self, registry):
+        """Test that the watchdog check cancels late and unpolled jobs."""
+        executor = JobExecutor(
+            max_workers=1, deadline=60, abandon_after=30, watch_interval=3600, registry=registry
+        )
+        started, gate = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            gate.wait(5)
+
+        try:
+            executor.submit(block)
+            assert started.wait(5)
+            late = executor.get(executor.submit(print))
+            unpolled = executor.get(executor.submit(print))
+            now = time.time()
+            assert executor.reap(now) == 0
+
+            late.token.deadline = now - 1
+            unpolled.last_seen = now - 31
+            assert executor.reap(now) == 2
+            assert late.token.reason == REASON_DEADLINE
+            assert unpolled.token.reason == REASON_ABANDONED
+            assert late.state is unpolled.state is JobState.CANCELLED
+        finally:
+            gate.set()
+            executor.shutdown()
@@ -0,0 +1,109 @@
+"""
+Unit tests for the logging pipeline.
+Tests JSON serialization, queue-based delivery and rate limiting.
+"""
+
+import json
+import logging
+
+from src.utils.logger import (
+    JsonFormatter,
+    RateLimitFilter,
+    flush_logs,
+    get_logger,
+    set_log_rate_limit,
+    setup_logger,
+)
+from src.utils.tracing import Tracer
+
+
+def _record(msg, level=logging.INFO, lineno=1):
+    return logging.LogRecord("mdxapp.test", level, __file__, lineno, msg, None, None)
+
+
+class TestJsonFormatter:
+    """Test cases for JsonFormatter."""
+
+    def test_messages_with_quotes_stay_valid_json(self):
+        """Test that quotes and newlines in messages are escaped properly."""
+        record = _record('Patient said "it hurts"\nsince {yesterday}')
+        record.trace_id = "abc"
+
+        payload = json.loads(JsonFormatter().format(record))
+
+        assert payload["message"] == 'Patient said "it hurts"\nsince {yesterday}'
+        assert payload["trace_id"] == "abc"
+        assert payload["level"] == "INFO"
+
+
+class TestRateLimitFilter:
+    """Test cases for RateLimitFilter."""
+
+    def test_rate_limit_per_call_site(self):
+        """Test that a noisy call site is limited without affecting others."""
+        rate_limit = RateLimitFilter(max_per_second=2)
+
+        noisy = [rate_limit.filter(_record("hot", lineno=10)) for _ in range(10)]
+        other = rate_limit.filter(_record("cold", lineno=20))
+
+        assert sum(noisy) == 2
+        assert other is True
+
+    def test_warnings_are_never_dropped(self):
+        """Test that WARNING and above bypass sampling."""
+        rate_limit = RateLimitFilter(sample_rate=0.0, max_per_second=0.001)
+
+        assert rate_limit.filter(_record("info")) is False
+        assert all(rate_limit.filter(_record("warn", logging.WARNING)) for _ in range(5))
+
+
+class TestLoggingPipeline:
+    """Test cases for the queue-based logging pipeline."""
+
+    def test_setup_is_idempotent(self):
+        """Test that repeated setup does not stack handlers."""
+        logger = setup_logger("mdxapp.test.idempotent")
+        setup_logger("mdxapp.test.idempotent")
+
+        assert len(logger.handlers) == 1
+        assert get_logger("mdxapp.test.idempotent") is logger
+
+    def test_records_reach_rotating_json_file(self, tmp_path):
+        """Test delivery through the listener to a JSON log file with trace IDs."""
+        log_file = tmp_path / "logs" / "mdxapp.log"
+        logger = setup_logger("mdxapp.test.file", log_file=log_file, format_json=True)
+        tracer = Tracer(enabled=True)
+
+        with tracer.span("submit") as span:
+            logger.info('diagnosis "ready"')
+        flush_logs()
+
+        lines = log_file.read_text(encoding="utf-8").splitlines()
+        payload = json.loads(lines[-1])
+        assert payload["message"] == 'diagnosis "ready"'
+        assert payload["trace_id"] == span.trace_id
+
+    def test_exceptions_keep_their_own_json_field(self, tmp_path):
+        """Test that tracebacks survive the queue as "exception", not inside "message"."""
+        log_file = tmp_path / "logs" / "mdxapp.log"
+        logger = setup_logger("mdxapp.test.exception", log_file=log_file, format_json=True)
+
+        try:
+            raise ValueError("IgE out of range")
+        except ValueError:
+            logger.exception("triage failed for %s", "case-1")
+        flush_logs()
+
+        payload = json.loads(log_file.read_text(encoding="utf-8").splitlines()[-1])
+        assert payload["message"] == "triage failed for case-1"
+        assert payload["exception"].startswith("Traceback")
+        assert "ValueError: IgE out of range" in payload["exception"]
+
+    def test_set_log_rate_limit_attaches_filter(self):
+        """Test that hot-path limits attach to the named logger once."""
+        set_log_rate_limit("mdxapp.test.hot", max_per_second=5)
+        set_log_rate_limit("mdxapp.test.hot", max_per_second=5)
+
+        filters = list(logging.getLogger("mdxapp.test.hot").filters)
+        assert len(filters) == 1
+        assert filters[0].max_per_second == 5
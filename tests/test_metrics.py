@@ -0,0 +1,180 @@
+"""
+Unit tests for the metrics registry.
+Tests counters, histograms, Prometheus rendering and thread safety.
+"""
+
+import threading
+
+import pytest
+
+from src.utils.metrics import DiagnosisMetrics, MetricsRegistry, RollingWindow
+
+
+class TestMetricsRegistry:
+    """Test cases for MetricsRegistry."""
+
+    def test_counter_increments_per_label(self):
+        """Test labelled counter increments."""
+        registry = MetricsRegistry()
+        counter = registry.counter("mdxapp_errors_total", "Errors", ["error"])
+
+        counter.labels("RateLimitError").inc()
+        counter.labels(error="RateLimitError").inc(2)
+        counter.labels("APIConnectionError").inc()
+
+        assert counter.labels("RateLimitError").value == 3
+        assert counter.total() == 4
+
+    def test_counter_rejects_negative_increment(self):
+        """Test that counters cannot decrease."""
+        counter = MetricsRegistry().counter("c_total", "c")
+        with pytest.raises(ValueError):
+            counter.inc(-1)
+
+    def test_register_returns_existing_metric(self):
+        """Test get-or-create semantics and kind conflicts."""
+        registry = MetricsRegistry()
+        first = registry.counter("requests_total", "Requests")
+
+        assert registry.counter("requests_total", "Requests") is first
+        with pytest.raises(ValueError):
+            registry.gauge("requests_total", "Requests")
+
+    def test_counter_is_exact_under_threads(self):
+        """Test that sharded counters do not lose updates across threads."""
+        counter = MetricsRegistry().counter("hits_total", "Hits")
+
+        def work():
+            for _ in range(10_000):
+                counter.inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.total() == 80_000
+
+    def test_histogram_buckets_and_quantile(self):
+        """Test histogram cumulative buckets and quantile estimation."""
+        histogram = MetricsRegistry().histogram("latency_seconds", "Latency", buckets=(1, 2, 4))
+        for value in (0.5, 1.5, 1.5, 3.0, 10.0):
+            histogram.observe(value)
+
+        snap = histogram.labels().snapshot()
+        assert [count for _, count in snap["buckets"]] == [1, 3, 4, 5]
+        assert snap["count"] == 5
+        assert snap["sum"] == pytest.approx(16.5)
+        assert 1.0 <= histogram.labels().quantile(0.5) <= 2.0
+
+    def test_render_prometheus(self, tmp_path):
+        """Test Prometheus text exposition output."""
+        registry = MetricsRegistry()
+        registry.counter("mdxapp_tokens_total", "Tokens", ["model", "kind"]).labels(
+            "gpt-5-mini", "prompt"
+        ).inc(120)
+        registry.gauge("mdxapp_queue_depth", "Queue").set(3)
+        registry.histogram("mdxapp_latency_seconds", "Latency", buckets=(1.0,)).observe(0.5)
+
+        text = registry.render_prometheus()
+
+        assert "# TYPE mdxapp_tokens_total counter" in text
+        assert 'mdxapp_tokens_total{model="gpt-5-mini",kind="prompt"} 120' in text
+        assert "mdxapp_queue_depth 3" in text
+        assert 'mdxapp_latency_seconds_bucket{le="+Inf"} 1' in text
+        assert "mdxapp_latency_seconds_count 1" in text
+
+        path = tmp_path / "metrics.prom"
+        registry.write_prometheus(path)
+        assert path.read_text(encoding="utf-8") == text
+
+
+class TestDiagnosisMetrics:
+    """Test cases for DiagnosisMetrics helpers."""
+
+    def test_track_request_records_errors_and_inflight(self):
+        """Test latency, error class and in-flight tracking."""
+        metrics = DiagnosisMetrics(MetricsRegistry())
+
+        with pytest.raises(TimeoutError), metrics.track_request("gpt-5-mini"):
+            assert metrics.inflight.labels().value == 1
+            raise TimeoutError
+
+        assert metrics.inflight.labels().value == 0
+        assert metrics.errors.labels("TimeoutError").value == 1
+        assert metrics.request_latency.labels("gpt-5-mini").snapshot()["count"] == 1
+
+    def test_record_usage_with_cached_tokens(self):
+        """Test token counters and prompt-cache hit ratio from usage data."""
+        metrics = DiagnosisMetrics(MetricsRegistry())
+        usage = {
+            "prompt_tokens": 1000,
+            "completion_tokens": 200,
+            "prompt_tokens_details": {"cached_tokens": 768},
+        }
+
+        recorded = metrics.record_usage("gpt-5-mini", usage)
+        metrics.record_usage("gpt-5-mini", {"prompt_tokens": 10, "completion_tokens": 5})
+
+        assert recorded["cached_tokens"] == 768
+        assert recorded["total_tokens"] == 1200
+        assert metrics.tokens.labels("gpt-5-mini", "cached").value == 768
+        assert metrics.cache_hit_ratio("openai_prompt") == 0.5
+        assert metrics.cache_hit_ratio("unused") is None
+
+
+class TestRollingWindow:
+    """Test cases for RollingWindow."""
+
+    def test_summary_merges_slots_within_window(self):
+        """Test that only slots inside the window are merged."""
+        window = RollingWindow(interval=60, slots=10, buckets=(1.0, 5.0))
+        window.add("requests", 2, now=0)
+        window.add("requests", 3, now=120)
+        window.observe("latency", 0.5, now=120)
+        window.observe("latency", 3.0, now=130)
+
+        recent = window.summary(60, now=150)
+        everything = window.summary(600, now=150)
+
+        assert recent["counters"]["requests"] == 3
+        assert everything["counters"]["requests"] == 5
+        assert recent["quantiles"]["latency"]["count"] == 2
+        assert recent["quantiles"]["latency"]["p50"] == pytest.approx(1.0)
+
+    def test_old_slots_are_overwritten(self):
+        """Test that the ring reuses slots once they fall out of range."""
+        window = RollingWindow(interval=60, slots=2)
+        window.add("requests", 1, now=0)
+        window.add("requests", 1, now=120)
+
+        assert window.summary(3600, now=120)["counters"]["requests"] == 1
+
+
+def test_window_summary_cost_and_rates():
+    """Test the operator summary derived from windowed counters."""
+    metrics = DiagnosisMetrics(MetricsRegistry())
+    metrics.set_pricing({"test-model": {"input": 1.0, "cached_input": 0.1, "output": 10.0}})
+
+    with metrics.track_request("test-model"):
+        metrics.record_usage(
+            "test-model",
+            {
+                "prompt_tokens": 1_000_000,
+                "completion_tokens": 100_000,
+                "prompt_tokens_details": {"cached_tokens": 500_000},
+            },
+        )
+    metrics.record_http_status(429)
+    metrics.touch_session("session-1")
+
+    summary = metrics.window_summary(3600)
+
+    # 0.5M uncached * $1 + 0.5M cached * $0.1 + 0.1M output * $10
+    assert summary["cost_usd"] == pytest.approx(1.55)
+    assert summary["cost_per_hour"] == pytest.approx(1.55)
+    assert summary["rate_limited_rate"] == 1.0
+    assert summary["retry_rate"] == 1.0
+    assert summary["cache_hit_rates"]["openai_prompt"] == 1.0
+    assert summary["active_sessions"] == 1
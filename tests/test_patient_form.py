@@ -0,0 +1,19 @@
+"""
+Unit tests for the patient form component.
+Tests the pregnancy rule applied on form submission.
+"""
+
+from src.components.patient_form import pregnancy_status
+
+TRANS = {"male": "Homme", "female": "Femme", "no": "Non", "yes": "Oui"}
+
+
+def test_pregnancy_status_forces_no_for_male_patients():
+    """Test that a male patient is never reported pregnant."""
+    assert pregnancy_status("Homme", "Oui", TRANS) == "Non"
+
+
+def test_pregnancy_status_keeps_female_selection():
+    """Test that the selection is kept for female patients."""
+    assert pregnancy_status("Femme", "Oui", TRANS) == "Oui"
+    assert pregnancy_status("Femme", "Non", TRANS) == "Non"
@@ -38,6 +38,12 @@ class TestPatientData:
 
         assert patient.is_pregnant == "no"
 
+    def test_pregnancy_kept_for_females(self):
+        """Test that the male auto-correction does not match "female"."""
+        patient = PatientData(gender="Female", age=30, is_pregnant="yes", symptoms="Nausea")
+
+        assert patient.is_pregnant == "yes"
+
     def test_minimum_required_fields(self):
         """Test that only gender, age, and symptoms are required."""
         patient = PatientData(
@@ -0,0 +1,83 @@
+"""
+Unit tests for rerun profiling hooks.
+Tests sampling output, retention and the enable/disable toggle.
+"""
+
+import json
+import time
+
+from src.utils.profiling import (
+    RerunProfiler,
+    maybe_profile_rerun,
+    prune_profiles,
+    summarize_profiles,
+)
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+class TestRerunProfiler:
+    """Test cases for RerunProfiler."""
+
+    def test_sampling_writes_collapsed_stacks_and_summary(self, tmp_path):
+        """Test that a sampled rerun produces flamegraph and summary files."""
+        profiler = RerunProfiler(tmp_path, "diagnosis", interval=0.001).start()
+        _busy(0.05)
+        summary = profiler.stop()
+
+        collapsed = list(tmp_path.glob("*.collapsed"))
+        assert len(collapsed) == 1
+        lines = collapsed[0].read_text(encoding="utf-8").splitlines()
+        assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+        assert any("_busy" in line for line in lines)
+        assert summary["samples"] > 0
+        assert profiler.stop() is None  # already finalized
+
+    def test_cprofile_mode_writes_prof_dump(self, tmp_path):
+        """Test the deterministic profiler mode."""
+        profiler = RerunProfiler(tmp_path, "about", mode="cprofile").start()
+        _busy(0.01)
+        summary = profiler.stop()
+
+        assert len(list(tmp_path.glob("*.prof"))) == 1
+        assert any("_busy" in label for label, _ in summary["top_total"])
+
+
+def test_prune_profiles_keeps_newest(tmp_path):
+    """Test the retention limit on rerun profiles."""
+    for i in range(4):
+        stem = tmp_path / f"rerun-{i}"
+        (tmp_path / f"{stem.name}.collapsed").write_text("a;b 1\n")
+        summary = tmp_path / f"{stem.name}.summary.json"
+        summary.write_text(json.dumps({"top_self": [["b", 1]], "top_total": [["b", 1]]}))
+        time.sleep(0.01)
+
+    deleted = prune_profiles(tmp_path, max_files=2)
+
+    assert deleted == 4
+    assert sorted(p.name for p in tmp_path.glob("*.summary.json")) == [
+        "rerun-2.summary.json",
+        "rerun-3.summary.json",
+    ]
+    assert summarize_profiles(tmp_path)[0] == {"function": "b", "self": 2, "total": 2, "reruns": 2}
+
+
+def test_maybe_profile_rerun_toggle(tmp_path):
+    """Test the secret and query-parameter toggles."""
+    secrets = {"profiling_token": "s3cret", "profiling_dir": str(tmp_path)}
+
+    assert maybe_profile_rerun("page", secrets, {}) is None
+    assert maybe_profile_rerun("page", secrets, {"profile": "wrong"}) is None
+
+    profiler = maybe_profile_rerun("page", secrets, {"profile": "s3cret"})
+    assert profiler is not None
+    profiler.stop()
+
+    sampled_out = {"profiling_enabled": True, "profiling_sample_rate": 0.0}
+    assert maybe_profile_rerun("page", sampled_out, {}) is None
@@ -0,0 +1,101 @@
+"""
+Unit tests for the prompt builder.
+Tests compiled templates, batch building and template reloads.
+"""
+
+from src.core.prompt_builder import PromptBuilder
+from src.models.patient import PatientData
+
+WORDS = [f"w{i}{{x}} " for i in range(10)]  # braces must survive compilation
+TRANSLATIONS = {
+    "English": {"none": "none", "vissum_yrsold": " years old", "vissum_patient": "Patient: "},
+    "Français": {"none": "aucun", "vissum_yrsold": " ans", "vissum_patient": "Patient : "},
+}
+
+
+def _patient(**overrides):
+    data = {"gender": "Female", "age": 35, "is_pregnant": "no", "symptoms": "Fever"}
+    data.update(overrides)
+    return PatientData(**data)
+
+
+def _reference_prompt(words, patient, years_old, none_text, language):
+    """The prompt as the page used to build it, by concatenation."""
+    return (
+        words[0] + patient.gender + ", " + str(patient.age) + years_old + ". "
+        + words[1] + patient.is_pregnant + ". "
+        + words[2] + (patient.history or none_text) + ". "
+        + words[3] + patient.symptoms + ". "
+        + words[4] + (patient.exam_findings or none_text) + ". "
+        + words[5] + (patient.lab_results or none_text) + ". "
+        + words[6] + words[7] + words[8] + words[9] + language + ". "
+    )  # fmt: skip
+
+
+class TestPromptBuilder:
+    """Test cases for PromptBuilder."""
+
+    def test_compiled_prompt_matches_concatenation(self):
+        """Test that compiled templates produce the same prompt as before."""
+        builder = PromptBuilder(WORDS, TRANSLATIONS)
+        patient = _patient(history="Travel {abroad}", lab_results="WBC high")
+
+        assert builder.build_user_prompt(patient, "Français") == _reference_prompt(
+            WORDS, patient, " ans", "aucun", "Français"
+        )
+
+    def test_batch_uses_each_patients_language(self):
+        """Test batch building with per-patient languages."""
+        builder = PromptBuilder(WORDS, TRANSLATIONS)
+        patients = [_patient(language="English"), _patient(language="Français")]
+
+        prompts = builder.build_user_prompts(patients)
+
+        assert prompts[0].endswith("English. ") and " years old. " in prompts[0]
+        assert prompts[1].endswith("Français. ") and "aucun" in prompts[1]
+        assert builder.build_user_prompts(patients, language="English")[1] == prompts[0]
+
+    def test_default_template_when_prompt_words_are_incomplete(self):
+        """Test the fallback template."""
+        builder = PromptBuilder(["only one"], TRANSLATIONS)
+
+        prompt = builder.build_user_prompt(_patient(), "English")
+
+        assert "- Age: 35 years old" in prompt
+        assert "- History: none" in prompt
+        assert "Respond in English." in prompt
+
+    def test_visual_summary(self):
+        """Test the HTML summary."""
+        builder = PromptBuilder(WORDS, TRANSLATIONS)
+
+        summary = builder.build_visual_summary(_patient(), "Français")
+
+        assert summary.startswith('<p style="font-size:18px;"><b>Patient : </b>Female, 35 ans')
+
+    def test_template_updates_recompile(self):
+        """Test that a template reload is visible while old snapshots still work."""
+        builder = PromptBuilder(WORDS, TRANSLATIONS)
+        snapshot = builder.templates()
+        patient = _patient()
+        before = builder.build_user_prompt(patient)
+
+        builder.update_templates(["new "] * 10)
+
+        assert builder.build_user_prompt(patient).startswith("new Female")
+        assert builder.build_user_prompt(patient, templates=snapshot) == before
+
+    def test_translations_snapshot_overrides_builder_translations(self):
+        """Test that a rerun's translations snapshot is used even if the builder lags."""
+        builder = PromptBuilder(WORDS, TRANSLATIONS)
+        reloaded = {
+            **TRANSLATIONS,
+            "Français": {**TRANSLATIONS["Français"], "vissum_yrsold": " ans (màj)"},
+        }
+        patient = _patient()
+
+        assert "35 ans (màj)" in builder.build_user_prompt(
+            patient, "Français", translations=reloaded
+        )
+        assert "35 ans (màj)" in builder.build_visual_summary(patient, "Français", reloaded)
+        assert "35 ans." in builder.build_user_prompt(patient, "Français")
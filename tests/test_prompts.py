@@ -0,0 +1,68 @@
+"""Tests for the GPT-5 Mini prompt styles and token report."""
+
+import pytest
+
+from src.core.prompts import (
+    COMPACT_INSTRUCTIONS,
+    GPT5MiniPrompts,
+    create_enhanced_prompts,
+    prompt_token_report,
+)
+
+PATIENT = {
+    "gender": "Female",
+    "age": 42,
+    "is_pregnant": "no",
+    "history": "Recent travel to Thailand",
+    "symptoms": "Fever, headache, rash",
+    "exam_findings": "none",
+    "lab_results": "",
+}
+
+
+def test_compact_user_prompt_omits_empty_sections():
+    prompt = GPT5MiniPrompts.get_user_prompt_compact(**PATIENT)
+    assert prompt.splitlines() == [
+        "Female, 42y, pregnant: no",
+        "Hx: Recent travel to Thailand",
+        "Sx: Fever, headache, rash",
+    ]
+
+
+def test_compact_user_prompt_treats_localized_none_as_empty():
+    patient = {**PATIENT, "history": "aucun", "exam_findings": "Éruption maculaire"}
+    prompt = GPT5MiniPrompts.get_user_prompt_compact(**patient, none_text="aucun")
+    assert "Hx:" not in prompt
+    assert "Exam: Éruption maculaire" in prompt
+
+
+def test_compact_system_prompt_shares_instruction_prefix():
+    english = GPT5MiniPrompts.get_compact_system_prompt("English")
+    french = GPT5MiniPrompts.get_compact_system_prompt("Français")
+    assert english.startswith(COMPACT_INSTRUCTIONS)
+    assert french.startswith(COMPACT_INSTRUCTIONS)
+    assert french.endswith("Respond in Français.")
+
+
+def test_create_enhanced_prompts_styles():
+    enhanced = create_enhanced_prompts(PATIENT, style="enhanced")
+    compact = create_enhanced_prompts(PATIENT, style="compact")
+    assert len("".join(compact)) < len("".join(enhanced)) / 2
+    with pytest.raises(ValueError):
+        create_enhanced_prompts(PATIENT, style="verbose")
+
+
+def test_prompt_token_report_covers_each_language_and_style():
+    translations = {
+        "English": {"none": "none", "female": "Female", "no": "No"},
+        "Français": {"none": "aucun", "female": "Femme", "no": "Non"},
+    }
+    report = prompt_token_report(translations)
+    assert [(row["language"], row["style"]) for row in report] == [
+        ("English", "enhanced"),
+        ("English", "compact"),
+        ("Français", "enhanced"),
+        ("Français", "compact"),
+    ]
+    for enhanced, compact in zip(report[::2], report[1::2]):
+        assert 0 < compact["tokens"] < enhanced["tokens"]
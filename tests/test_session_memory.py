@@ -0,0 +1,110 @@
+"""
+Unit tests for session memory accounting.
+Tests size estimation, sampling and LRU eviction under the caps.
+"""
+
+from src.utils.metrics import MetricsRegistry
+from src.utils.session_memory import SessionMemoryAccountant, deep_sizeof
+
+
+def _accountant(**kwargs):
+    return SessionMemoryAccountant(sample_rate=0.0, registry=MetricsRegistry(), **kwargs)
+
+
+def test_deep_sizeof_counts_nested_and_shared_objects_once():
+    """Test recursive size estimation."""
+    payload = "x" * 10_000
+    assert deep_sizeof({"a": [payload]}) > 10_000
+    assert deep_sizeof([payload, payload]) < 2 * 10_000
+
+
+class TestSessionMemoryAccountant:
+    """Test cases for SessionMemoryAccountant."""
+
+    def test_tracks_totals_per_process(self):
+        """Test that every session's state is measured and summed."""
+        accountant = _accountant()
+        accountant.track("s1", {"diagnostic": "x" * 5_000})
+        accountant.track("s2", {"symptoms": "y" * 1_000})
+
+        totals = accountant.totals()
+        assert totals["sessions"] == 2
+        assert totals["state_bytes"] > 6_000
+        assert totals["largest_session_bytes"] > 5_000
+
+    def test_remeasures_only_when_sampled_or_stored(self):
+        """Test that unsampled reruns skip the measurement, also when artifacts are only read."""
+        accountant = _accountant()
+        state = {"diagnostic": "x" * 1_000}
+        accountant.track("s1", state)
+        state["diagnostic"] = "x" * 50_000
+
+        accountant.track("s1", state)
+        assert accountant.totals()["state_bytes"] < 50_000
+
+        accountant.touch("s1", "diagnostic")
+        accountant.track("s1", state)
+        assert accountant.totals()["state_bytes"] < 50_000
+
+        accountant.stored("s1", "diagnostic")
+        accountant.track("s1", state)
+        assert accountant.totals()["state_bytes"] > 50_000
+
+    def test_session_cap_evicts_least_recently_used_artifact(self):
+        """Test LRU eviction within one session; non-artifact keys are kept."""
+        accountant = _accountant(session_cap_bytes=30_000)
+        state = {
+            "diagnostic_old": "a" * 20_000,
+            "diagnostic": "b" * 20_000,
+            "symptoms": "c" * 5_000,
+        }
+        accountant.touch("s1", "diagnostic_old", now=1.0)
+        accountant.touch("s1", "diagnostic", now=2.0)
+
+        evicted = accountant.track("s1", state, now=3.0)
+
+        assert evicted == ["diagnostic_old"]
+        assert set(state) == {"diagnostic", "symptoms"}
+        assert accountant.totals()["evictions"] == 1
+
+    def test_control_keys_are_never_evicted(self):
+        """Test that the page's dx_* control and case state survives an evicting cap."""
+        accountant = _accountant(session_cap_bytes=1_000)
+        control = {
+            "dx_language": "Français",
+            "dx_new": True,
+            "dx_failed": False,
+            "dx_cancelled": False,
+            "dx_turn": {"prompt": "p" * 5_000, "update": False},
+            "dx_conversation": ["turn " * 2_000],
+        }
+        state = {"diagnostic": "x" * 20_000, **control}
+
+        evicted = accountant.track("s1", state)
+
+        assert evicted == ["diagnostic"]
+        assert state == control
+
+    def test_process_cap_queues_evictions_for_other_sessions(self):
+        """Test that the process cap evicts the oldest artifact across sessions."""
+        accountant = _accountant(process_cap_bytes=30_000)
+        old_state = {"diagnostic": "a" * 20_000}
+        new_state = {"diagnostic": "b" * 20_000}
+        accountant.touch("old", "diagnostic", now=1.0)
+        accountant.track("old", old_state, now=1.0)
+        accountant.touch("new", "diagnostic", now=2.0)
+
+        assert accountant.track("new", new_state, now=2.0) == []
+        assert "diagnostic" in old_state  # other sessions are only modified on their rerun
+        assert accountant.totals()["state_bytes"] < 30_000
+
+        assert accountant.track("old", old_state, now=3.0) == ["diagnostic"]
+        assert old_state == {}
+
+    def test_idle_sessions_are_forgotten(self):
+        """Test that sessions idle past the timeout drop out of the totals."""
+        accountant = _accountant(idle_timeout=60.0)
+        accountant.track("idle", {"diagnostic": "x"}, now=0.0)
+        accountant.track("active", {"diagnostic": "y"}, now=120.0)
+
+        assert accountant.totals()["sessions"] == 1
@@ -0,0 +1,177 @@
+"""
+Unit tests for speculative pre-submission of diagnoses.
+Tests the debounce, reuse on submit, discard on edit and the token budget
+(reservations, refunds and unclaimed speculations).
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.core.jobs import JobExecutor, JobState
+from src.core.speculation import STATE_KEY, SpeculationManager, get_speculation_metrics
+from src.utils.metrics import DiagnosisMetrics, MetricsRegistry
+
+
+@pytest.fixture
+def metrics():
+    return DiagnosisMetrics(MetricsRegistry())
+
+
+@pytest.fixture
+def executor(metrics):
+    executor = JobExecutor(max_workers=1, watch_interval=3600, registry=metrics.registry)
+    yield executor
+    executor.shutdown()
+
+
+def _manager(executor, metrics, **kwargs):
+    return SpeculationManager(executor, debounce=2.0, metrics=metrics, **kwargs)
+
+
+def _diagnose(metrics, tokens=100):
+    def diagnose(prompt):
+        metrics.record_usage("gpt-5-mini", {"prompt_tokens": tokens, "completion_tokens": tokens})
+        return f"dx for {prompt}"
+
+    return diagnose
+
+
+class TestSpeculationManager:
+    """Test cases for SpeculationManager."""
+
+    def test_starts_after_debounce(self, executor, metrics):
+        """Test that only a case unchanged for the debounce interval is speculated on."""
+        manager = _manager(executor, metrics)
+        state = {}
+        fn = _diagnose(metrics)
+        assert manager.observe(state, "fever", "English", fn, "fever", now=100.0) is None
+        assert manager.observe(state, "fever", "English", fn, "fever", now=101.0) is None
+        job_id = manager.observe(state, "fever", "English", fn, "fever", now=102.5)
+        assert job_id is not None
+        assert executor.get(job_id).priority == -1
+        # Later ticks keep the same job
+        assert manager.observe(state, "fever", "English", fn, "fever", now=105.0) == job_id
+
+    def test_submit_reuses_speculation(self, executor, metrics):
+        """Test that submitting the same case reuses the running job."""
+        manager = _manager(executor, metrics)
+        state = {}
+        fn = _diagnose(metrics)
+        manager.observe(state, "fever", "English", fn, "fever", now=100.0)
+        job_id = manager.observe(state, "fever", "English", fn, "fever", now=103.0)
+
+        assert manager.claim(state, "fever", "English") == job_id
+        assert STATE_KEY not in state
+        assert executor.get(job_id).wait(5)
+        assert executor.get(job_id).result == "dx for fever"
+        assert get_speculation_metrics(metrics).window_summary(300)["hit_rate"] == 1.0
+        # Claimed work is real work: nothing stays charged to the budget
+        assert manager.wasted_tokens() == 0
+
+    def test_edit_discards_and_charges_budget(self, executor, metrics):
+        """Test that an edit cancels the speculation and counts its tokens as waste."""
+        manager = _manager(executor, metrics, budget_tokens=150, estimate_tokens=100)
+        state = {}
+        fn = _diagnose(metrics)
+        manager.observe(state, "fever", "English", fn, "fever", now=100.0)
+        job = executor.get(manager.observe(state, "fever", "English", fn, "fever", now=103.0))
+        assert job.wait(5)
+
+        # The edited case restarts the debounce; the finished speculation is waste
+        manager.observe(state, "fever, rash", "English", fn, "fever, rash", now=104.0)
+        assert manager.wasted_tokens() == 200
+        assert get_speculation_metrics(metrics).window_summary(300)["wasted_tokens"] == 200
+        assert executor.get(job.job_id) is None
+
+        # Over budget: no new speculation
+        assert manager.observe(state, "fever, rash", "English", fn, "x", now=107.0) is None
+        assert get_speculation_metrics(metrics).outcomes.labels("over_budget").value == 1
+
+    def test_over_budget_case_retries_when_the_window_frees_up(self, executor, metrics):
+        """Test that an over-budget case speculates again once its charges age out."""
+        manager = _manager(executor, metrics, budget_tokens=150, estimate_tokens=100)
+        state = {}
+        fn = _diagnose(metrics)
+        now = time.time()
+        manager.observe(state, "fever", "English", fn, "fever", now=now)
+        job = executor.get(manager.observe(state, "fever", "English", fn, "fever", now=now + 3))
+        assert job.wait(5)
+        manager.observe(state, "fever, rash", "English", fn, "x", now=now + 4)
+
+        assert manager.observe(state, "fever, rash", "English", fn, "x", now=now + 7) is None
+        assert manager.observe(state, "fever, rash", "English", fn, "x", now=now + 8) is None
+        assert get_speculation_metrics(metrics).outcomes.labels("over_budget").value == 1
+
+        later = now + manager.budget_window + 10
+        assert manager.observe(state, "fever, rash", "English", fn, "x", now=later) is not None
+        assert "over_budget" not in state[STATE_KEY]
+
+    def test_reaped_speculation_restarts_the_debounce(self, executor, metrics):
+        """Test that a job the executor dropped does not leave the case stuck."""
+        manager = _manager(executor, metrics)
+        state = {}
+        fn = _diagnose(metrics)
+        manager.observe(state, "fever", "English", fn, "fever", now=100.0)
+        job = executor.get(manager.observe(state, "fever", "English", fn, "fever", now=103.0))
+        assert job.wait(5)
+        executor.forget(job.job_id)
+
+        assert manager.observe(state, "fever", "English", fn, "fever", now=104.0) is None
+        assert manager.observe(state, "fever", "English", fn, "fever", now=105.0) is None
+        restarted = manager.observe(state, "fever", "English", fn, "fever", now=106.5)
+        assert restarted not in (None, job.job_id)
+
+    def test_changed_case_is_not_claimed(self, executor, metrics):
+        """Test that a submit of a different case cancels the speculation."""
+        manager = _manager(executor, metrics)
+        state = {}
+        gate = threading.Event()
+        manager.observe(state, "fever", "English", gate.wait, 5, now=100.0)
+        job = executor.get(manager.observe(state, "fever", "English", gate.wait, 5, now=103.0))
+
+        assert manager.claim(state, "fever", "Français") is None
+        assert job.token.cancelled
+        gate.set()
+        assert job.wait(5)
+        assert job.state in (JobState.CANCELLED, JobState.DONE)
+
+    def test_reservations_cap_concurrent_speculations(self, executor, metrics):
+        """Test that running speculations reserve budget before any spend is known."""
+        manager = _manager(executor, metrics, budget_tokens=250, estimate_tokens=100)
+        gate = threading.Event()
+        states = [{}, {}, {}]
+        started = []
+        for state in states:
+            manager.observe(state, "fever", "English", gate.wait, 5, now=100.0)
+            started.append(manager.observe(state, "fever", "English", gate.wait, 5, now=103.0))
+
+        assert started[0] is not None and started[1] is not None
+        assert started[2] is None
+        assert manager.wasted_tokens() == 200
+        gate.set()
+
+    def test_unclaimed_speculation_is_charged(self, metrics):
+        """Test that a finished speculation nobody claims counts as waste once it expires."""
+        executor = JobExecutor(
+            max_workers=1, watch_interval=3600, result_ttl=60.0, registry=metrics.registry
+        )
+        try:
+            manager = _manager(executor, metrics, estimate_tokens=500)
+            state = {}
+            fn = _diagnose(metrics, tokens=50)
+            manager.observe(state, "fever", "English", fn, "fever", now=100.0)
+            job = executor.get(manager.observe(state, "fever", "English", fn, "fever", now=103.0))
+            assert job.wait(5)
+
+            # The session left: no claim and no discard ever comes
+            assert manager.wasted_tokens(job.finished_at + 1) == 100
+            assert (
+                get_speculation_metrics(metrics).outcomes.labels("expired").value == 0
+            )  # still claimable
+            assert manager.wasted_tokens(job.finished_at + 61) == 100
+            assert get_speculation_metrics(metrics).outcomes.labels("expired").value == 1
+            assert get_speculation_metrics(metrics).window_summary(300)["wasted_tokens"] == 100
+        finally:
+            executor.shutdown()
@@ -0,0 +1,61 @@
+"""
+Unit tests for the cross-page session-state manager.
+Tests capture, lazy restore and the exclusion of large artifacts.
+"""
+
+import pytest
+
+from src.components.state import STORE_KEY, SessionStateManager
+
+
+def _manager(state, keys=("gender", "symptoms")):
+    return SessionStateManager(keys, state=state)
+
+
+class TestSessionStateManager:
+    """Test cases for SessionStateManager."""
+
+    def test_capture_stores_only_declared_keys(self):
+        """Test that undeclared keys and artifacts are not copied."""
+        state = {"gender": "Female", "symptoms": "fever", "diagnostic": "x" * 10_000}
+        _manager(state).capture()
+        assert state[STORE_KEY] == {"gender": "Female", "symptoms": "fever"}
+
+    def test_restore_after_page_switch(self):
+        """Test that widget values dropped by another page come back."""
+        state = {"gender": "Female", "symptoms": "fever"}
+        _manager(state).sync()
+
+        # Streamlit drops widget state not rendered on the other page
+        del state["gender"], state["symptoms"]
+        _manager(state).sync(restore=True)
+        assert state["gender"] == "Female"
+        assert state["symptoms"] == "fever"
+
+    def test_restore_keeps_current_values(self):
+        """Test that fresh widget values win over stored ones."""
+        state = {"symptoms": "fever"}
+        manager = _manager(state)
+        manager.capture()
+        state["symptoms"] = "cough"
+        manager.sync(restore=True)
+        assert state["symptoms"] == "cough"
+        assert manager.store["symptoms"] == "cough"
+
+    def test_restore_selected_keys_only(self):
+        """Test lazy restore of the keys a page renders."""
+        state = {"gender": "Male", "symptoms": "fever"}
+        manager = _manager(state)
+        manager.capture()
+        del state["gender"], state["symptoms"]
+        manager.restore(["gender"])
+        assert state["gender"] == "Male"
+        assert "symptoms" not in state
+        assert manager.get("symptoms") == "fever"
+
+    def test_artifacts_cannot_be_declared(self):
+        """Test that large artifacts stay out of the widget store."""
+        with pytest.raises(ValueError):
+            _manager({}, keys=("diagnostic",))
+        with pytest.raises(ValueError):
+            _manager({}).declare("image_xray")
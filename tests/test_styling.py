@@ -0,0 +1,72 @@
+"""
+Unit tests for the static asset helpers.
+Tests CSS minification, per-process caching and logo rendition selection.
+"""
+
+import os
+
+import pytest
+
+from src.utils.styling import (
+    get_logo_path,
+    load_css_asset,
+    load_image_bytes,
+    minify_css,
+)
+
+
+def test_minify_css_strips_comments_and_whitespace():
+    """Test that comments and redundant whitespace are removed."""
+    css = """
+    /* header "quoted" comment */
+    .block p ,  a > b {
+        color : red; /* trailing */
+        font-size: 18px;
+    }
+    """
+    assert minify_css(css) == ".block p,a>b{color:red;font-size:18px}"
+
+
+def test_minify_css_keeps_quoted_strings():
+    """Test that whitespace inside attribute values is preserved."""
+    css = 'ul[class="a  b"] { content: "x ; y" }'
+    assert minify_css(css) == 'ul[class="a  b"]{content:"x ; y"}'
+
+
+def test_css_asset_is_cached_until_file_changes(tmp_path):
+    """Test that the stylesheet is re-read only after a modification."""
+    css_file = tmp_path / "main.css"
+    css_file.write_text("a { color: red; }", encoding="utf-8")
+    first = load_css_asset(css_file)
+    assert load_css_asset(css_file) is first
+
+    css_file.write_text("a { color: blue; }", encoding="utf-8")
+    stat = css_file.stat()
+    os.utime(css_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    second = load_css_asset(css_file)
+    assert second.css == "a{color:blue}"
+    assert second.digest != first.digest
+
+
+def test_image_bytes_are_cached(tmp_path):
+    """Test that image bytes are served from memory."""
+    image = tmp_path / "qr.png"
+    image.write_bytes(b"\x89PNG data")
+    assert load_image_bytes(image) is load_image_bytes(image)
+
+
+def test_logo_path_picks_smallest_adequate_rendition(tmp_path):
+    """Test logo rendition selection by rendered width."""
+    for size in (32, 128, 256, 512):
+        (tmp_path / f"MDxApp_logo_v2_{size}.png").write_bytes(b"")
+
+    assert get_logo_path(256, tmp_path).name == "MDxApp_logo_v2_256.png"
+    assert get_logo_path(100, tmp_path).name == "MDxApp_logo_v2_128.png"
+    assert get_logo_path(200, tmp_path, pixel_ratio=2).name == "MDxApp_logo_v2_512.png"
+    assert get_logo_path(1024, tmp_path).name == "MDxApp_logo_v2_512.png"
+
+
+def test_logo_path_requires_renditions(tmp_path):
+    """Test the error when no logo is available."""
+    with pytest.raises(FileNotFoundError):
+        get_logo_path(256, tmp_path)
@@ -0,0 +1,145 @@
+"""
+Unit tests for request tracing utilities.
+Tests span nesting, exporters and the disabled fast path.
+"""
+
+import json
+import logging
+import threading
+import time
+
+from src.utils.logger import TraceContextFilter
+from src.utils.tracing import (
+    NOOP_SPAN,
+    JsonlSpanExporter,
+    OtlpHttpSpanExporter,
+    SpanExporter,
+    Tracer,
+    current_trace_id,
+)
+
+
+class ListExporter(SpanExporter):
+    """Collects exported spans in memory."""
+
+    def __init__(self):
+        self.spans = []
+        self.event = threading.Event()
+
+    def export(self, spans):
+        self.spans.extend(spans)
+        self.event.set()
+
+
+class TestTracer:
+    """Test cases for Tracer."""
+
+    def test_disabled_tracer_returns_noop_span(self):
+        """Test that a disabled tracer hands out the shared no-op span."""
+        tracer = Tracer(enabled=False)
+
+        with tracer.span("prompt_build") as span:
+            span.set_attribute("language", "English")
+            assert current_trace_id() is None
+
+        assert span is NOOP_SPAN
+        assert tracer.start_span("rerun") is NOOP_SPAN
+
+    def test_nested_spans_share_trace_id(self):
+        """Test that child spans inherit the trace ID and parent span ID."""
+        exporter = ListExporter()
+        tracer = Tracer(exporter=exporter)
+
+        root = tracer.start_span("streamlit_rerun", new_trace=True)
+        with tracer.span("prompt_build") as child:
+            assert current_trace_id() == root.trace_id
+        root.end()
+        tracer.shutdown()
+
+        assert child.trace_id == root.trace_id
+        assert child.parent_id == root.span_id
+        assert {s.name for s in exporter.spans} == {"streamlit_rerun", "prompt_build"}
+        assert current_trace_id() is None
+
+    def test_span_records_error(self):
+        """Test that exceptions mark the span as failed."""
+        exporter = ListExporter()
+        tracer = Tracer(exporter=exporter)
+
+        try:
+            with tracer.span("upstream_call"):
+                raise TimeoutError("slow")
+        except TimeoutError:
+            pass
+        tracer.shutdown()
+
+        assert exporter.spans[0].status == "error"
+        assert exporter.spans[0].attributes["error.type"] == "TimeoutError"
+
+    def test_record_span_and_use_span_across_threads(self):
+        """Test retroactive spans and joining a trace from another thread."""
+        exporter = ListExporter()
+        tracer = Tracer(exporter=exporter)
+        root = tracer.start_span("submit", new_trace=True)
+
+        def worker():
+            with tracer.use_span(root):
+                start = time.time_ns()
+                tracer.record_span("time_to_first_token", start, start + 5_000_000)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        root.end()
+        tracer.shutdown()
+
+        ttft = next(s for s in exporter.spans if s.name == "time_to_first_token")
+        assert ttft.trace_id == root.trace_id
+        assert ttft.duration_ms == 5.0
+
+
+def test_jsonl_exporter_writes_one_line_per_span(tmp_path):
+    """Test that the JSONL exporter appends valid JSON lines."""
+    path = tmp_path / "traces" / "spans.jsonl"
+    tracer = Tracer(exporter=JsonlSpanExporter(path))
+
+    with tracer.span("html_render", chars=42):
+        pass
+    tracer.shutdown()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert record["name"] == "html_render"
+    assert record["attributes"] == {"chars": 42}
+
+
+def test_otlp_payload_structure():
+    """Test the OTLP JSON payload built for a span."""
+    exporter = OtlpHttpSpanExporter("http://collector:4318")
+    tracer = Tracer(enabled=True)
+    span = tracer.start_span("upstream_call", new_trace=True, model="gpt-5-mini")
+    span.end()
+
+    payload = exporter.build_payload([span])
+    otlp_span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+
+    assert exporter.endpoint == "http://collector:4318/v1/traces"
+    assert otlp_span["traceId"] == span.trace_id
+    assert len(otlp_span["traceId"]) == 32
+    assert otlp_span["attributes"] == [{"key": "model", "value": {"stringValue": "gpt-5-mini"}}]
+
+
+def test_log_records_carry_trace_id():
+    """Test that the logging filter injects the active trace ID."""
+    tracer = Tracer(enabled=True)
+    record = logging.LogRecord("mdxapp", logging.INFO, __file__, 1, "msg", None, None)
+
+    TraceContextFilter().filter(record)
+    assert record.trace_id == "-"
+
+    span = tracer.start_span("submit", new_trace=True)
+    TraceContextFilter().filter(record)
+    span.end()
+
+    assert record.trace_id == span.trace_id
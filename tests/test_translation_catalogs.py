@@ -0,0 +1,109 @@
+"""
+Unit tests for compiled translation catalogs.
+Tests flattening, fallback merging, missing-key reports and lazy loading.
+"""
+
+import json
+
+from src.utils.i18n import I18n
+from src.utils.translation_catalogs import (
+    compile_catalogs,
+    default_catalog_dir,
+    flatten_translations,
+    load_catalogs,
+    main,
+    merge_fallback,
+)
+
+TRANSLATIONS = {
+    "English": {"greeting": "Hello", "none": "none", "form": {"age": "Age"}},
+    "Español": {"greeting": "Hola", "form": {"age": "Edad"}},
+}
+
+
+def _write(tmp_path, data=TRANSLATIONS):
+    path = tmp_path / "translations.json"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def test_flatten_translations_uses_dotted_keys():
+    """Test that nested groups are flattened."""
+    assert flatten_translations(TRANSLATIONS["English"]) == {
+        "greeting": "Hello",
+        "none": "none",
+        "form.age": "Age",
+    }
+
+
+def test_merge_fallback_fills_and_reports_missing_keys():
+    """Test that the default language is merged and gaps are reported."""
+    catalogs, missing = merge_fallback(TRANSLATIONS)
+
+    assert catalogs["Español"] == {"greeting": "Hola", "none": "none", "form.age": "Edad"}
+    assert missing == {"Español": ["none"]}
+
+
+def test_compile_and_lazy_load(tmp_path):
+    """Test that compiled catalogs load per language on first access."""
+    path = _write(tmp_path)
+    missing = compile_catalogs(path)
+    assert missing == {"Español": ["none"]}
+
+    catalogs = load_catalogs(path.read_bytes(), default_catalog_dir(path))
+    assert catalogs is not None
+    assert list(catalogs) == ["English", "Español"]
+    assert catalogs.missing == {"Español": ["none"]}
+    assert catalogs._loaded == {}
+    assert catalogs["Español"]["none"] == "none"
+    assert list(catalogs._loaded) == ["Español"]
+
+
+def test_stale_catalogs_are_ignored(tmp_path):
+    """Test that catalogs built from another source are not used."""
+    path = _write(tmp_path)
+    compile_catalogs(path)
+    _write(tmp_path, {"English": {"greeting": "Hi"}})
+
+    assert load_catalogs(path.read_bytes(), default_catalog_dir(path)) is None
+
+
+def test_rebuild_keeps_earlier_snapshots_readable(tmp_path):
+    """Test that a rebuild never rewrites the files an older manifest lists."""
+    path = _write(tmp_path)
+    compile_catalogs(path)
+    before = load_catalogs(path.read_bytes(), default_catalog_dir(path))
+
+    changed = {"English": {"greeting": "Hi"}, "Español": {"greeting": "Buenas"}}
+    path = _write(tmp_path, changed)
+    compile_catalogs(path)
+    after = load_catalogs(path.read_bytes(), default_catalog_dir(path))
+
+    assert before["Español"]["greeting"] == "Hola"
+    assert after["Español"]["greeting"] == "Buenas"
+    assert not list(default_catalog_dir(path).glob("*.tmp"))
+
+
+def test_i18n_uses_and_refreshes_catalogs(tmp_path):
+    """Test that I18n writes catalogs when stale and reads them afterwards."""
+    path = _write(tmp_path)
+    catalog_dir = default_catalog_dir(path)
+
+    first = I18n(path, catalog_dir=catalog_dir)
+    assert isinstance(first.translations, dict)  # parsed JSON, catalogs written
+    assert (catalog_dir / "manifest.json").exists()
+
+    second = I18n(path, catalog_dir=catalog_dir)
+    assert not isinstance(second.translations, dict)  # loaded from catalogs
+    assert second.get("Español", "none") == "none"
+    assert second.get("Español", "form.age") == "Edad"
+    assert second.missing_keys == {"Español": ["none"]}
+
+
+def test_cli_strict_fails_on_missing_keys(tmp_path, capsys):
+    """Test the build command's exit status."""
+    path = _write(tmp_path)
+
+    assert main([str(path)]) == 0
+    assert main([str(path), "--strict"]) == 1
+    assert "Español: missing none" in capsys.readouterr().out
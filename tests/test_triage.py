@@ -0,0 +1,69 @@
+"""
+Unit tests for the triage stage of the two-stage diagnosis pipeline.
+Uses a fake OpenAI client to inspect the requests and count calls.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.ai_client import prompt_cache_key
+from src.core.cancellation import CancellationToken, DiagnosisCancelledError
+from src.core.triage import TRIAGE_INSTRUCTION, DiagnosisTriage, TriageOutput
+
+
+class FakeClient:
+    """Minimal stand-in for the OpenAI client's structured-output endpoint."""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+        self.beta = SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(parse=self._parse))
+        )
+
+    def _parse(self, **params):
+        self.calls.append(params)
+        if self.error is not None:
+            raise self.error
+        parsed = TriageOutput(primary_diagnosis="Myocardial infarction", urgent=True)
+        message = SimpleNamespace(parsed=parsed)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def test_triage_shares_the_diagnosis_prefix():
+    """Test that the request starts with the full diagnosis prompt and asks for triage last."""
+    client = FakeClient()
+    triage = DiagnosisTriage(client, model="gpt-5-nano")
+    key = prompt_cache_key("system")
+
+    result = triage.triage("system", "case", prompt_cache_key=key)
+    assert result.urgent
+    params = client.calls[0]
+    assert [m["content"] for m in params["messages"]] == ["system", "case", TRIAGE_INSTRUCTION]
+    assert params["reasoning_effort"] == "minimal"
+    assert params["prompt_cache_key"] == key == prompt_cache_key("system")
+
+
+def test_triage_is_cached_per_prompt():
+    """Test that resubmitting the same case reuses the triage result."""
+    client = FakeClient()
+    triage = DiagnosisTriage(client, model="gpt-4o-mini")
+    assert triage.triage("system", "case") == triage.triage("system", "case")
+    assert len(client.calls) == 1
+    # Not a reasoning model: no reasoning effort sent
+    assert "reasoning_effort" not in client.calls[0]
+    triage.triage("system", "other case")
+    assert len(client.calls) == 2
+
+
+def test_triage_failure_and_cancellation():
+    """Test that upstream errors yield None and a cancelled token stops the call."""
+    assert DiagnosisTriage(FakeClient(error=RuntimeError("down"))).triage("s", "u") is None
+
+    client = FakeClient()
+    token = CancellationToken()
+    token.cancel()
+    with pytest.raises(DiagnosisCancelledError):
+        DiagnosisTriage(client).triage("s", "u", cancel_token=token)
+    assert client.calls == []
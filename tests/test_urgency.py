@@ -0,0 +1,73 @@
+"""
+Unit tests for the local urgency score used to schedule diagnosis jobs.
+Tests red-flag detection across languages, age bands and pregnancy.
+"""
+
+from src.core.urgency import (
+    PRIORITY_ELEVATED,
+    PRIORITY_ROUTINE,
+    PRIORITY_URGENT,
+    assess_urgency,
+    red_flags,
+)
+from src.models.patient import PatientData
+
+
+def _patient(symptoms="cough", age=40, pregnant="No", exam=None, gender="Female"):
+    return PatientData(
+        gender=gender, age=age, is_pregnant=pregnant, symptoms=symptoms, exam_findings=exam
+    )
+
+
+class TestRedFlags:
+    """Test cases for red-flag keyword detection."""
+
+    def test_matches_word_starts_case_insensitively(self):
+        """Test stems and case folding."""
+        assert red_flags("Crushing CHEST PAIN", "suicidal thoughts") == ["chest pain", "suicid"]
+
+    def test_ignores_matches_inside_words(self):
+        """Test that a term must start a word."""
+        assert red_flags("nonsepsis-like rash") == []
+
+    def test_japanese_without_word_breaks(self):
+        """Test scripts written without spaces."""
+        assert red_flags("昨日から胸痛がある") == ["胸痛"]
+
+    def test_other_languages(self):
+        """Test French, Spanish and German terms."""
+        assert red_flags("Douleur thoracique") == ["douleur thoracique"]
+        assert red_flags("dificultad para respirar") == ["dificultad para respirar"]
+        assert red_flags("Brustschmerzen seit gestern") == ["brustschmerz"]
+
+
+class TestAssessUrgency:
+    """Test cases for assess_urgency."""
+
+    def test_routine_case(self):
+        """Test that an unremarkable case is routine."""
+        assessment = assess_urgency(_patient())
+        assert assessment.score == 0
+        assert assessment.priority == PRIORITY_ROUTINE
+
+    def test_red_flag_is_urgent(self):
+        """Test that one red flag in symptoms or exam is enough."""
+        assert assess_urgency(_patient(symptoms="seizure")).priority == PRIORITY_URGENT
+        assert assess_urgency(_patient(exam="cyanosis")).priority == PRIORITY_URGENT
+
+    def test_age_bands(self):
+        """Test infants and the elderly."""
+        assert assess_urgency(_patient(age=70)).priority == PRIORITY_ELEVATED
+        assert assess_urgency(_patient(age=0)).reasons == ("extreme_age",)
+
+    def test_translated_pregnancy(self):
+        """Test that the translated 'yes' counts as pregnant."""
+        assessment = assess_urgency(_patient(pregnant="Oui"), {"yes": "Oui"})
+        assert assessment.reasons == ("pregnancy",)
+        assert assessment.priority == PRIORITY_ELEVATED
+
+    def test_risk_factors_add_up(self):
+        """Test that pregnancy and age together make a case urgent."""
+        assessment = assess_urgency(_patient(age=67, pregnant="Yes"))
+        assert assessment.score == 3
+        assert assessment.priority == PRIORITY_URGENT